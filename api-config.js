@@ -11,6 +11,7 @@ const API_CONFIG = {
   ENDPOINTS: {
     HEALTH: '/api/health',
     ANALYZE: '/api/analyze',
+    ANALYZE_STREAM: '/api/analyze/stream',
     SCRAPE: '/api/scrape',
     DETECT_BOTS: '/api/detect-bots',
     DETECT_COPYRIGHT: '/api/detect-copyright',
@@ -1,14 +1,39 @@
 #!/usr/bin/env python3
 
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from youtube_analyzer import YouTubeAnalyzer
+from comment_corpus import CorpusDownloader
+from keyword_index import KeywordCatalogs
+from comment_store import CommentStore
+from author_index import AuthorIndex, DEFAULT_TOP
+from graph import build_graph, DEFAULT_TOP_NODES
+from near_duplicates import find_similar_groups
+from toxicity_classifier import ToxicityClassifier
+from http_clients import HTTPClients, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, DEFAULT_RETRIES, DEFAULT_BACKOFF
+from verdict_cache import VerdictCache, DEFAULT_MEMORY_ENTRIES, DEFAULT_DISK_ENTRIES, DEFAULT_TTL
+from batch_analysis import analyze_batch, DEFAULT_SCRAPE_WORKERS, DEFAULT_PROCESSES
+from leak_index import LeakIndex
+from chunk_index import ChunkIndex
+from integrity import FileCheck, check_uploads, parse_algorithms, READ_CHUNK_SIZE
+from integrity import DEFAULT_WORKERS as DEFAULT_INTEGRITY_WORKERS
+from job_queue import JobQueue, QueueFull, DEFAULT_WORKERS, DEFAULT_QUEUE_DEPTH, DEFAULT_RETENTION
+from response_shaping import (AegisJSONProvider, ResultCache, compress_response, decode_cursor, encode_json,
+                              page, parse_fields, parse_page_size, shape_result, COMPRESS_MIN_SIZE,
+                              DEFAULT_PAGE_SIZE, DEFAULT_RESULT_ENTRIES, DEFAULT_RESULT_TTL)
+from profiling import ProfileStore, ProfilerBusy, parse_mode
+from triage import DECISIONS, DEFAULT_HIGH, DEFAULT_LLM_FRACTION, DEFAULT_LOW, cascade_stats, load_from_env, local_verdict, route
+from metrics import (REGISTRY, APIFY_REQUESTS, HTTP_REQUEST_SECONDS, TRIAGE_DECISIONS, CONTENT_TYPE, record_cache,
+                     start_timings, timed)
 import sys
 import os
+import io
 import re
+import time
+import functools
+import hmac
 import json as _json
-import requests
 
 # Fix Windows console encoding
 if sys.platform == "win32":
@@ -18,14 +43,212 @@ if sys.platform == "win32":
         sys.stderr = codecs.getwriter('utf-8')(sys.stderr.detach())
 
 app = Flask(__name__)
+app.json = AegisJSONProvider(app)
 CORS(app)  # Enable CORS for frontend access
 
-analyzer = YouTubeAnalyzer()
+# Persistent comment store for incremental re-scans (set AEGIS_COMMENT_DB= to disable)
+COMMENT_DB_PATH = os.environ.get('AEGIS_COMMENT_DB', 'aegis_comments.db')
+
+# Cross-video author reputation (see author_index.py), AEGIS_AUTHOR_DB= to disable
+author_index = AuthorIndex.from_env()
+
+analyzer = YouTubeAnalyzer(store=CommentStore(COMMENT_DB_PATH) if COMMENT_DB_PATH else None, authors=author_index)
+
+# Authors shown in coordination graphs (the rest are only counted)
+NETWORK_NODES = int(os.environ.get('AEGIS_NETWORK_NODES', DEFAULT_TOP_NODES))
+analyzer.network_nodes = NETWORK_NODES
+
+# Local toxicity model (see triage.py) in front of the LLM and scoring harassment findings
+triage_model = load_from_env()
+analyzer.triage = triage_model
+TRIAGE_LOW = float(os.environ.get('AEGIS_TRIAGE_LOW', DEFAULT_LOW))
+TRIAGE_HIGH = float(os.environ.get('AEGIS_TRIAGE_HIGH', DEFAULT_HIGH))
+TRIAGE_LLM_FRACTION = float(os.environ.get('AEGIS_TRIAGE_LLM_FRACTION', DEFAULT_LLM_FRACTION))
+
+# AEGIS_YOUTUBE_BACKEND=fake serves synthetic comments instead of scraping YouTube (load tests, CI)
+if os.environ.get('AEGIS_YOUTUBE_BACKEND') == 'fake':
+    analyzer.downloader = CorpusDownloader.from_env()
+
+# Named keyword catalogs, referenced as "catalog:<name>" in keywords
+keyword_catalogs = KeywordCatalogs.from_env()
+
+# Known leaked/protected file hashes (see leak_index.py), directory from AEGIS_LEAK_INDEX
+leak_index = LeakIndex.from_env()
+
+# Chunk fingerprints of protected assets (see chunk_index.py), for trimmed or re-muxed copies
+chunk_index = ChunkIndex.from_env()
+# Containment from which a partial match counts as a leak
+PARTIAL_LEAK_THRESHOLD = float(os.environ.get('AEGIS_PARTIAL_LEAK_THRESHOLD', 0.5))
+# Threads hashing archive members for /api/integrity-check/batch
+INTEGRITY_WORKERS = int(os.environ.get('AEGIS_INTEGRITY_WORKERS', DEFAULT_INTEGRITY_WORKERS))
 
 # Default external service config (can be overridden by environment variables)
 DEFAULT_APIFY_TOKEN = os.environ.get('APIFY_TOKEN')
 DEFAULT_GROQ_API_KEY = os.environ.get('GROQ_API_KEY') 
 DEFAULT_INSTAGRAM_ACTOR_ID = os.environ.get('ACTOR_ID')
+# Point Groq and Apify at a local stand-in (see stub_services.py) for testing without the real APIs
+DEFAULT_GROQ_BASE_URL = os.environ.get('GROQ_BASE_URL') or None
+DEFAULT_APIFY_BASE_URL = (os.environ.get('APIFY_BASE_URL') or 'https://api.apify.com').rstrip('/')
+DEFAULT_GROQ_BATCH_SIZE = int(os.environ.get('GROQ_BATCH_SIZE', 10))
+DEFAULT_GROQ_WORKERS = int(os.environ.get('GROQ_WORKERS', 4))
+
+# Keep-alive connections and Groq clients reused across requests, with retry/backoff on 429/5xx
+http_clients = HTTPClients(
+    pool_size=int(os.environ.get('AEGIS_HTTP_POOL_SIZE', DEFAULT_POOL_SIZE)),
+    timeout=float(os.environ.get('AEGIS_HTTP_TIMEOUT', DEFAULT_TIMEOUT)),
+    retries=int(os.environ.get('AEGIS_HTTP_RETRIES', DEFAULT_RETRIES)),
+    backoff=float(os.environ.get('AEGIS_HTTP_BACKOFF', DEFAULT_BACKOFF))
+)
+
+# Toxicity verdicts shared across requests; the disk tier is enabled by AEGIS_VERDICT_CACHE_DB
+verdict_cache = VerdictCache(
+    max_entries=int(os.environ.get('AEGIS_VERDICT_CACHE_SIZE', DEFAULT_MEMORY_ENTRIES)),
+    disk_path=os.environ.get('AEGIS_VERDICT_CACHE_DB') or None,
+    ttl=float(os.environ.get('AEGIS_VERDICT_CACHE_TTL', DEFAULT_TTL)),
+    max_disk_entries=int(os.environ.get('AEGIS_VERDICT_CACHE_DISK_SIZE', DEFAULT_DISK_ENTRIES))
+)
+
+# Multi-video analysis: concurrent scrapes, detectors in a process pool
+BATCH_MAX_VIDEOS = int(os.environ.get('AEGIS_BATCH_MAX_VIDEOS', 50))
+BATCH_SCRAPE_WORKERS = int(os.environ.get('AEGIS_BATCH_SCRAPE_WORKERS', DEFAULT_SCRAPE_WORKERS))
+BATCH_PROCESSES = int(os.environ.get('AEGIS_BATCH_PROCESSES', DEFAULT_PROCESSES))
+
+def run_analysis_job(job):
+    """Run a queued /api/analyze request, reporting progress on the job"""
+    params = dict(job.params)
+    if params.pop('incremental', False):
+        params.pop('use_store', None)
+        result = analyzer.analyze_incremental(progress=job.report_progress, **params)
+    else:
+        result = analyzer.analyze_video(progress=job.report_progress, **params)
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'Analysis failed'))
+    return result
+
+# Background analyses for {"async": true} requests
+analysis_jobs = JobQueue(
+    run_analysis_job,
+    workers=int(os.environ.get('AEGIS_JOB_WORKERS', DEFAULT_WORKERS)),
+    max_queue=int(os.environ.get('AEGIS_JOB_QUEUE_DEPTH', DEFAULT_QUEUE_DEPTH)),
+    retention=float(os.environ.get('AEGIS_JOB_RETENTION', DEFAULT_RETENTION))
+)
+
+# Full results of paginated responses, for fetching later pages by cursor
+result_cache = ResultCache(
+    max_entries=int(os.environ.get('AEGIS_RESULT_CACHE_SIZE', DEFAULT_RESULT_ENTRIES)),
+    ttl=float(os.environ.get('AEGIS_RESULT_CACHE_TTL', DEFAULT_RESULT_TTL))
+)
+
+# gzip/brotli for JSON responses of at least this many bytes (AEGIS_COMPRESSION=0 turns it off)
+COMPRESSION_ENABLED = os.environ.get('AEGIS_COMPRESSION', '1') != '0'
+COMPRESS_MIN_BYTES = int(os.environ.get('AEGIS_COMPRESS_MIN_BYTES', COMPRESS_MIN_SIZE))
+
+# Occupancy read when /api/metrics is scraped
+REGISTRY.gauge('aegis_job_queue', 'Analysis jobs by state', ('state',),
+               lambda: {state: analysis_jobs.stats()[state] for state in ('queued', 'running')})
+REGISTRY.gauge('aegis_result_cache_entries', 'Results held for pagination',
+               function=lambda: result_cache.stats()['entries'])
+REGISTRY.gauge('aegis_verdict_cache_entries', 'Toxicity verdicts held in memory',
+               function=lambda: verdict_cache.stats()['memory_entries'])
+REGISTRY.gauge('aegis_groq_clients', 'Groq clients kept for reuse',
+               function=lambda: http_clients.stats()['groq_clients'])
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+    # Stages timed while handling the request, for responses asking for `timings`
+    g.timings = start_timings()
+
+@app.after_request
+def compress(response):
+    if COMPRESSION_ENABLED:
+        return compress_response(response, request.accept_encodings, COMPRESS_MIN_BYTES)
+    return response
+
+@app.after_request
+def observe_request(response):
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method,
+                                     status=response.status_code)
+    return response
+
+# Token required to change detector rules at runtime; without it rules only reload from AEGIS_RULES_FILE
+ADMIN_TOKEN = os.environ.get('AEGIS_ADMIN_TOKEN') or None
+
+def is_admin():
+    """Whether the request carries AEGIS_ADMIN_TOKEN (X-Aegis-Admin-Token or a Bearer token)"""
+    if ADMIN_TOKEN is None:
+        return False
+    sent = request.headers.get('X-Aegis-Admin-Token', '')
+    authorization = request.headers.get('Authorization', '')
+    if not sent and authorization.startswith('Bearer '):
+        sent = authorization[len('Bearer '):]
+    return hmac.compare_digest(sent.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+# Opt-in request profiling (see profiling.py); off unless AEGIS_PROFILING_ENABLED=1
+PROFILING_ENABLED = os.environ.get('AEGIS_PROFILING_ENABLED', '0') == '1'
+profile_store = ProfileStore.from_env()
+
+def profiled(view):
+    """Run the view under a profiler when the request sends "profile" or an X-Aegis-Profile header"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        data = request.get_json(silent=True) or {}
+        value = data.get('profile') if isinstance(data, dict) else None
+        if value is None:
+            value = request.headers.get('X-Aegis-Profile')
+        if value is None:
+            return view(*args, **kwargs)
+        
+        try:
+            mode = parse_mode(value)
+            if mode and isinstance(data, dict) and data.get('async'):
+                raise ValueError('profile cannot be combined with async; the job runs on another thread')
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        if mode is None:
+            return view(*args, **kwargs)
+        if not PROFILING_ENABLED:
+            return jsonify({
+                'success': False,
+                'error': 'Profiling is disabled on this server (AEGIS_PROFILING_ENABLED)'
+            }), 403
+        
+        try:
+            with profile_store.profile(mode) as profile:
+                response = app.make_response(view(*args, **kwargs))
+        except ProfilerBusy as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 409
+        
+        response.headers['X-Aegis-Profile-Id'] = profile.id
+        payload = response.get_json(silent=True) if response.is_json else None
+        if isinstance(payload, dict):
+            payload['profile'] = profile.to_dict()
+            response.set_data(encode_json(payload))
+        return response
+    return wrapper
+
+def wants_timings(data):
+    """Whether the request asked for the per-stage timing breakdown"""
+    value = data.get('timings', request.args.get('timings'))
+    return value not in (None, False, '', '0', 'false')
+
+def shaped_response(result, data):
+    """jsonify a result with the request's `fields` and `page_size` applied"""
+    fields = parse_fields(data.get('fields'))
+    page_size = parse_page_size(data.get('page_size'))
+    if wants_timings(data):
+        result['timings'] = g.timings.to_dict()
+    result_id = result_cache.put(result) if page_size and result.get('success') else None
+    return jsonify(shape_result(result, fields, page_size, result_id))
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -35,9 +258,56 @@ def health_check():
         'service': 'Aegis YouTube Analyzer API'
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Pipeline counters and histograms in the Prometheus text format"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """A saved request profile: a pstats report (or ?format=pstats for the file), or collapsed stacks"""
+    try:
+        found = profile_store.find(profile_id)
+        if found is None:
+            return jsonify({
+                'success': False,
+                'error': 'Unknown profile ID'
+            }), 404
+        
+        mode, path = found
+        if mode == 'sampling':
+            with open(path, encoding='utf-8') as f:
+                return Response(f.read(), mimetype='text/plain')
+        if request.args.get('format') == 'pstats':
+            with open(path, 'rb') as f:
+                return Response(f.read(), mimetype='application/octet-stream', headers={
+                    'Content-Disposition': f'attachment; filename={profile_id}.pstats'
+                })
+        report = profile_store.report(path, request.args.get('sort', 'cumulative'),
+                                      int(request.args.get('limit', 50)))
+        return Response(report, mimetype='text/plain')
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/analyze', methods=['POST'])
+@profiled
 def analyze_video():
-    """Analyze a YouTube video"""
+    """Analyze a YouTube video
+
+    With "async": true the analysis is queued and a job ID is returned
+    immediately (202); poll /api/jobs/<job_id> for progress and the result.
+    With "incremental": true only comments added since the last incremental
+    scan are analyzed, on top of the video's saved detector state.
+    """
     try:
         data = request.get_json()
         
@@ -48,14 +318,260 @@ def analyze_video():
             }), 400
         
         video_url = data['video_url']
-        keywords = data.get('keywords', [])
+        keywords = keyword_catalogs.resolve(data.get('keywords', []))
+        keyword_mode = data.get('keyword_mode', 'substring')
         limit = data.get('limit', 200)
+        use_store = data.get('use_store', True)
+        incremental = bool(data.get('incremental'))
+        if incremental and analyzer.store is None:
+            raise ValueError('incremental needs the comment store (AEGIS_COMMENT_DB)')
+        
+        if data.get('async'):
+            try:
+                job = analysis_jobs.submit({
+                    'video_url_or_id': video_url,
+                    'keywords': keywords,
+                    'limit': limit,
+                    'keyword_mode': keyword_mode,
+                    'use_store': use_store,
+                    'incremental': incremental
+                })
+            except QueueFull as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 503
+            
+            return jsonify({
+                'success': True,
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': f'/api/jobs/{job.id}'
+            }), 202
         
         # Perform analysis
-        result = analyzer.analyze_video(video_url, keywords, limit)
+        if incremental:
+            result = analyzer.analyze_incremental(video_url, keywords, limit, keyword_mode)
+        else:
+            result = analyzer.analyze_video(video_url, keywords, limit, keyword_mode, use_store)
+        
+        return shaped_response(result, data)
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/analyze-batch', methods=['POST'])
+def analyze_video_batch():
+    """Analyze several YouTube videos and aggregate the results across them"""
+    try:
+        data = request.get_json()
+        
+        if not data or not data.get('videos'):
+            return jsonify({
+                'success': False,
+                'error': 'Missing videos parameter'
+            }), 400
+        
+        videos = data['videos']
+        if not isinstance(videos, list):
+            return jsonify({
+                'success': False,
+                'error': 'videos must be a list of video URLs or IDs'
+            }), 400
+        if len(videos) > BATCH_MAX_VIDEOS:
+            return jsonify({
+                'success': False,
+                'error': f'Too many videos (max {BATCH_MAX_VIDEOS})'
+            }), 400
+        
+        keywords = keyword_catalogs.resolve(data.get('keywords', []))
+        keyword_mode = data.get('keyword_mode', 'substring')
+        limit = data.get('limit', 200)
+        use_store = data.get('use_store', True)
+        
+        result = analyze_batch(
+            analyzer, videos, keywords, limit, keyword_mode, use_store,
+            scrape_workers=BATCH_SCRAPE_WORKERS, processes=BATCH_PROCESSES
+        )
         
         return jsonify(result)
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/results/<result_id>', methods=['GET'])
+def get_result(result_id):
+    """Fetch a paginated result again, or with ?cursor= the next page of one of its lists"""
+    try:
+        result = result_cache.get(result_id)
+        record_cache('result', result is not None, result is None)
+        if result is None:
+            return jsonify({
+                'success': False,
+                'error': 'Result not found or expired'
+            }), 404
+        
+        page_size = parse_page_size(request.args.get('page_size'))
+        cursor = request.args.get('cursor')
+        if cursor:
+            field, offset = decode_cursor(cursor)
+            return jsonify(dict(
+                {'success': True, 'result_id': result_id, 'field': field},
+                **page(result, field, offset, page_size or DEFAULT_PAGE_SIZE)
+            ))
+        
+        return jsonify(shape_result(result, parse_fields(request.args.get('fields')), page_size, result_id))
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/authors/top', methods=['GET'])
+def top_authors():
+    """Repeat offenders across every scan, by ?sort=risk|flagged_videos|flagged|videos"""
+    try:
+        if author_index is None:
+            return jsonify({
+                'success': False,
+                'error': 'The author index is disabled (AEGIS_AUTHOR_DB)'
+            }), 404
+        
+        authors = author_index.top(
+            int(request.args.get('limit', DEFAULT_TOP)),
+            request.args.get('sort', 'risk'),
+            int(request.args.get('min_videos', 1))
+        )
+        return jsonify({
+            'success': True,
+            'authors': authors,
+            'index': author_index.stats()
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/authors/<path:key>', methods=['GET'])
+def get_author(key):
+    """Totals, risk and flagged videos of one author, by channel ID (or name:<display name>)"""
+    author = author_index.get(key) if author_index is not None else None
+    if author is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown author'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'author': author
+    })
+
+@app.route('/api/jobs', methods=['GET'])
+def job_queue_stats():
+    """Worker pool and queue occupancy"""
+    return jsonify({
+        'success': True,
+        'queue': analysis_jobs.stats()
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, progress and (once completed) the result of an analysis job"""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown job ID'
+        }), 404
+    
+    return jsonify(dict(success=True, **job.to_dict()))
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running analysis job"""
+    job = analysis_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown job ID'
+        }), 404
+    
+    return jsonify(dict(success=True, **job.to_dict(include_result=False)))
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_video_stream():
+    """Analyze a YouTube video, streaming flags and running statistics as comments arrive
+
+    Responds with NDJSON (one event per line) by default, or Server-Sent Events
+    when "format": "sse" is given or the client accepts text/event-stream.
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or 'video_url' not in data:
+            return jsonify({
+                'success': False,
+                'error': 'Missing video_url parameter'
+            }), 400
+        
+        video_url = data['video_url']
+        keywords = keyword_catalogs.resolve(data.get('keywords', []))
+        keyword_mode = data.get('keyword_mode', 'substring')
+        limit = data.get('limit', 200)
+        batch_size = max(1, int(data.get('batch_size', 50)))
+        use_sse = data.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+        
+        events = analyzer.analyze_stream(video_url, keywords, limit, keyword_mode, batch_size)
+        
+        def generate():
+            for event in events:
+                line = encode_json(event)
+                if use_sse:
+                    yield f"event: {event['event']}\ndata: {line}\n\n"
+                else:
+                    yield line + '\n'
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream' if use_sse else 'application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -63,6 +579,7 @@ def analyze_video():
         }), 500
 
 @app.route('/api/instagram-analyze', methods=['POST'])
+@profiled
 def instagram_analyze():
     """Analyze Instagram comments for toxicity/harassment using Apify and Groq.
 
@@ -72,6 +589,12 @@ def instagram_analyze():
 
     Optional:
     - apify_token, groq_api_key, comments_limit (default 30)
+    - include_replies: true also analyzes replies, up to replies_limit
+      (default comments_limit) on top of comments_limit
+    - llm_batch_size (comments per LLM prompt), llm_workers (concurrent prompts)
+    - triage_low, triage_high (local model score band sent to the LLM), llm_fraction
+      (cap on the share of comments sent to the LLM), triage: false to send all
+    - timings: true adds the Apify and LLM time to the response
     """
     try:
         data = request.get_json(force=True, silent=True) or {}
@@ -79,6 +602,8 @@ def instagram_analyze():
         post_url = data.get('post_url')
         username = data.get('username')
         comments_limit = int(data.get('comments_limit', 30))
+        include_replies = data.get('include_replies', False) not in (False, 0, '0', 'false', None)
+        replies_limit = int(data.get('replies_limit', comments_limit)) if include_replies else 0
 
         if not post_url and not username:
             return jsonify({ 'success': False, 'error': 'Provide either post_url or username' }), 400
@@ -101,55 +626,30 @@ def instagram_analyze():
             "resultsType": "posts",
             "resultsLimit": 5 if username else 1,
             "comments": True,
-            "includeCommentReplies": True,
+            "includeCommentReplies": include_replies,
             "commentsLimit": comments_limit
         }
 
         actor_id = DEFAULT_INSTAGRAM_ACTOR_ID
-        apify_url = f"https://api.apify.com/v2/acts/{actor_id}/run-sync-get-dataset-items?token={apify_token}"
-        apify_res = requests.post(apify_url, json=apify_input, timeout=60)
+        apify_url = f"{DEFAULT_APIFY_BASE_URL}/v2/acts/{actor_id}/run-sync-get-dataset-items?token={apify_token}"
+        with timed('apify'):
+            apify_res = http_clients.post(apify_url, json=apify_input)
+        APIFY_REQUESTS.inc(status=apify_res.status_code)
         if apify_res.status_code not in (200, 201):
             return jsonify({ 'success': False, 'error': f'Apify error: HTTP {apify_res.status_code}' }), 502
         items = apify_res.json()
 
-        # Groq analysis
-        from groq import Groq
-        groq_client = Groq(api_key=groq_api_key)
-
-        def analyze_comment(text: str):
-            prompt = (
-                "Analyze the following social media comment for toxicity, threats, and harassment.\n"
-                "Provide a JSON response with the following structure:\n"
-                "{\n"
-                "  \"toxicity_level\": \"low/medium/high\",\n"
-                "  \"threat_level\": \"none/low/medium/high\",\n"
-                "  \"harassment_level\": \"none/low/medium/high\",\n"
-                "  \"overall_safety\": \"safe/concerning/dangerous\",\n"
-                "  \"explanation\": \"brief explanation of the analysis\"\n"
-                "}\n\n"
-                f"Comment to analyze: \"{text}\"\n\n"
-                "Respond only with valid JSON."
-            )
-            try:
-                resp = groq_client.chat.completions.create(
-                    messages=[{ "role": "user", "content": prompt }],
-                    model="llama-3.1-8b-instant",
-                    temperature=0.1,
-                    max_tokens=200
-                )
-                content = resp.choices[0].message.content
-                return _json.loads(content)
-            except Exception:
-                return {
-                    "toxicity_level": "unknown",
-                    "threat_level": "unknown",
-                    "harassment_level": "unknown",
-                    "overall_safety": "unknown",
-                    "explanation": "Analysis failed"
-                }
-
+        # Collect comments first, then classify them in concurrent batches;
+        # threads and times only feed the network. Replies past replies_limit
+        # are not classified but their authors still join the network.
         comments = []
+        threads = []
+        times = []
+        linked_authors = []
+        linked_threads = []
+        linked_times = []
         count = 0
+        replies = 0
         max_total = comments_limit
         for it in items:
             if count >= max_total:
@@ -158,21 +658,80 @@ def instagram_analyze():
             for c in latest:
                 if count >= max_total:
                     break
-                username_c = c.get('ownerUsername') or 'Unknown'
-                text = c.get('text') or ''
-                analysis = analyze_comment(text) if text.strip() else {
-                    "toxicity_level": "none",
-                    "threat_level": "none",
-                    "harassment_level": "none",
-                    "overall_safety": "safe",
-                    "explanation": "Empty comment"
-                }
                 comments.append({
-                    'username': username_c,
-                    'text': text,
-                    'toxicity_analysis': analysis
+                    'username': c.get('ownerUsername') or 'Unknown',
+                    'text': c.get('text') or ''
                 })
+                threads.append(c.get('id'))
+                times.append(c.get('timestamp'))
                 count += 1
+                # Replies share their parent's thread, which links their authors in the network
+                for reply in c.get('replies') or []:
+                    if replies >= replies_limit:
+                        linked_authors.append(reply.get('ownerUsername') or 'Unknown')
+                        linked_threads.append(c.get('id'))
+                        linked_times.append(reply.get('timestamp'))
+                        continue
+                    comments.append({
+                        'username': reply.get('ownerUsername') or 'Unknown',
+                        'text': reply.get('text') or '',
+                        'reply_to': c.get('ownerUsername') or 'Unknown'
+                    })
+                    threads.append(c.get('id'))
+                    times.append(reply.get('timestamp'))
+                    replies += 1
+
+        # Groq analysis
+        groq_client = http_clients.groq(groq_api_key, DEFAULT_GROQ_BASE_URL)
+        classifier = ToxicityClassifier(
+            groq_client,
+            batch_size=int(data.get('llm_batch_size', DEFAULT_GROQ_BATCH_SIZE)),
+            workers=int(data.get('llm_workers', DEFAULT_GROQ_WORKERS)),
+            cache=verdict_cache
+        )
+
+        # Local triage decides the clear cases; only the uncertain band goes to the LLM
+        texts = [c['text'] for c in comments]
+        scored = [i for i, text in enumerate(texts) if text.strip()]
+        if triage_model is not None and data.get('triage', True) not in (False, 0, '0', 'false'):
+            low = float(data.get('triage_low', TRIAGE_LOW))
+            high = float(data.get('triage_high', TRIAGE_HIGH))
+            llm_fraction = float(data.get('llm_fraction', TRIAGE_LLM_FRACTION))
+            with timed('triage'):
+                scores = triage_model.score([texts[i] for i in scored])
+                decisions = route(scores, low, high, llm_fraction)
+            for decision in DECISIONS:
+                TRIAGE_DECISIONS.inc(decisions.count(decision), decision=decision)
+            triage = cascade_stats(decisions, low, high, llm_fraction)
+        else:
+            scores = None
+            decisions = ['llm'] * len(scored)
+            triage = {'enabled': False, 'scored': 0, 'forwarded': len(scored),
+                      'forwarded_fraction': 1.0 if scored else 0.0}
+
+        analyses = [None] * len(texts)
+        forward = [i for i, decision in zip(scored, decisions) if decision == 'llm']
+        # Empty comments get their verdict from the classifier without an LLM call
+        forward += [i for i, text in enumerate(texts) if not text.strip()]
+        if forward:
+            with timed('llm_classify'):
+                for i, analysis in zip(forward, classifier.classify([texts[i] for i in forward])):
+                    analyses[i] = analysis
+        for position, (i, decision) in enumerate(zip(scored, decisions)):
+            if decision != 'llm':
+                analyses[i] = local_verdict(scores[position], decision)
+            if scores is not None:
+                analyses[i]['triage_score'] = round(float(scores[position]), 4)
+        for c, analysis in zip(comments, analyses):
+            c['toxicity_analysis'] = analysis
+
+        with timed('network'):
+            network = build_graph(
+                [c['username'] for c in comments] + linked_authors,
+                find_similar_groups(texts, min_size=2),
+                threads=threads + linked_threads,
+                times=times + linked_times
+            ).to_dict(NETWORK_NODES)
 
         # Summarize into app format (minimal threat view)
         high_or_medium = [c for c in comments if (c['toxicity_analysis'].get('toxicity_level') in ('medium','high') or c['toxicity_analysis'].get('harassment_level') in ('medium','high'))]
@@ -192,7 +751,7 @@ def instagram_analyze():
                 'hate': len(high_or_medium)
             },
             'timeline': [],
-            'network': { 'nodes': [], 'edges': [] },
+            'network': network,
             'flagged': flagged,
             'scanId': 'ig_' + (username or 'post')
         }
@@ -223,10 +782,19 @@ def instagram_analyze():
             }]
         }
 
-        return jsonify({ 'success': True, 'comments': comments, 'app_data': app_data })
+        classification = dict(classifier.stats, cache=verdict_cache.stats())
+
+        response = { 'success': True, 'comments': comments, 'app_data': app_data, 'classification': classification,
+                     'triage': triage }
+        if wants_timings(data):
+            response['timings'] = g.timings.to_dict()
+        return jsonify(response)
+    except ValueError as e:
+        return jsonify({ 'success': False, 'error': str(e) }), 400
     except Exception as e:
         return jsonify({ 'success': False, 'error': str(e) }), 500
 @app.route('/api/scrape', methods=['POST'])
+@profiled
 def scrape_comments():
     """Scrape comments from a YouTube video"""
     try:
@@ -248,15 +816,20 @@ def scrape_comments():
                 'error': 'Invalid YouTube URL or video ID'
             }), 400
         
-        comments = analyzer.scrape_comments(video_id, limit)
+        comments = analyzer.scrape_comments(video_id, limit, data.get('use_store', True))
         
-        return jsonify({
+        return shaped_response({
             'success': True,
             'video_id': video_id,
             'comments': comments,
             'total': len(comments)
-        })
+        }, data)
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -264,6 +837,7 @@ def scrape_comments():
         }), 500
 
 @app.route('/api/detect-bots', methods=['POST'])
+@profiled
 def detect_bots():
     """Detect bot comments"""
     try:
@@ -278,11 +852,19 @@ def detect_bots():
         comments = data['comments']
         bot_indicators = analyzer.detect_bot_comments(comments)
         
-        return jsonify({
+        response = {
             'success': True,
             'bot_indicators': bot_indicators,
             'total_bots': sum(indicator['count'] for indicator in bot_indicators if indicator['type'] in ['duplicate_text', 'similar_text'])
-        })
+        }
+        
+        # Optionally check the similarity index against the exact pairwise comparison
+        verify = data.get('verify_similarity')
+        if verify:
+            sample_size = verify if isinstance(verify, int) and not isinstance(verify, bool) else 500
+            response['similarity_verification'] = analyzer.verify_similarity(comments, sample_size)
+        
+        return jsonify(response)
         
     except Exception as e:
         return jsonify({
@@ -291,6 +873,7 @@ def detect_bots():
         }), 500
 
 @app.route('/api/detect-copyright', methods=['POST'])
+@profiled
 def detect_copyright():
     """Detect copyright violations"""
     try:
@@ -303,9 +886,10 @@ def detect_copyright():
             }), 400
         
         comments = data['comments']
-        keywords = data.get('keywords', [])
+        keywords = keyword_catalogs.resolve(data.get('keywords', []))
+        keyword_mode = data.get('keyword_mode', 'substring')
         
-        violations = analyzer.detect_copyright_violations(comments, keywords)
+        violations = analyzer.detect_copyright_violations(comments, keywords, keyword_mode=keyword_mode)
         
         return jsonify({
             'success': True,
@@ -313,6 +897,67 @@ def detect_copyright():
             'total': len(violations)
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/keyword-catalogs', methods=['GET'])
+def list_keyword_catalogs():
+    """List the preloaded keyword catalogs"""
+    return jsonify({
+        'success': True,
+        'catalogs': keyword_catalogs.summary()
+    })
+
+@app.route('/api/rules', methods=['GET'])
+def list_rules():
+    """List the detector rules currently loaded"""
+    rules = analyzer.patterns.rules
+    return jsonify({
+        'success': True,
+        'rules_file': analyzer.patterns.rules_file,
+        'rules': list(rules),
+        'total': len(rules)
+    })
+
+@app.route('/api/rules/reload', methods=['POST'])
+def reload_rules():
+    """Reload detector rules from the rules file, or (with the admin token) from the request body
+
+    Rules are validated and compiled before they replace the live ones.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if ADMIN_TOKEN is not None and not is_admin():
+            return jsonify({
+                'success': False,
+                'error': 'Reloading rules needs the admin token (AEGIS_ADMIN_TOKEN)'
+            }), 403
+        rules = data.get('rules')
+        if rules is not None and not is_admin():
+            return jsonify({
+                'success': False,
+                'error': 'Sending rules needs AEGIS_ADMIN_TOKEN; without it rules reload from AEGIS_RULES_FILE'
+            }), 403
+        total = analyzer.patterns.reload(rules)
+        
+        return jsonify({
+            'success': True,
+            'total': total
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -321,11 +966,13 @@ def detect_copyright():
 
 @app.route('/api/integrity-check', methods=['POST'])
 def integrity_check():
-    """Compute file hash and perform a mock leak search.
+    """Compute file hash and look it up in the local leak index.
 
-    Expects multipart/form-data with a single field 'file'. Returns SHA-256 and a
-    simulated leak status. In a real system you'd query your backend index or
-    external services for matches.
+    Expects multipart/form-data with a single field 'file'. Returns SHA-256 and
+    the sources the hash was ingested under, if any (see leak_index.py). In the
+    same pass the file is chunked and matched against the chunk index, which
+    reports protected assets it partially contains (see chunk_index.py).
+    Optional form field 'algorithms' adds sha1, md5 or blake2b digests.
     """
     try:
         if 'file' not in request.files:
@@ -335,46 +982,91 @@ def integrity_check():
             }), 400
 
         uploaded = request.files['file']
-        # Read content and compute SHA-256
-        import hashlib
-        hasher = hashlib.sha256()
+        algorithms = parse_algorithms(request.form.get('algorithms', ''))
+        # Chunking is skipped while no protected assets are indexed
+        check = FileCheck(
+            leak_index,
+            chunk_index if chunk_index.asset_count() else None,
+            algorithms,
+            PARTIAL_LEAK_THRESHOLD
+        )
         # Stream in chunks to support large files
         while True:
-            chunk = uploaded.stream.read(1024 * 1024)
+            chunk = uploaded.stream.read(READ_CHUNK_SIZE)
             if not chunk:
                 break
-            hasher.update(chunk)
-        sha256_hex = hasher.hexdigest()
-
-        # Mock leak search: simple heuristic using hash characteristics
-        # This is placeholder logic; replace with your actual search.
-        mock_leak_score = int(sha256_hex[:2], 16)  # 0-255
-        leaked = mock_leak_score > 200  # ~21% chance flagged
-        sources = []
-        if leaked:
-            sources = [
-                {
-                    'platform': 'Telegram',
-                    'url': 'https://t.me/suspected_channel/12345',
-                    'confidence': 92
-                },
-                {
-                    'platform': 'YouTube',
-                    'url': 'https://youtube.com/watch?v=example',
-                    'confidence': 81
-                }
-            ]
+            check.update(chunk)
+        result = check.result()
+        result['leak_check']['indexed_hashes'] = len(leak_index)
 
         return jsonify({
             'success': True,
-            'hash': {
-                'sha256': sha256_hex
-            },
-            'leak_check': {
-                'leaked': leaked,
-                'sources': sources
-            }
+            'hash': result['hash'],
+            'leak_check': result['leak_check']
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/integrity-check/batch', methods=['POST'])
+def integrity_check_batch():
+    """Check many files, or the members of zip/tar archives, streaming one NDJSON result per file
+
+    Expects multipart/form-data with one or more 'files' fields. Archives are
+    read member by member without extracting them; send expand_archives=false
+    to hash an archive as a single file. Optional 'algorithms' as above.
+    """
+    try:
+        uploads = request.files.getlist('files') + request.files.getlist('file')
+        if not uploads:
+            return jsonify({
+                'success': False,
+                'error': 'Missing file uploads (field name: files)'
+            }), 400
+
+        algorithms = parse_algorithms(request.form.get('algorithms', ''))
+        expand_archives = request.form.get('expand_archives', 'true').lower() != 'false'
+
+        # Take over the spooled upload streams: Flask closes the request's files
+        # when the view returns, before the response body is generated
+        streams = []
+        for f in uploads:
+            streams.append((f.filename, f.stream))
+            f.stream = io.BytesIO()
+
+        events = check_uploads(
+            streams, leak_index, chunk_index, algorithms,
+            workers=INTEGRITY_WORKERS,
+            partial_threshold=PARTIAL_LEAK_THRESHOLD,
+            expand_archives=expand_archives
+        )
+
+        def generate():
+            try:
+                for event in events:
+                    yield _json.dumps(event, ensure_ascii=False) + '\n'
+            finally:
+                for _, stream in streams:
+                    stream.close()
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -386,10 +1078,23 @@ if __name__ == '__main__':
     print("📡 Server running on http://localhost:5000")
     print("📋 Available endpoints:")
     print("   - GET  /api/health")
+    print("   - GET  /api/metrics")
     print("   - POST /api/analyze")
+    print("   - POST /api/analyze/stream")
+    print("   - POST /api/analyze-batch")
+    print("   - GET  /api/results/<result_id>")
+    print("   - GET  /api/profiles/<profile_id>")
+    print("   - GET  /api/jobs")
+    print("   - GET  /api/jobs/<job_id>")
+    print("   - DELETE /api/jobs/<job_id>")
     print("   - POST /api/scrape")
     print("   - POST /api/detect-bots")
     print("   - POST /api/detect-copyright")
+    print("   - GET  /api/keyword-catalogs")
+    print("   - GET  /api/rules")
+    print("   - POST /api/rules/reload")
+    print("   - POST /api/integrity-check")
+    print("   - POST /api/integrity-check/batch")
     print("\n✅ Server ready! Press Ctrl+C to stop.")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
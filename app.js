@@ -1027,9 +1027,12 @@ Legal Action Timeline: ${highSeverity > 0 ? 'IMMEDIATE' : mediumSeverity > 0 ? '
         v: Math.floor(Math.random()*50)+10 
       }));
       
-      // Build network from harassment authors
+      // Coordination graph from the backend; older servers only give harassment authors
       const uniqueAuthors = [...new Set(harassmentComments.map(h => h.author))].slice(0, 10);
-      const network = {
+      const network = ytResult.network ? {
+        nodes: ytResult.network.nodes,
+        edges: ytResult.network.edges
+      } : {
         nodes: uniqueAuthors.map((author, idx) => ({
           id: idx + 1,
           label: author,
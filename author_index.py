@@ -0,0 +1,323 @@
+"""Persistent cross-video index of comment authors.
+
+Each author is keyed by their channel ID (or by name when the scraper gave
+none) and carries running totals: comments and flagged comments per detector,
+the videos they commented on and were flagged on, and a bottom-k sketch of
+their comment texts. The sketch estimates how many distinct texts an author
+wrote, so an account pasting the same line under 40 videos stands out even
+though each video only sees it once.
+
+Totals are kept per (author, video) as well, so re-scanning a video replaces
+its contribution instead of counting it twice. Risk scores are stored with
+the totals and indexed, which keeps lookups and top-offender queries at a
+few milliseconds.
+"""
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from contextlib import contextmanager
+
+from preprocess import normalize_text
+
+DEFAULT_SKETCH_SIZE = 64
+DEFAULT_TOP = 20
+MAX_TOP = 500
+SORT_KEYS = ('risk', 'flagged_videos', 'flagged', 'videos')
+REASONS = ('bot', 'harassment', 'copyright')
+
+# Below this many comments the text sketch says little about repetition
+REPEAT_MIN_COMMENTS = 3
+
+# SQLite caps bound parameters per statement
+QUERY_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS authors (
+    key TEXT PRIMARY KEY,
+    author TEXT,
+    channel TEXT,
+    comments INTEGER DEFAULT 0,
+    flagged INTEGER DEFAULT 0,
+    bot INTEGER DEFAULT 0,
+    harassment INTEGER DEFAULT 0,
+    copyright INTEGER DEFAULT 0,
+    videos INTEGER DEFAULT 0,
+    flagged_videos INTEGER DEFAULT 0,
+    sketch BLOB,
+    risk REAL DEFAULT 0,
+    first_seen REAL,
+    last_seen REAL
+);
+CREATE INDEX IF NOT EXISTS idx_authors_risk ON authors (risk);
+CREATE INDEX IF NOT EXISTS idx_authors_author ON authors (author);
+CREATE TABLE IF NOT EXISTS author_videos (
+    key TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    comments INTEGER,
+    flagged INTEGER,
+    bot INTEGER,
+    harassment INTEGER,
+    copyright INTEGER,
+    updated REAL,
+    PRIMARY KEY (key, video_id)
+);
+CREATE INDEX IF NOT EXISTS idx_author_videos_video ON author_videos (video_id);
+"""
+
+COUNTS = ('comments', 'flagged') + REASONS
+
+
+def author_key(author, channel):
+    """Index key of an author: the channel ID, or the display name if there is none"""
+    return channel if channel else f'name:{author}'
+
+
+def text_fingerprint(text):
+    """32-bit hash of a comment's normalized text (see verdict_cache.normalize_text)"""
+    return zlib.crc32(normalize_text(text).encode('utf-8'))
+
+
+def merge_sketch(sketch, fingerprints, size=DEFAULT_SKETCH_SIZE):
+    """The `size` smallest distinct fingerprints of both"""
+    return sorted(set(sketch).union(fingerprints))[:size]
+
+
+def estimate_distinct(sketch, size=DEFAULT_SKETCH_SIZE):
+    """Distinct texts behind a bottom-k sketch (exact while it is not full)"""
+    if len(sketch) < size:
+        return len(sketch)
+    return int(round((size - 1) * 2 ** 32 / (sketch[-1] + 1)))
+
+
+def risk_score(comments, flagged, flagged_videos, distinct_texts):
+    """0-1 score of how likely an author is a repeat offender
+
+    Grows with the number of videos they were flagged on, is weighted by the
+    share of their comments that were flagged, and is raised further when
+    they keep posting the same texts.
+    """
+    if not flagged or not comments:
+        return 0.0
+    spread = 1 - 0.6 ** flagged_videos
+    score = spread * (0.5 + 0.5 * min(1.0, flagged / comments))
+    if comments >= REPEAT_MIN_COMMENTS:
+        repetition = 1 - min(distinct_texts, comments) / comments
+        score = 1 - (1 - score) * (1 - 0.5 * repetition)
+    return round(score, 4)
+
+
+def collect_activity(comments, flags):
+    """Per-author activity of one video's comments
+
+    `flags` maps a reason (bot, harassment, copyright) to the row indices
+    it flagged. Returns key -> dict of counts, author, channel and the
+    fingerprints of their texts.
+    """
+    flagged_rows = {}
+    for reason, rows in flags.items():
+        for row in rows:
+            flagged_rows.setdefault(row, set()).add(reason)
+
+    activity = {}
+    authors = comments.authors
+    channels = comments.channels
+    for row, text in enumerate(comments.texts()):
+        author = authors[row]
+        channel = channels[row]
+        key = author_key(author, channel)
+        entry = activity.get(key)
+        if entry is None:
+            entry = activity[key] = {
+                'author': author, 'channel': channel, 'fingerprints': set(),
+                'comments': 0, 'flagged': 0, 'bot': 0, 'harassment': 0, 'copyright': 0
+            }
+        entry['comments'] += 1
+        entry['fingerprints'].add(text_fingerprint(text))
+        reasons = flagged_rows.get(row)
+        if reasons:
+            entry['flagged'] += 1
+            for reason in reasons:
+                entry[reason] += 1
+    return activity
+
+
+def _author_dict(row, size):
+    (key, author, channel, comments, flagged, bot, harassment, copyright, videos, flagged_videos,
+     sketch, risk, first_seen, last_seen) = row
+    distinct = estimate_distinct(array('I', sketch or b''), size)
+    return {
+        'key': key,
+        'author': author,
+        'channel': channel,
+        'risk': risk,
+        'comments': comments,
+        'flagged': flagged,
+        'flags': {'bot': bot, 'harassment': harassment, 'copyright': copyright},
+        'videos': videos,
+        'flagged_videos': flagged_videos,
+        'distinct_texts': min(distinct, comments),
+        'first_seen': first_seen,
+        'last_seen': last_seen
+    }
+
+
+class AuthorIndex:
+    """SQLite-backed author index shared by all request threads"""
+
+    def __init__(self, path, sketch_size=DEFAULT_SKETCH_SIZE):
+        self.path = path
+        self.sketch_size = sketch_size
+        self._write_lock = threading.Lock()
+        self._ready = False  # the database file and schema are created on first use
+
+    @classmethod
+    def from_env(cls):
+        """Index at AEGIS_AUTHOR_DB (default aegis_authors.db), or None if it is set empty"""
+        path = os.environ.get('AEGIS_AUTHOR_DB', 'aegis_authors.db')
+        if not path:
+            return None
+        return cls(path, int(os.environ.get('AEGIS_AUTHOR_SKETCH', DEFAULT_SKETCH_SIZE)))
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            if not self._ready:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(SCHEMA)
+                self._ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _select(self, conn, sql, keys, *params):
+        """Rows of `sql` (with a `{keys}` placeholder list) for all keys, in chunks"""
+        rows = []
+        for start in range(0, len(keys), QUERY_CHUNK):
+            chunk = keys[start:start + QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows.extend(conn.execute(sql.format(keys=placeholders), (*params, *chunk)).fetchall())
+        return rows
+
+    def record_video(self, video_id, activity, replace=True):
+        """Add one video's activity (from collect_activity); returns key -> risk
+
+        With `replace` the activity is everything the scan saw of the video,
+        and replaces what was recorded for it before. Otherwise it only holds
+        comments that were never recorded (an incremental delta) and is added.
+        """
+        if not activity:
+            return {}
+        keys = list(activity)
+        now = time.time()
+        with self._write_lock, self._connect() as conn:
+            previous = {
+                row[0]: dict(zip(COUNTS, row[1:]))
+                for row in self._select(
+                    conn,
+                    'SELECT key, comments, flagged, bot, harassment, copyright FROM author_videos '
+                    'WHERE video_id = ? AND key IN ({keys})', keys, video_id)
+            }
+            totals = {
+                row[0]: row
+                for row in self._select(
+                    conn,
+                    'SELECT key, comments, flagged, bot, harassment, copyright, videos, flagged_videos, '
+                    'sketch, first_seen FROM authors WHERE key IN ({keys})', keys)
+            }
+
+            video_rows = []
+            author_rows = []
+            risks = {}
+            for key, entry in activity.items():
+                old = previous.get(key)
+                if old is None or replace:
+                    new = {name: entry[name] for name in COUNTS}
+                else:
+                    new = {name: old[name] + entry[name] for name in COUNTS}
+                video_rows.append((key, video_id, *(new[name] for name in COUNTS), now))
+
+                total = totals.get(key)
+                if total is None:
+                    counts = dict.fromkeys(COUNTS, 0)
+                    videos = flagged_videos = 0
+                    sketch = ()
+                    first_seen = now
+                else:
+                    counts = dict(zip(COUNTS, total[1:6]))
+                    videos, flagged_videos = total[6], total[7]
+                    sketch = array('I', total[8] or b'')
+                    first_seen = total[9]
+                for name in COUNTS:
+                    counts[name] += new[name] - (old[name] if old else 0)
+                if old is None:
+                    videos += 1
+                flagged_videos += (new['flagged'] > 0) - (old is not None and old['flagged'] > 0)
+                sketch = merge_sketch(sketch, entry['fingerprints'], self.sketch_size)
+                risk = risk_score(counts['comments'], counts['flagged'], flagged_videos,
+                                  estimate_distinct(sketch, self.sketch_size))
+                risks[key] = risk
+                author_rows.append((
+                    key, entry['author'], entry['channel'], *(counts[name] for name in COUNTS),
+                    videos, flagged_videos, array('I', sketch).tobytes(), risk, first_seen, now
+                ))
+
+            conn.executemany(
+                'INSERT OR REPLACE INTO author_videos '
+                '(key, video_id, comments, flagged, bot, harassment, copyright, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', video_rows
+            )
+            conn.executemany(
+                'INSERT OR REPLACE INTO authors '
+                '(key, author, channel, comments, flagged, bot, harassment, copyright, videos, flagged_videos, '
+                'sketch, risk, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                author_rows
+            )
+        return risks
+
+    def get(self, key):
+        """Totals of one author, or None if they were never seen"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM authors WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            author = _author_dict(row, self.sketch_size)
+            author['video_ids'] = [
+                video_id for (video_id,) in conn.execute(
+                    'SELECT video_id FROM author_videos WHERE key = ? ORDER BY flagged DESC, updated DESC',
+                    (key,))
+            ]
+        return author
+
+    def risks_by_name(self, names):
+        """Display name -> highest risk among the authors using it, for the names that are indexed"""
+        names = list(set(names))
+        if not names:
+            return {}
+        with self._connect() as conn:
+            rows = self._select(conn, 'SELECT author, MAX(risk) FROM authors WHERE author IN ({keys}) '
+                                      'GROUP BY author', names)
+        return dict(rows)
+
+    def top(self, limit=DEFAULT_TOP, sort='risk', min_videos=1):
+        """Flagged authors ordered by `sort`, highest first"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort '{sort}' (use {', '.join(SORT_KEYS)})")
+        limit = max(1, min(int(limit), MAX_TOP))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f'SELECT * FROM authors WHERE flagged > 0 AND flagged_videos >= ? '
+                f'ORDER BY {sort} DESC, risk DESC, key LIMIT ?', (int(min_videos), limit)
+            ).fetchall()
+        return [_author_dict(row, self.sketch_size) for row in rows]
+
+    def stats(self):
+        with self._connect() as conn:
+            authors, flagged, repeat = conn.execute(
+                'SELECT COUNT(*), SUM(flagged > 0), SUM(flagged_videos > 1) FROM authors'
+            ).fetchone()
+        return {'authors': authors, 'flagged_authors': flagged or 0, 'repeat_offenders': repeat or 0}
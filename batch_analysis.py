@@ -0,0 +1,172 @@
+"""Analysis of many videos at once, e.g. a creator's whole channel.
+
+Scraping is network-bound and fans out over a thread pool. Each video's
+comments are handed to a process pool as soon as they arrive, so the
+detectors run in parallel instead of queueing behind the GIL. The
+per-video results are combined into one cross-video aggregate.
+"""
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from preprocess import normalize_text
+from youtube_analyzer import YouTubeAnalyzer
+
+DEFAULT_SCRAPE_WORKERS = 4
+DEFAULT_PROCESSES = os.cpu_count() or 1
+TOP_AGGREGATE_ITEMS = 20
+
+# Analyzer of a detector process, built by _init_worker
+_worker_analyzer = None
+
+
+def _init_worker(rules, triage=None):
+    """Process pool initializer: an analyzer using the parent's current rules and triage model"""
+    global _worker_analyzer
+    _worker_analyzer = YouTubeAnalyzer()
+    _worker_analyzer.patterns.load(rules)
+    _worker_analyzer.triage = triage
+
+
+def _analyze_in_worker(video_id, comments, keywords, keyword_mode):
+    return _worker_analyzer.analyze_comments(video_id, comments, keywords, keyword_mode)
+
+
+def analyze_batch(analyzer, videos, keywords=None, limit=200, keyword_mode='substring', use_store=True,
+                  scrape_workers=DEFAULT_SCRAPE_WORKERS, processes=DEFAULT_PROCESSES):
+    """Analyze a list of video IDs/URLs; returns per-video results and an aggregate
+
+    With `processes=0` the detectors run in the calling process.
+    """
+    results = {}
+    invalid = []  # (entry, result); entries can be anything the request body held
+    video_ids = []
+    for video in videos:
+        video_id = analyzer.extract_video_id(video.strip()) if isinstance(video, str) else None
+        if not video_id:
+            invalid.append((video, {'success': False, 'error': 'Invalid YouTube URL or video ID'}))
+        elif video_id not in video_ids:
+            video_ids.append(video_id)
+
+    print(f"📚 Batch analysis of {len(video_ids)} videos")
+    pool = None
+    if processes and len(video_ids) > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=min(processes, len(video_ids)),
+            initializer=_init_worker,
+            initargs=(analyzer.patterns.rules, analyzer.triage)
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, scrape_workers)) as scrapers:
+            scrapes = {
+                scrapers.submit(analyzer.scrape_comments, video_id, limit, use_store): video_id
+                for video_id in video_ids
+            }
+
+            analyses = {}
+            for future in as_completed(scrapes):
+                video_id = scrapes[future]
+                comments = future.result()
+                if not comments:
+                    results[video_id] = {'success': False, 'error': 'No comments found or unable to scrape'}
+                elif pool is None:
+                    results[video_id] = analyzer.analyze_comments(video_id, comments, keywords, keyword_mode)
+                else:
+                    analyses[pool.submit(_analyze_in_worker, video_id, comments, keywords, keyword_mode)] = video_id
+
+        for future in as_completed(analyses):
+            video_id = analyses[future]
+            try:
+                # Detector processes have no author index, so their results are recorded here
+                results[video_id] = analyzer.record_authors(future.result())
+            except Exception as e:
+                results[video_id] = {'success': False, 'error': str(e)}
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # Keep the caller's order: valid videos first, then the ones that could not be parsed
+    ordered = [dict(results.pop(video_id), video_id=video_id) for video_id in video_ids]
+    ordered.extend(dict(result, video=video) for video, result in invalid)
+
+    return {
+        'success': True,
+        'timestamp': datetime.now().isoformat(),
+        'videos': ordered,
+        'aggregate': aggregate_results(ordered)
+    }
+
+
+def _flagged_authors(result):
+    """Map author -> set of reasons they were flagged in one video's result"""
+    flagged = {}
+    for indicator in result['bot_indicators']:
+        if indicator['type'] in ('duplicate_text', 'similar_text'):
+            for author in indicator['authors']:
+                flagged.setdefault(author, set()).add('bot')
+    for comment in result['harassment_comments']:
+        flagged.setdefault(comment['author'], set()).add('harassment')
+    for violation in result['copyright_violations']:
+        flagged.setdefault(violation['author'], set()).add('copyright')
+    return flagged
+
+
+def aggregate_results(results, top=TOP_AGGREGATE_ITEMS):
+    """Cross-video totals, most repeated texts and authors flagged on several videos"""
+    analyzed = [r for r in results if r.get('success')]
+
+    text_counts = Counter()
+    text_videos = {}
+    author_videos = {}
+    author_reasons = {}
+    for result in analyzed:
+        video_id = result['video_id']
+        for text in result['comments'].texts():
+            text = normalize_text(text)
+            if text:
+                text_counts[text] += 1
+                text_videos.setdefault(text, set()).add(video_id)
+        for author, reasons in _flagged_authors(result).items():
+            author_videos.setdefault(author, set()).add(video_id)
+            author_reasons.setdefault(author, Counter()).update(reasons)
+
+    repeated_texts = [
+        {
+            'text': text[:100],
+            'count': count,
+            'videos': len(text_videos[text]),
+            'video_ids': sorted(text_videos[text])
+        }
+        for text, count in text_counts.most_common()
+        if count > 1
+    ]
+    repeated_texts.sort(key=lambda t: (-t['videos'], -t['count']))
+
+    repeat_authors = sorted(
+        (
+            {
+                'author': author,
+                'videos': len(video_ids),
+                'video_ids': sorted(video_ids),
+                'flags': dict(author_reasons[author])
+            }
+            for author, video_ids in author_videos.items()
+            if len(video_ids) > 1
+        ),
+        key=lambda a: (-a['videos'], a['author'])
+    )
+
+    return {
+        'videos_requested': len(results),
+        'videos_analyzed': len(analyzed),
+        'videos_failed': len(results) - len(analyzed),
+        'total_comments': sum(r['statistics']['total_comments'] for r in analyzed),
+        'bot_comments': sum(r['statistics']['bot_comments'] for r in analyzed),
+        'harassment_comments': sum(r['statistics']['harassment_comments'] for r in analyzed),
+        'copyright_violations': sum(r['statistics']['copyright_violations'] for r in analyzed),
+        'threat_levels': dict(Counter(r['statistics']['threat_level'] for r in analyzed)),
+        'top_repeated_texts': repeated_texts[:top],
+        'repeat_flagged_authors': repeat_authors[:top]
+    }
@@ -0,0 +1,161 @@
+"""Detector benchmarks on synthetic comments.
+
+Times detect_bot_comments, detect_harassment, detect_copyright_violations
+and a full analyze_video (scraping served by a CorpusDownloader, no network
+or comment store) at each corpus size, and records the peak traced memory of
+each case in a separate run, since tracing slows everything down.
+
+Results can be saved as a baseline and later runs compared against it; the
+comparison exits with status 1 when a case got slower or bigger than the
+threshold allows:
+
+    python bench_detectors.py --save bench_baseline.json
+    python bench_detectors.py --compare bench_baseline.json
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from comment_batch import CommentBatch
+from comment_corpus import CorpusDownloader, DEFAULT_RATIOS, generate_comments
+from youtube_analyzer import YouTubeAnalyzer
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_KEYWORDS = ('movie', 'trailer', 'leak')
+DEFAULT_THRESHOLD = 0.2
+CASES = ('detect_bot_comments', 'detect_harassment', 'detect_copyright_violations', 'analyze_video')
+
+
+def _cases(analyzer, comments, keywords, size, seed, ratios):
+    """Callables for each case; every one starts from scraped comments like an API request would"""
+    downloader = CorpusDownloader(size, seed, **ratios)
+
+    def analyze_video():
+        analyzer.downloader = downloader
+        return analyzer.analyze_video('benchmark01', keywords, size, use_store=False)
+
+    return {
+        'detect_bot_comments': lambda: analyzer.detect_bot_comments(comments),
+        'detect_harassment': lambda: analyzer.detect_harassment(comments),
+        'detect_copyright_violations': lambda: analyzer.detect_copyright_violations(comments, keywords),
+        'analyze_video': analyze_video,
+    }
+
+
+def measure(fn, repeat=1, memory=True):
+    """(best wall seconds over `repeat` runs, peak traced MB of one more run or None)"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def run(sizes, cases=CASES, repeat=1, memory=True, seed=0, keywords=DEFAULT_KEYWORDS, ratios=None):
+    """Benchmark results as a list of {size, case, seconds, peak_mb}"""
+    ratios = dict(DEFAULT_RATIOS, **(ratios or {}))
+    analyzer = YouTubeAnalyzer()
+    results = []
+    for size in sizes:
+        comments = CommentBatch(generate_comments(size, f'{seed}:benchmark01', **ratios))
+        available = _cases(analyzer, comments, list(keywords), size, seed, ratios)
+        for case in cases:
+            with contextlib.redirect_stdout(io.StringIO()):
+                seconds, peak = measure(available[case], repeat, memory)
+            results.append({'size': size, 'case': case, 'seconds': seconds, 'peak_mb': peak})
+            peak_text = f'{peak:>9.1f} MB' if peak is not None else f"{'-':>12}"
+            print(f'{size:>8} {case:<30} {seconds:>9.3f} s {peak_text}', flush=True)
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Print each case against the baseline; returns the regressed cases"""
+    previous = {(r['size'], r['case']): r for r in baseline['results']}
+    regressions = []
+    print(f"\n📊 Compared with baseline from {baseline.get('created', '?')} (threshold +{threshold:.0%})")
+    for result in results:
+        old = previous.get((result['size'], result['case']))
+        if old is None:
+            continue
+        changes = []
+        regressed = False
+        for key, unit in (('seconds', 's'), ('peak_mb', 'MB')):
+            if result[key] is None or not old.get(key):
+                continue
+            change = result[key] / old[key] - 1
+            changes.append(f'{key} {old[key]:.3f} -> {result[key]:.3f} {unit} ({change:+.0%})')
+            regressed |= change > threshold
+        mark = '❌' if regressed else '✅'
+        print(f"{mark} {result['size']:>8} {result['case']:<30} {', '.join(changes)}")
+        if regressed:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the comment detectors on synthetic corpora')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Comma-separated corpus sizes (default: 1000,10000,100000)')
+    parser.add_argument('--cases', default=','.join(CASES), help='Comma-separated cases to run')
+    parser.add_argument('--repeat', type=int, default=1, help='Timed runs per case; the best one counts')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='Skip the traced-memory runs')
+    for name, default in DEFAULT_RATIOS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default)
+    parser.add_argument('--save', metavar='FILE', help='Write the results as a baseline')
+    parser.add_argument('--compare', metavar='FILE', help='Compare against a saved baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed relative slowdown/growth before a case counts as a regression')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    cases = [c.strip() for c in args.cases.split(',') if c.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(sorted(unknown))} (use {', '.join(CASES)})")
+    ratios = {name: getattr(args, name) for name in DEFAULT_RATIOS}
+
+    print(f"⏱️ Benchmarking {', '.join(cases)} at {', '.join(map(str, sizes))} comments")
+    results = run(sizes, cases, args.repeat, not args.no_memory, args.seed, ratios=ratios)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': args.seed,
+                'ratios': ratios,
+                'results': results
+            }, f, indent=2)
+        print(f"\n💾 Baseline saved to: {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
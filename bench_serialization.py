@@ -0,0 +1,82 @@
+"""Benchmark of analysis response sizes and JSON encode/compression times.
+
+Analyzes a synthetic comment corpus (comment_corpus.py) once, then encodes
+the result the way the API used to (json module, ASCII-escaped, sorted keys)
+and the way it does now (orjson when installed), for the full result and the
+shaped variants (`fields=flags`, `fields=statistics`, first page of 100),
+with the gzip and brotli sizes of each.
+
+    python bench_serialization.py --comments 20000
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import time
+
+from comment_batch import CommentBatch
+from comment_corpus import generate_comments
+from response_shaping import (_default, encode_json, parse_fields, shape_result, brotli, orjson,
+                              BROTLI_QUALITY, GZIP_LEVEL)
+from youtube_analyzer import YouTubeAnalyzer
+
+
+def timed(fn, repeat):
+    """(best time in ms, value) over `repeat` runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analysis response size and serialization time')
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    comments = CommentBatch(generate_comments(args.comments))
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = YouTubeAnalyzer().analyze_comments('benchmark01', comments, ['movie', 'leak'])
+
+    variants = [
+        ('full', result),
+        ('fields=flags', shape_result(result, parse_fields('flags'))),
+        ('fields=statistics', shape_result(result, parse_fields('statistics'))),
+        ('page_size=100', shape_result(result, None, 100, 'bench')),
+    ]
+
+    print(f"📊 {args.comments} comments, encoder: {'orjson' if orjson else 'json'}, "
+          f"brotli: {'yes' if brotli else 'not installed'}")
+    print(f"{'variant':<18} {'json ms':>8} {'fast ms':>8} {'bytes':>10} {'gzip':>9} {'gzip ms':>8} "
+          f"{'br':>9} {'br ms':>7}")
+
+    baseline = None
+    for name, payload in variants:
+        old_ms, old = timed(lambda: json.dumps(payload, default=_default, sort_keys=True), args.repeat)
+        new_ms, new = timed(lambda: encode_json(payload, sort_keys=True), args.repeat)
+        data = new.encode('utf-8')
+        gzip_ms, gzipped = timed(lambda: gzip.compress(data, compresslevel=GZIP_LEVEL), args.repeat)
+        smallest = len(gzipped)
+        if brotli:
+            br_ms, compressed = timed(lambda: brotli.compress(data, quality=BROTLI_QUALITY), args.repeat)
+            br = f'{len(compressed):>9} {br_ms:>7.1f}'
+            smallest = min(smallest, len(compressed))
+        else:
+            br = f"{'-':>9} {'-':>7}"
+        print(f'{name:<18} {old_ms:>8.1f} {new_ms:>8.1f} {len(data):>10} {len(gzipped):>9} {gzip_ms:>8.1f} {br}')
+
+        if baseline is None:
+            baseline = (len(old.encode('utf-8')), smallest, old_ms, new_ms)
+
+    old_size, smallest, old_ms, new_ms = baseline
+    print(f"\n✅ Full result: {old_size} bytes before, {smallest} compressed ({old_size / smallest:.1f}x smaller); "
+          f"encoded in {new_ms:.1f} ms instead of {old_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""Content-defined chunk fingerprints for finding partial file leaks.
+
+Files are cut into chunks where a gear rolling hash hits a mask (FastCDC
+style, with normalized chunking), so boundaries follow the content: a
+trimmed, re-muxed or re-headed copy of a protected file still shares most
+chunks with the original. Each chunk is fingerprinted with BLAKE2b and the
+fingerprints of protected assets are kept in an SQLite inverted index.
+
+The chunker is fed the same buffers that are hashed for the whole-file
+digest, keeps no chunk data, and only matched fingerprints are remembered,
+so memory stays bounded for multi-GB uploads.
+
+    python chunk_index.py ingest --name "Episode 1" --platform Studio ./masters/ep01.mp4
+    python chunk_index.py match ./suspect.mp4
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import numpy as np
+except ImportError:  # chunking falls back to a pure-Python loop
+    np = None
+
+DEFAULT_CHUNK_DB = 'aegis_chunks.db'
+MIN_CHUNK_SIZE = 4 * 1024
+AVG_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 64 * 1024
+FINGERPRINT_SIZE = 16
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Fingerprints looked up per query while matching
+LOOKUP_BATCH = 500
+# Candidates below this containment are not reported
+MIN_CONTAINMENT = 0.05
+TOP_CANDIDATES = 10
+
+_MASK64 = (1 << 64) - 1
+
+# Deterministic gear table: one 64-bit value per byte value
+GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], 'big') for i in range(256)]
+GEAR_WINDOW = 64
+_GEAR_NP = np.array(GEAR, dtype=np.uint64) if np is not None else None
+# Smaller buffers are cheaper to hash in the Python loop
+NUMPY_MIN_BUFFER = 4096
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    platform TEXT,
+    url TEXT,
+    sha256 TEXT,
+    size INTEGER,
+    chunk_count INTEGER,
+    added REAL
+);
+CREATE INDEX IF NOT EXISTS idx_assets_sha256 ON assets (sha256);
+CREATE TABLE IF NOT EXISTS chunks (
+    fingerprint BLOB NOT NULL,
+    asset_id INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (fingerprint, asset_id)
+) WITHOUT ROWID;
+"""
+
+
+def _top_bits_mask(bits):
+    # The high bits of a gear hash depend on the last 64 bytes, the low ones on only a few
+    return ((1 << bits) - 1) << (64 - bits)
+
+
+class ContentChunker:
+    """Incremental FastCDC chunker; feed it buffers, get (fingerprint, size) pairs.
+
+    The gear hash at a byte covers the 64 bytes ending there, so cut points
+    only depend on nearby content. A chunk of length L ends after a byte whose
+    hash has no bits set under the small mask (min_size <= L < avg_size) or
+    the large mask (avg_size <= L < max_size), or at max_size. With NumPy the
+    hashes of a whole buffer are computed at once; the pure-Python loop gives
+    the same chunks.
+    """
+
+    def __init__(self, min_size=MIN_CHUNK_SIZE, avg_size=AVG_CHUNK_SIZE, max_size=MAX_CHUNK_SIZE):
+        if not GEAR_WINDOW <= min_size < avg_size < max_size:
+            raise ValueError(f'Chunk sizes must satisfy {GEAR_WINDOW} <= min_size < avg_size < max_size')
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        bits = avg_size.bit_length() - 1
+        # Normalized chunking: harder to cut before the average size, easier after
+        self.mask_small = _top_bits_mask(bits + 2)
+        self.mask_large = _top_bits_mask(bits - 2)
+        self._hash = 0
+        self._length = 0
+        self._tail = b''   # last bytes of the previous buffer, for the hash window
+        self._digest = hashlib.blake2b(digest_size=FINGERPRINT_SIZE)
+
+    def _emit(self):
+        chunk = (self._digest.digest(), self._length)
+        self._hash = 0
+        self._length = 0
+        self._digest = hashlib.blake2b(digest_size=FINGERPRINT_SIZE)
+        return chunk
+
+    def update(self, data):
+        """Consume a buffer; return the chunks completed within it"""
+        if np is not None and len(data) >= NUMPY_MIN_BUFFER:
+            chunks = self._update_numpy(data)
+        else:
+            chunks = self._update_python(data)
+        self._tail = bytes(data[-(GEAR_WINDOW - 1):]) if len(data) >= GEAR_WINDOW - 1 \
+            else (self._tail + bytes(data))[-(GEAR_WINDOW - 1):]
+        return chunks
+
+    def _update_python(self, data):
+        chunks = []
+        gear = GEAR
+        view = memoryview(data)
+        end = len(view)
+        warmup = self.min_size - GEAR_WINDOW
+        start = 0  # start in data of the part of the current chunk not yet digested
+        i = 0
+
+        while i < end:
+            length = self._length
+            # Hashes before min_size are never checked, so skip to the window feeding the first one
+            if length < warmup:
+                step = min(warmup - length, end - i)
+                i += step
+                self._length += step
+                continue
+
+            h = self._hash
+            if length < self.min_size - 1:
+                stop = min(end, i + self.min_size - 1 - length)
+                for byte in view[i:stop]:
+                    h = ((h << 1) + gear[byte]) & _MASK64
+                self._hash = h
+                self._length += stop - i
+                i = stop
+                continue
+
+            # Check each byte with the mask for the chunk length it would end
+            if length < self.avg_size - 1:
+                mask, limit = self.mask_small, self.avg_size - 1
+            else:
+                mask, limit = self.mask_large, self.max_size
+            stop = min(end, i + limit - length)
+            j = i
+            cut = False
+            for byte in view[i:stop]:
+                h = ((h << 1) + gear[byte]) & _MASK64
+                j += 1
+                if not h & mask:
+                    cut = True
+                    break
+
+            self._hash = h
+            self._length = length + (j - i)
+            i = j
+            if cut or self._length >= self.max_size:
+                self._digest.update(view[start:i])
+                start = i
+                chunks.append(self._emit())
+
+        if start < end:
+            self._digest.update(view[start:end])
+        return chunks
+
+    def _update_numpy(self, data):
+        """Same cut points as _update_python, with the buffer's hashes computed in bulk"""
+        view = memoryview(data)
+        tail = self._tail
+        h = _GEAR_NP[np.frombuffer(tail + bytes(view), dtype=np.uint8)]
+
+        # Window sums by doubling: after the step for w, h[p] covers bytes p-2w+1..p
+        w = 1
+        while w < GEAR_WINDOW:
+            h[w:] += h[:-w] << np.uint64(w)
+            w *= 2
+        h = h[len(tail):]
+
+        small = np.flatnonzero((h & np.uint64(self.mask_small)) == 0)
+        large = np.flatnonzero((h & np.uint64(self.mask_large)) == 0)
+
+        chunks = []
+        end = len(view)
+        start = 0
+        # Position in this buffer where the current chunk began (may be negative)
+        chunk_start = -self._length
+        while True:
+            lo = chunk_start + self.min_size - 1
+            mid = chunk_start + self.avg_size - 1
+            hi = chunk_start + self.max_size - 1
+            cut = None
+
+            k = np.searchsorted(small, max(lo, 0))
+            if k < len(small) and small[k] < mid:
+                cut = int(small[k])
+            elif mid <= end:
+                k = np.searchsorted(large, max(mid, 0))
+                if k < len(large) and large[k] <= hi:
+                    cut = int(large[k])
+                elif hi < end:
+                    cut = hi
+            if cut is None:
+                break
+
+            self._digest.update(view[start:cut + 1])
+            self._length = cut + 1 - chunk_start
+            chunks.append(self._emit())
+            start = chunk_start = cut + 1
+
+        self._length = end - chunk_start
+        # Running hash for the Python path in case the next buffer is small
+        self._hash = int(h[-1])
+        if start < end:
+            self._digest.update(view[start:end])
+        return chunks
+
+    def finish(self):
+        """Return the final partial chunk, if any"""
+        return [self._emit()] if self._length else []
+
+
+def chunk_file(path):
+    """Return (sha256 hex, size, {fingerprint: chunk size}) for a file"""
+    chunker = ContentChunker()
+    hasher = hashlib.sha256()
+    fingerprints = {}
+    size = 0
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(READ_CHUNK_SIZE)
+            if not data:
+                break
+            size += len(data)
+            hasher.update(data)
+            fingerprints.update(chunker.update(data))
+    fingerprints.update(chunker.finish())
+    return hasher.hexdigest(), size, fingerprints
+
+
+class ChunkIndex:
+    """SQLite inverted index: chunk fingerprint -> protected assets"""
+
+    def __init__(self, path=DEFAULT_CHUNK_DB):
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._ready = False  # the database file and schema are created on first use
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get('AEGIS_CHUNK_INDEX') or DEFAULT_CHUNK_DB)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            if not self._ready:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(SCHEMA)
+                self._ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def asset_count(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM assets').fetchone()[0]
+
+    def stats(self):
+        with self._connect() as conn:
+            assets = conn.execute('SELECT COUNT(*) FROM assets').fetchone()[0]
+            chunks = conn.execute('SELECT COUNT(*) FROM chunks').fetchone()[0]
+        return {'assets': assets, 'chunks': chunks}
+
+    def add_asset(self, fingerprints, name='', platform='', url='', sha256='', size=0):
+        """Index an asset's {fingerprint: chunk size}; returns the asset id"""
+        with self._write_lock, self._connect() as conn:
+            cur = conn.execute(
+                'INSERT INTO assets (name, platform, url, sha256, size, chunk_count, added) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (name, platform, url, sha256, size, len(fingerprints), time.time())
+            )
+            asset_id = cur.lastrowid
+            conn.executemany(
+                'INSERT OR IGNORE INTO chunks (fingerprint, asset_id, size) VALUES (?, ?, ?)',
+                ((fp, asset_id, chunk_size) for fp, chunk_size in fingerprints.items())
+            )
+        return asset_id
+
+    def lookup(self, fingerprints):
+        """Return [(fingerprint, asset_id, size)] for the fingerprints that are indexed"""
+        fingerprints = list(fingerprints)
+        if not fingerprints:
+            return []
+        with self._connect() as conn:
+            return conn.execute(
+                'SELECT fingerprint, asset_id, size FROM chunks WHERE fingerprint IN (%s)'
+                % ','.join('?' * len(fingerprints)), fingerprints
+            ).fetchall()
+
+    def assets(self, asset_ids):
+        asset_ids = list(asset_ids)
+        if not asset_ids:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT id, name, platform, url, sha256, size, chunk_count FROM assets WHERE id IN (%s)'
+                % ','.join('?' * len(asset_ids)), asset_ids
+            ).fetchall()
+        keys = ('id', 'name', 'platform', 'url', 'sha256', 'size', 'chunk_count')
+        return {row[0]: dict(zip(keys, row)) for row in rows}
+
+
+class ChunkMatcher:
+    """Streams an upload's chunks against the index and scores candidate assets"""
+
+    def __init__(self, index):
+        self.index = index
+        self.chunker = ContentChunker()
+        self.chunks = 0
+        self.bytes = 0
+        self._batch = set()
+        self._matched = {}     # asset id -> {fingerprint: chunk size}
+
+    def update(self, data):
+        self.bytes += len(data)
+        self._add(self.chunker.update(data))
+
+    def _add(self, chunks):
+        for fingerprint, _ in chunks:
+            self.chunks += 1
+            self._batch.add(fingerprint)
+            if len(self._batch) >= LOOKUP_BATCH:
+                self._flush()
+
+    def _flush(self):
+        # Only matched fingerprints are kept, so memory does not grow with the upload
+        for fingerprint, asset_id, size in self.index.lookup(self._batch):
+            self._matched.setdefault(asset_id, {})[fingerprint] = size
+        self._batch = set()
+
+    def finish(self, top=TOP_CANDIDATES, min_containment=MIN_CONTAINMENT):
+        """Candidate assets ranked by the share of their chunks found in the upload"""
+        self._add(self.chunker.finish())
+        self._flush()
+
+        assets = self.index.assets(self._matched)
+        candidates = []
+        for asset_id, matched in self._matched.items():
+            asset = assets.get(asset_id)
+            if not asset or not asset['chunk_count']:
+                continue
+            containment = len(matched) / asset['chunk_count']
+            if containment < min_containment:
+                continue
+            candidates.append({
+                'asset_id': asset_id,
+                'name': asset['name'],
+                'platform': asset['platform'],
+                'url': asset['url'],
+                'sha256': asset['sha256'],
+                'containment': round(containment, 4),
+                'matched_chunks': len(matched),
+                'asset_chunks': asset['chunk_count'],
+                'matched_bytes': sum(matched.values())
+            })
+        candidates.sort(key=lambda c: (-c['containment'], -c['matched_bytes']))
+        return candidates[:top]
+
+
+def _walk_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the chunk fingerprint index of protected assets')
+    parser.add_argument('--db', default=os.environ.get('AEGIS_CHUNK_INDEX') or DEFAULT_CHUNK_DB,
+                        help='Index database (default: $AEGIS_CHUNK_INDEX or aegis_chunks.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('ingest', help='Chunk and index protected files or directories')
+    p.add_argument('--name', default='', help='Asset name (default: file name)')
+    p.add_argument('--platform', default='')
+    p.add_argument('--url', default='')
+    p.add_argument('paths', nargs='+')
+
+    p = commands.add_parser('match', help='Score a file against the indexed assets')
+    p.add_argument('path')
+
+    commands.add_parser('stats', help='Show index size')
+
+    args = parser.parse_args()
+    index = ChunkIndex(args.db)
+
+    if args.command == 'ingest':
+        for path in _walk_files(args.paths):
+            sha256, size, fingerprints = chunk_file(path)
+            asset_id = index.add_asset(fingerprints, args.name or os.path.basename(path),
+                                       args.platform, args.url, sha256, size)
+            print(f"✅ Indexed {path}: {len(fingerprints)} chunks (asset {asset_id})")
+    elif args.command == 'match':
+        matcher = ChunkMatcher(index)
+        with open(args.path, 'rb') as f:
+            while True:
+                data = f.read(READ_CHUNK_SIZE)
+                if not data:
+                    break
+                matcher.update(data)
+        candidates = matcher.finish()
+        print(f"🔍 {matcher.chunks} chunks, {len(candidates)} candidate asset(s)")
+        for candidate in candidates:
+            print(f"   - {candidate['name']}: {candidate['containment']:.1%} "
+                  f"({candidate['matched_chunks']}/{candidate['asset_chunks']} chunks)")
+
+    print(f"📊 {json.dumps(index.stats())}")
+
+
+if __name__ == '__main__':
+    main()
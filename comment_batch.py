@@ -0,0 +1,245 @@
+"""Column-wise storage of scraped comments.
+
+A CommentBatch keeps every comment field in its own column instead of one
+dict per comment: authors, channels, times and photo URLs are interned (each
+distinct value stored once), likes, replies and heart flags live in arrays,
+and all texts share one UTF-8 buffer with offsets. Indexing a batch gives a
+CommentView, which reads like the old per-comment dict.
+
+Detectors return FlaggedComments: row indices into the batch plus what the
+detector found for each row. The output dicts are only built when the result
+is iterated, normally while it is serialized to JSON (see to_json).
+"""
+from array import array
+from collections.abc import Mapping, Sequence
+
+FIELDS = ('id', 'text', 'author', 'channel', 'time', 'likes', 'replies', 'photo', 'heart')
+
+_COUNT_SUFFIXES = {'k': 1000, 'm': 1000000, 'b': 1000000000}
+
+
+def parse_count(value):
+    """Like/reply count as an int; YouTube reports them as text such as '1.2K'"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value or '').strip().replace(',', '').lower()
+    if not text:
+        return 0
+    multiplier = _COUNT_SUFFIXES.get(text[-1], 1)
+    if multiplier > 1:
+        text = text[:-1]
+    try:
+        return int(round(float(text) * multiplier))
+    except ValueError:
+        return 0
+
+
+class InternedColumn:
+    """Column of repeated strings: one code per row, each distinct value stored once"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = array('I')
+        self._lookup = {}
+
+    def append(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+    def __getstate__(self):
+        # The lookup is rebuilt from values, so process pools ship less
+        return {'values': self.values, 'codes': self.codes}
+
+    def __setstate__(self, state):
+        self.values = state['values']
+        self.codes = state['codes']
+        self._lookup = {value: code for code, value in enumerate(self.values)}
+
+
+class CommentBatch(Sequence):
+    """Comments of one video, stored column by column"""
+
+    def __init__(self, comments=()):
+        self.ids = []
+        self.authors = InternedColumn()
+        self.channels = InternedColumn()
+        self.times = InternedColumn()
+        self.photos = InternedColumn()
+        self.likes = array('q')
+        self.replies = array('q')
+        self.hearts = bytearray()
+        self._text = bytearray()
+        self._offsets = array('Q', [0])
+        self.extend(comments)
+
+    @classmethod
+    def coerce(cls, comments):
+        """The batch itself, or a new batch built from a list of comment dicts"""
+        return comments if isinstance(comments, cls) else cls(comments)
+
+    def append(self, comment):
+        """Add one comment given as a dict (or a view of another batch)"""
+        self.ids.append(str(comment.get('id', f'comment_{len(self.ids)}')))
+        self.authors.append(comment.get('author', 'Unknown'))
+        self.channels.append(comment.get('channel', ''))
+        self.times.append(comment.get('time', ''))
+        self.photos.append(comment.get('photo', ''))
+        self.likes.append(parse_count(comment.get('likes', 0)))
+        self.replies.append(parse_count(comment.get('replies', 0)))
+        self.hearts.append(1 if comment.get('heart') else 0)
+        self._text += (comment.get('text') or '').encode('utf-8', 'surrogatepass')
+        self._offsets.append(len(self._text))
+
+    def extend(self, comments):
+        for comment in comments:
+            self.append(comment)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [CommentView(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('comment index out of range')
+        return CommentView(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield CommentView(self, i)
+
+    def __repr__(self):
+        return f'<CommentBatch of {len(self)} comments>'
+
+    def text(self, index):
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._text[start:end].decode('utf-8', 'surrogatepass')
+
+    def texts(self):
+        """Every comment text, in order"""
+        for i in range(len(self)):
+            yield self.text(i)
+
+    def author(self, index):
+        return self.authors[index]
+
+    def field(self, index, name):
+        """One field of one comment, as it appears in the comment dicts"""
+        if name == 'text':
+            return self.text(index)
+        if name == 'id':
+            return self.ids[index]
+        if name == 'author':
+            return self.authors[index]
+        if name == 'channel':
+            return self.channels[index]
+        if name == 'time':
+            return self.times[index]
+        if name == 'likes':
+            return self.likes[index]
+        if name == 'replies':
+            return self.replies[index]
+        if name == 'photo':
+            return self.photos[index]
+        if name == 'heart':
+            return bool(self.hearts[index])
+        raise KeyError(name)
+
+    def row(self, index):
+        """Comment dict of one row"""
+        return {name: self.field(index, name) for name in FIELDS}
+
+    def to_dicts(self):
+        return [self.row(i) for i in range(len(self))]
+
+
+class CommentView(Mapping):
+    """Read-only dict-like view of one comment in a batch"""
+
+    __slots__ = ('batch', 'index')
+
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+
+    def __getitem__(self, name):
+        return self.batch.field(self.index, name)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __repr__(self):
+        return f'CommentView({self.batch.row(self.index)!r})'
+
+
+class FlaggedComments(Sequence):
+    """Comments a detector flagged: row indices into a batch plus one finding per row
+
+    `build(comment, finding)` turns a CommentView and its finding into the
+    output dict; it has to be a module-level function so results can cross
+    process pools.
+    """
+
+    def __init__(self, batch, build):
+        self.batch = batch
+        self.indices = array('I')
+        self.findings = []
+        self._build = build
+        self._annotations = []
+
+    def add(self, index, finding):
+        self.indices.append(index)
+        self.findings.append(finding)
+
+    def annotate(self, name, values, field='author', default=None):
+        """Add `name` to every entry, looked up in `values` by the comment's `field`"""
+        self._annotations.append((name, values, field, default))
+
+    def _entry(self, index, finding):
+        comment = CommentView(self.batch, index)
+        entry = self._build(comment, finding)
+        for name, values, field, default in self._annotations:
+            entry[name] = values.get(comment[field], default)
+        return entry
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[p] for p in range(*position.indices(len(self)))]
+        return self._entry(self.indices[position], self.findings[position])
+
+    def __iter__(self):
+        for index, finding in zip(self.indices, self.findings):
+            yield self._entry(index, finding)
+
+    def __eq__(self, other):
+        if isinstance(other, (FlaggedComments, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f'<FlaggedComments: {len(self)} of {len(self.batch)} comments>'
+
+
+def to_json(obj):
+    """json `default=` hook turning batches, views and flagged comments into plain lists and dicts"""
+    if isinstance(obj, CommentBatch):
+        return obj.to_dicts()
+    if isinstance(obj, FlaggedComments):
+        return list(obj)
+    if isinstance(obj, CommentView):
+        return obj.batch.row(obj.index)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
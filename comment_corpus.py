@@ -0,0 +1,223 @@
+"""Seeded synthetic YouTube comments for benchmarks and load tests.
+
+generate_comments() yields comments in the scraper's shape. Benign comments
+are built from a vocabulary that none of the default rules match; spam,
+harassment and piracy comments carry a phrase that one does. Bot campaigns
+repeat a few messages verbatim (duplicates) or with small edits (near
+duplicates). The ratios and comment length are tunable, and the same seed
+always gives the same corpus.
+
+CorpusDownloader stands in for YoutubeCommentDownloader, so scraping can be
+replaced without touching the network.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from pattern_engine import DEFAULT_RULES
+
+# Checked against DEFAULT_RULES: no rule term is a substring of these
+COMMON_WORDS = (
+    'great video love this song so much amazing content please make more watched again lol wow nice best '
+    'channel ever thanks sharing helpful learned lot well explained detailed deserves views looking forward '
+    'editing music part made me cry who here chorus beat drop vocals guitar piano camera shot colors '
+    'story ending episode season trailer tutorial recipe tried today works perfectly saved my exam '
+    'explanation clear simple finally someone said underrated talent voice beautiful song memories '
+    'childhood nostalgia goosebumps every single time listening repeat since morning brother sister mom '
+    'dad showed how long until next upload quality keeps getting better proud journey started '
+    'years ago still here support always respect effort background scenery mountains ocean city night '
+    'lights vibe relaxing study work coding tips useful question answer timestamp minute second'
+).split()
+
+# Real comments draw on a large vocabulary; a small one makes every comment
+# look alike to the near-duplicate index. Rarer made-up words fill the tail.
+TAIL_WORDS = 3000
+
+
+def _benign_vocabulary(size=TAIL_WORDS, seed=0):
+    """Common words followed by made-up ones, skipping any that contain a rule term"""
+    terms = [term.lower() for rule in DEFAULT_RULES for term in rule['terms']]
+    rng = random.Random(seed)
+    words = list(COMMON_WORDS)
+    seen = set(words)
+    while len(words) < len(COMMON_WORDS) + size:
+        word = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 10)))
+        if word not in seen and not any(term in word for term in terms):
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+BENIGN_WORDS = _benign_vocabulary()
+# Zipf-like with a flattened head: common words come up more often than the tail
+BENIGN_WEIGHTS = [1.0 / (rank + 20) for rank in range(len(BENIGN_WORDS))]
+
+SPAM_PHRASES = ('check out my channel', 'sub4sub anyone', 'click here for a prize', 'free giveaway today',
+                'earn money from home', 'contact me on telegram', 'link in bio')
+HARASSMENT_PHRASES = ('you are so ugly', 'stupid idiot', 'kill yourself', 'fat pig', 'pathetic loser',
+                      'i hate you', 'this is trash', 'gonna hurt you', 'disgusting person', 'worthless moron')
+PIRACY_PHRASES = ('full movie free download', 'leaked version here', 'torrent magnet link', 'camrip available',
+                  'watch free on my site', 'pirated copy uploaded', 'cracked version')
+EMOJI = ('😀', '😂', '🔥', '❤️', '👏', '🙏', '😍', '💯')
+TIME_UNITS = (('seconds', 59), ('minutes', 59), ('hours', 23), ('days', 6), ('weeks', 3), ('months', 11),
+              ('years', 9))
+
+DEFAULT_RATIOS = {
+    'duplicate_ratio': 0.05,
+    'near_duplicate_ratio': 0.05,
+    'spam_ratio': 0.03,
+    'harassment_ratio': 0.03,
+    'piracy_ratio': 0.02,
+}
+
+
+def _sentence(rng, min_words, max_words):
+    words = rng.choices(BENIGN_WORDS, BENIGN_WEIGHTS, k=rng.randint(min_words, max_words))
+    if rng.random() < 0.2:
+        words.append(rng.choice(EMOJI))
+    return ' '.join(words)
+
+
+def _with_phrase(rng, phrase, min_words, max_words):
+    """Benign words with a flagged phrase dropped in at a random position"""
+    words = _sentence(rng, max(0, min_words - 1), max(0, max_words - len(phrase.split()))).split()
+    words.insert(rng.randint(0, len(words)), phrase)
+    return ' '.join(words)
+
+
+def _near_copy(rng, text):
+    """A light edit of a campaign message, still well above the 85% similarity threshold"""
+    edit = rng.random()
+    if edit < 0.4:
+        return f'{text} {rng.choice(EMOJI)}'
+    if edit < 0.7:
+        return f'{text}!!'
+    return f'{text}...'
+
+
+def _votes(rng):
+    """Like counts the way YouTube prints them ('843', '1.2K')"""
+    likes = min(int(rng.paretovariate(1.2)) - 1, 250000)
+    if likes >= 1000:
+        return f'{likes / 1000:.1f}K'
+    return str(likes)
+
+
+def generate_comments(count, seed=0, duplicate_ratio=0.05, near_duplicate_ratio=0.05, spam_ratio=0.03,
+                      harassment_ratio=0.03, piracy_ratio=0.02, min_words=3, max_words=25, authors=None):
+    """Yield `count` comment dicts (id, text, author, channel, time, likes, replies, photo, heart)"""
+    if duplicate_ratio + near_duplicate_ratio + spam_ratio + harassment_ratio + piracy_ratio > 1:
+        raise ValueError('The comment ratios add up to more than 1')
+    rng = random.Random(seed)
+    authors = authors or max(1, count // 4)
+
+    # A handful of bot campaigns, each repeated many times
+    campaigns = [_sentence(rng, min_words, max_words) for _ in range(max(1, count // 200))]
+
+    for i in range(count):
+        roll = rng.random()
+        if roll < duplicate_ratio:
+            text = rng.choice(campaigns)
+        elif roll < duplicate_ratio + near_duplicate_ratio:
+            text = _near_copy(rng, rng.choice(campaigns))
+        else:
+            roll -= duplicate_ratio + near_duplicate_ratio
+            if roll < spam_ratio:
+                text = _with_phrase(rng, rng.choice(SPAM_PHRASES), min_words, max_words)
+            elif roll < spam_ratio + harassment_ratio:
+                text = _with_phrase(rng, rng.choice(HARASSMENT_PHRASES), min_words, max_words)
+            elif roll < spam_ratio + harassment_ratio + piracy_ratio:
+                text = _with_phrase(rng, rng.choice(PIRACY_PHRASES), min_words, max_words)
+            else:
+                text = _sentence(rng, min_words, max_words)
+
+        author = rng.randrange(authors)
+        unit, most = rng.choice(TIME_UNITS)
+        yield {
+            'id': f'Ugx{rng.getrandbits(64):016x}{i:06d}',
+            'text': text,
+            'author': f'@viewer{author}',
+            'channel': f'UC{author:022d}',
+            'time': f'{rng.randint(1, most)} {unit} ago',
+            'likes': _votes(rng),
+            'replies': str(rng.randint(0, 3) if rng.random() < 0.1 else 0),
+            'photo': f'https://yt3.ggpht.com/a/avatar{author % 500}',
+            'heart': rng.random() < 0.005
+        }
+
+
+class CorpusDownloader:
+    """Drop-in for YoutubeCommentDownloader serving a generated corpus per video
+
+    Each video ID gets its own deterministic corpus; `latency` seconds are
+    spent before every `page_size` comments, like paging through the real API,
+    and a scrape fails on its first page with probability `error_rate`.
+    """
+
+    def __init__(self, count=1000, seed=0, latency=0.0, page_size=20, error_rate=0.0, **corpus_options):
+        self.count = count
+        self.seed = seed
+        self.latency = latency
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.corpus_options = corpus_options
+        self._rng = random.Random()
+
+    @classmethod
+    def from_env(cls):
+        """Downloader configured by AEGIS_FAKE_COMMENTS, _LATENCY, _ERROR_RATE and _SEED"""
+        return cls(
+            count=int(os.environ.get('AEGIS_FAKE_COMMENTS', 1000)),
+            seed=int(os.environ.get('AEGIS_FAKE_SEED', 0)),
+            latency=float(os.environ.get('AEGIS_FAKE_LATENCY', 0.0)),
+            error_rate=float(os.environ.get('AEGIS_FAKE_ERROR_RATE', 0.0))
+        )
+
+    def get_comments(self, youtube_id, sort_by=None, language=None, **kwargs):
+        comments = generate_comments(self.count, f'{self.seed}:{youtube_id}', **self.corpus_options)
+        for i, comment in enumerate(comments):
+            if self.latency and i % self.page_size == 0:
+                time.sleep(self.latency)
+            if i == 0 and self._rng.random() < self.error_rate:
+                raise RuntimeError('Stub YouTube failure')
+            yield {
+                'cid': comment['id'],
+                'text': comment['text'],
+                'author': comment['author'],
+                'channel': comment['channel'],
+                'time': comment['time'],
+                'votes': comment['likes'],
+                'replies': comment['replies'],
+                'photo': comment['photo'],
+                'heart': comment['heart']
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic comment corpus as JSON')
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    for name, default in DEFAULT_RATIOS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default)
+    parser.add_argument('--min-words', type=int, default=3)
+    parser.add_argument('--max-words', type=int, default=25)
+    parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    args = parser.parse_args()
+
+    comments = list(generate_comments(
+        args.count, args.seed, args.duplicate_ratio, args.near_duplicate_ratio, args.spam_ratio,
+        args.harassment_ratio, args.piracy_ratio, args.min_words, args.max_words
+    ))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(comments, f, indent=2, ensure_ascii=False)
+        print(f"✅ Wrote {len(comments)} comments to {args.output}")
+    else:
+        json.dump(comments, sys.stdout, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
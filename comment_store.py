@@ -0,0 +1,167 @@
+"""Persistent SQLite store of scraped comments, keyed by video_id.
+
+Comments are scraped newest first, so a re-scan of a stored video only has to
+download until it reaches comments it already has. Each stored comment gets a
+sequence number (higher is newer) so the store can return the latest N
+comments in scrape order.
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS comments (
+    video_id TEXT NOT NULL,
+    cid TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    text TEXT,
+    author TEXT,
+    channel TEXT,
+    time TEXT,
+    likes,
+    replies,
+    photo TEXT,
+    heart INTEGER,
+    fetched_at REAL,
+    PRIMARY KEY (video_id, cid)
+);
+CREATE INDEX IF NOT EXISTS idx_comments_video_seq ON comments (video_id, seq);
+CREATE INDEX IF NOT EXISTS idx_comments_cid ON comments (cid);
+CREATE INDEX IF NOT EXISTS idx_comments_fetched ON comments (video_id, fetched_at);
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    last_scan REAL,
+    complete INTEGER DEFAULT 0,
+    max_seq INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS detector_state (
+    video_id TEXT NOT NULL,
+    config TEXT NOT NULL,
+    state TEXT NOT NULL,
+    updated REAL,
+    PRIMARY KEY (video_id, config)
+);
+"""
+
+# SQLite caps bound parameters per statement
+QUERY_CHUNK = 500
+
+COLUMNS = ('id', 'text', 'author', 'channel', 'time', 'likes', 'replies', 'photo', 'heart')
+
+
+class CommentStore:
+    """SQLite-backed comment cache shared by all request threads"""
+
+    def __init__(self, path):
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._ready = False  # the database file and schema are created on first use
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            if not self._ready:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(SCHEMA)
+                self._ready = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def video_state(self, video_id):
+        """Return scan metadata for a video, or None if it was never stored"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT last_scan, complete, max_seq, '
+                '(SELECT COUNT(*) FROM comments WHERE video_id = ?) '
+                'FROM videos WHERE video_id = ?', (video_id, video_id)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'last_scan': row[0],
+            'complete': bool(row[1]),
+            'max_seq': row[2],
+            'count': row[3]
+        }
+
+    def latest_ids(self, video_id, limit=200):
+        """IDs of the most recently scraped comments of a video"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT cid FROM comments WHERE video_id = ? ORDER BY seq DESC LIMIT ?',
+                (video_id, limit)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def stored_ids(self, video_id, cids):
+        """The subset of `cids` already stored for a video"""
+        cids = list(cids)
+        stored = set()
+        with self._connect() as conn:
+            for start in range(0, len(cids), QUERY_CHUNK):
+                chunk = cids[start:start + QUERY_CHUNK]
+                rows = conn.execute(
+                    f"SELECT cid FROM comments WHERE video_id = ? AND cid IN ({','.join('?' * len(chunk))})",
+                    (video_id, *chunk)
+                ).fetchall()
+                stored.update(row[0] for row in rows)
+        return stored
+
+    def merge(self, video_id, comments, complete=None):
+        """Store comments (newest first) above everything already stored"""
+        now = time.time()
+        with self._write_lock, self._connect() as conn:
+            row = conn.execute('SELECT max_seq FROM videos WHERE video_id = ?', (video_id,)).fetchone()
+            max_seq = row[0] if row else 0
+            total = len(comments)
+            conn.executemany(
+                'INSERT OR REPLACE INTO comments '
+                '(video_id, cid, seq, text, author, channel, time, likes, replies, photo, heart, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(video_id, c['id'], max_seq + total - i, c['text'], c['author'], c['channel'],
+                  c['time'], c['likes'], c['replies'], c['photo'], int(bool(c['heart'])), now)
+                 for i, c in enumerate(comments)]
+            )
+            conn.execute(
+                'INSERT INTO videos (video_id, last_scan, complete, max_seq) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(video_id) DO UPDATE SET last_scan = excluded.last_scan, '
+                'max_seq = excluded.max_seq, complete = COALESCE(?, videos.complete)',
+                (video_id, now, int(bool(complete)), max_seq + total,
+                 None if complete is None else int(bool(complete)))
+            )
+        return total
+
+    def load_state(self, video_id, config):
+        """Saved detector state of a video for a keyword configuration, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT state FROM detector_state WHERE video_id = ? AND config = ?', (video_id, config)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_state(self, video_id, config, state):
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO detector_state (video_id, config, state, updated) VALUES (?, ?, ?, ?)',
+                (video_id, config, json.dumps(state, ensure_ascii=False), time.time())
+            )
+
+    def get_comments(self, video_id, limit=200):
+        """Return the latest stored comments, newest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT cid, text, author, channel, time, likes, replies, photo, heart '
+                'FROM comments WHERE video_id = ? ORDER BY seq DESC LIMIT ?',
+                (video_id, limit)
+            ).fetchall()
+        comments = []
+        for row in rows:
+            comment = dict(zip(COLUMNS, row))
+            comment['heart'] = bool(comment['heart'])
+            comments.append(comment)
+        return comments
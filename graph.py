@@ -0,0 +1,267 @@
+"""Coordination graph of comment authors.
+
+Authors are linked when they post near-identical texts, reply in the same
+thread or post within the same short time window. Links come from buckets
+(text groups, thread IDs, time slots) instead of comparing every pair of
+comments, and buckets with more than MAX_BUCKET_AUTHORS authors are skipped
+(a busy thread or minute says nothing about coordination) or, for text
+groups, chained, so building the graph stays close to linear in the number
+of comments.
+
+Components are found with union-find over the stronger links; hub scores are
+the weighted eigenvector centrality. The output is pruned to the top-N
+authors by hub score, in the nodes/edges shape vis-network takes.
+"""
+import re
+from datetime import datetime
+from itertools import combinations
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python hub scores
+    np = None
+
+DEFAULT_TOP_NODES = 50
+DEFAULT_WINDOW = 60  # seconds
+MAX_BUCKET_AUTHORS = 25
+TOP_COMPONENTS = 10
+COMPONENT_AUTHORS = 10
+
+LINK_KINDS = ('text', 'thread', 'time')
+LINK_WEIGHTS = (3.0, 1.0, 1.0)
+
+# A single shared thread or time slot is a weak hint; components need more
+COMPONENT_MIN_WEIGHT = 2.0
+
+HUB_ITERATIONS = 50
+# Scores only rank nodes, so a loose tolerance is enough
+HUB_TOLERANCE = 1e-4
+
+UNIT_SECONDS = {
+    'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400,
+    'week': 7 * 86400, 'month': 30 * 86400, 'year': 365 * 86400
+}
+_RELATIVE_TIME = re.compile(r'(\d+)\s+(second|minute|hour|day|week|month|year)s?\s+ago', re.IGNORECASE)
+
+
+def parse_time(value, now=None):
+    """(epoch seconds, resolution in seconds) of a timestamp, or None
+
+    Takes epoch numbers, ISO 8601 strings (Instagram) and YouTube's relative
+    "5 minutes ago", whose resolution is the unit it is given in.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value), 1
+    if not value:
+        return None
+    match = _RELATIVE_TIME.search(value)
+    if match:
+        unit = UNIT_SECONDS[match.group(2).lower()]
+        now = datetime.now().timestamp() if now is None else now
+        return now - int(match.group(1)) * unit, unit
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp(), 1
+    except ValueError:
+        return None
+
+
+def thread_id(comment_id):
+    """Thread of a YouTube comment (a reply's ID is its parent's ID, a dot and its own)"""
+    return str(comment_id).split('.', 1)[0]
+
+
+class CoordinationGraph:
+    """Authors as nodes, with link counts per kind on each edge"""
+
+    def __init__(self):
+        self.authors = []  # node -> author
+        self._nodes = {}   # author -> node
+        self.edges = {}    # (node, node), smaller first -> [text, thread, time] link counts
+
+    def node(self, author):
+        node = self._nodes.get(author)
+        if node is None:
+            node = self._nodes[author] = len(self.authors)
+            self.authors.append(author)
+        return node
+
+    def link(self, nodes, kind, chain=False):
+        """Link the distinct nodes of one bucket
+
+        Buckets with more than MAX_BUCKET_AUTHORS authors are dropped, or with
+        `chain` linked one after another, which keeps them in one component
+        without a quadratic number of edges.
+        """
+        nodes = sorted(set(nodes))
+        if len(nodes) < 2:
+            return
+        if len(nodes) <= MAX_BUCKET_AUTHORS:
+            pairs = combinations(nodes, 2)
+        elif chain:
+            pairs = zip(nodes, nodes[1:])
+        else:
+            return
+        slot = LINK_KINDS.index(kind)
+        edges = self.edges
+        for pair in pairs:
+            counts = edges.get(pair)
+            if counts is None:
+                counts = edges[pair] = [0, 0, 0]
+            counts[slot] += 1
+
+    @staticmethod
+    def weight(counts):
+        return sum(count * weight for count, weight in zip(counts, LINK_WEIGHTS))
+
+    def components(self, min_weight=COMPONENT_MIN_WEIGHT):
+        """Groups of nodes joined by edges of at least `min_weight`, largest first"""
+        parent = list(range(len(self.authors)))
+
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for (a, b), counts in self.edges.items():
+            if self.weight(counts) >= min_weight:
+                root_a, root_b = find(a), find(b)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+
+        groups = {}
+        for node in range(len(self.authors)):
+            groups.setdefault(find(node), []).append(node)
+        return sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
+
+    def hub_scores(self, iterations=HUB_ITERATIONS):
+        """Weighted eigenvector centrality per node, scaled to a maximum of 1
+
+        Power iteration on A + I, which also converges on bipartite graphs.
+        """
+        count = len(self.authors)
+        if np is not None:
+            return self._hub_scores_numpy(count, iterations)
+
+        sources, targets, weights = [], [], []
+        for (a, b), counts in self.edges.items():
+            weight = self.weight(counts)
+            sources += (a, b)
+            targets += (b, a)
+            weights += (weight, weight)
+        edges = list(zip(sources, targets, weights))
+
+        scores = [0.0] * count
+        for a in sources:
+            scores[a] = 1.0
+        for _ in range(iterations):
+            updated = scores[:]
+            for a, b, weight in edges:
+                updated[a] += weight * scores[b]
+            top = max(updated, default=0.0) or 1.0
+            updated = [score / top for score in updated]
+            change = max((abs(x - y) for x, y in zip(updated, scores)), default=0.0)
+            scores = updated
+            if change < HUB_TOLERANCE:
+                break
+        return scores
+
+    def _hub_scores_numpy(self, count, iterations):
+        pairs = np.array(list(self.edges), dtype=np.int64).reshape(-1, 2)
+        weights = np.array([self.weight(counts) for counts in self.edges.values()], dtype=np.float64)
+        sources = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        targets = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        weights = np.concatenate([weights, weights])
+
+        scores = np.zeros(count)
+        scores[sources] = 1.0
+        for _ in range(iterations):
+            updated = scores + np.bincount(sources, weights=weights * scores[targets], minlength=count)
+            top = updated.max(initial=0.0) or 1.0
+            updated /= top
+            change = np.abs(updated - scores).max(initial=0.0)
+            scores = updated
+            if change < HUB_TOLERANCE:
+                break
+        return scores.tolist()
+
+    def to_dict(self, top_n=DEFAULT_TOP_NODES):
+        """vis-network nodes and edges of the top-N hubs, plus components and totals"""
+        scores = self.hub_scores()
+        components = self.components()
+        component_of = {}
+        for number, members in enumerate(components, 1):
+            for node in members:
+                component_of[node] = number
+
+        linked = [node for node, score in enumerate(scores) if score > 0]
+        ranked = sorted(linked, key=lambda node: (-scores[node], self.authors[node]))[:top_n]
+        shown = set(ranked)
+
+        nodes = [{
+            'id': node,
+            'label': self.authors[node],
+            'value': round(scores[node], 4),
+            'group': component_of.get(node, 0)
+        } for node in ranked]
+        edges = []
+        for (a, b), counts in self.edges.items():
+            if a in shown and b in shown:
+                links = ', '.join(f'{kind} ×{count}' for kind, count in zip(LINK_KINDS, counts) if count)
+                edges.append({'from': a, 'to': b, 'value': self.weight(counts), 'title': links})
+
+        return {
+            'nodes': nodes,
+            'edges': edges,
+            'components': [{
+                'id': number,
+                'size': len(members),
+                'authors': [self.authors[node] for node in
+                            sorted(members, key=lambda node: -scores[node])[:COMPONENT_AUTHORS]]
+            } for number, members in enumerate(components[:TOP_COMPONENTS], 1)],
+            'totals': {
+                'authors': len(linked),
+                'edges': len(self.edges),
+                'components': len(components),
+                'shown_nodes': len(nodes),
+                'shown_edges': len(edges)
+            }
+        }
+
+
+def build_graph(authors, text_groups=(), threads=None, times=None, window=DEFAULT_WINDOW, now=None):
+    """Coordination graph of one set of comments
+
+    `authors` has the author of each comment; `text_groups` lists the
+    comment indices of each group of near-identical texts; `threads` and
+    `times` (optional) give each comment's thread ID and timestamp. Times
+    coarser than `window` (e.g. "3 hours ago") are left out.
+    """
+    graph = CoordinationGraph()
+    nodes = [graph.node(author) for author in authors]
+
+    for group in text_groups:
+        graph.link([nodes[i] for i in group], 'text', chain=True)
+
+    if threads is not None:
+        buckets = {}
+        for node, thread in zip(nodes, threads):
+            if thread:
+                buckets.setdefault(thread, []).append(node)
+        for bucket in buckets.values():
+            graph.link(bucket, 'thread')
+
+    if times is not None:
+        now = datetime.now().timestamp() if now is None else now
+        parsed = {}  # relative times repeat a lot ("3 hours ago")
+        buckets = {}
+        for node, value in zip(nodes, times):
+            if value not in parsed:
+                parsed[value] = parse_time(value, now)
+            stamp = parsed[value]
+            if stamp is not None and stamp[1] <= window:
+                buckets.setdefault(int(stamp[0] // window), []).append(node)
+        for bucket in buckets.values():
+            graph.link(bucket, 'time')
+
+    return graph
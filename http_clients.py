@@ -0,0 +1,111 @@
+"""Shared HTTP session and API clients for the outbound calls of the API server.
+
+Apify calls go through one requests.Session whose urllib3 pool keeps
+connections alive across requests and threads, retrying connection errors
+and 429/5xx answers with exponential backoff (and Retry-After). Groq clients
+are built once per (API key, base URL) and reused; each keeps its own httpx
+connection pool, sized like the session's.
+"""
+import threading
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+    from groq import DefaultHttpxClient, Groq
+except ImportError:  # Instagram classification is unavailable
+    Groq = None
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_CLIENTS = 32
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def build_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """requests.Session with a keep-alive pool of `pool_size` connections per host and retries"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        # Apify's run-sync endpoints are POSTs that are safe to repeat
+        allowed_methods=frozenset({'GET', 'POST'}),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class HTTPClients:
+    """Pooled session plus cached Groq clients, safe to share between threads"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, max_clients=DEFAULT_MAX_CLIENTS):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.max_clients = max_clients
+        self.session = build_session(pool_size, retries, backoff)
+        self._groq_clients = OrderedDict()  # (api_key, base_url) -> Groq
+        self._lock = threading.Lock()
+        self.counters = {'clients_created': 0, 'clients_reused': 0}
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, **kwargs)
+
+    def groq(self, api_key, base_url=None):
+        """Groq client for the key and endpoint, created on first use"""
+        if Groq is None:
+            raise RuntimeError('The groq package is not installed')
+        key = (api_key, base_url)
+        with self._lock:
+            client = self._groq_clients.get(key)
+            if client is not None:
+                self._groq_clients.move_to_end(key)
+                self.counters['clients_reused'] += 1
+                return client
+
+        client = Groq(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=self.timeout,
+            max_retries=self.retries,
+            http_client=DefaultHttpxClient(
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+        )
+        with self._lock:
+            existing = self._groq_clients.get(key)
+            if existing is not None:
+                # Another thread built one meanwhile; keep theirs
+                client.close()
+                self.counters['clients_reused'] += 1
+                return existing
+            self._groq_clients[key] = client
+            self.counters['clients_created'] += 1
+            # Evicted clients may still be serving a request, so they are left to the garbage collector
+            while len(self._groq_clients) > self.max_clients:
+                self._groq_clients.popitem(last=False)
+        return client
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, groq_clients=len(self._groq_clients))
+
+    def close(self):
+        with self._lock:
+            clients = list(self._groq_clients.values())
+            self._groq_clients.clear()
+        for client in clients:
+            client.close()
+        self.session.close()
@@ -0,0 +1,205 @@
+"""Hashing and leak lookups for uploaded files and archive members.
+
+FileCheck computes any mix of digests (sha256, sha1, md5, blake2b) and the
+chunk fingerprints for partial matching in one pass over the data.
+
+check_uploads() handles a batch: zip and tar uploads are read member by
+member without extracting anything to disk, and each member's buffers are
+handed to a worker thread through a small bounded queue. hashlib releases
+the GIL on large buffers, so members are hashed in parallel while the next
+one is being read, and results are yielded as members finish.
+"""
+import hashlib
+import os
+import queue
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from chunk_index import ChunkMatcher
+
+SUPPORTED_ALGORITHMS = ('sha256', 'sha1', 'md5', 'blake2b')
+READ_CHUNK_SIZE = 1024 * 1024
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+DEFAULT_PARTIAL_LEAK_THRESHOLD = 0.5
+
+# Buffers queued per member; memory stays around (workers + 1) * this many MiB
+MEMBER_QUEUE_CHUNKS = 4
+
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+
+def parse_algorithms(value):
+    """Digest names from a list or comma-separated string; sha256 is always included"""
+    if isinstance(value, str):
+        value = value.split(',')
+    algorithms = ['sha256']
+    for name in value or []:
+        name = name.strip().lower()
+        if not name or name in algorithms:
+            continue
+        if name not in SUPPORTED_ALGORITHMS:
+            raise ValueError(f"Unsupported hash algorithm '{name}' (use {', '.join(SUPPORTED_ALGORITHMS)})")
+        algorithms.append(name)
+    return algorithms
+
+
+class MultiHasher:
+    """Several hashlib digests fed from the same buffers"""
+
+    def __init__(self, algorithms=('sha256',)):
+        self._hashers = {name: hashlib.new(name) for name in algorithms}
+
+    def update(self, data):
+        for hasher in self._hashers.values():
+            hasher.update(data)
+
+    def hexdigests(self):
+        return {name: hasher.hexdigest() for name, hasher in self._hashers.items()}
+
+
+class FileCheck:
+    """Hashes one file and matches it against the leak indexes as its data arrives"""
+
+    def __init__(self, leak_index, chunk_index=None, algorithms=('sha256',),
+                 partial_threshold=DEFAULT_PARTIAL_LEAK_THRESHOLD):
+        self.leak_index = leak_index
+        self.partial_threshold = partial_threshold
+        self.hasher = MultiHasher(algorithms)
+        self.matcher = ChunkMatcher(chunk_index) if chunk_index is not None else None
+        self.size = 0
+
+    def update(self, data):
+        self.size += len(data)
+        self.hasher.update(data)
+        if self.matcher:
+            self.matcher.update(data)
+
+    def result(self):
+        hashes = self.hasher.hexdigests()
+        sources = [
+            {
+                'platform': source['platform'],
+                'url': source['url'],
+                'name': source['name'],
+                'confidence': source['confidence']
+            }
+            for source in self.leak_index.lookup(hashes['sha256'])
+        ]
+        partial_matches = self.matcher.finish() if self.matcher else []
+
+        return {
+            'size': self.size,
+            'hash': hashes,
+            'leak_check': {
+                'leaked': bool(sources) or any(
+                    m['containment'] >= self.partial_threshold for m in partial_matches),
+                'sources': sources,
+                'partial_matches': partial_matches
+            }
+        }
+
+
+def archive_type(filename):
+    name = (filename or '').lower()
+    if name.endswith(ZIP_SUFFIXES):
+        return 'zip'
+    if name.endswith(TAR_SUFFIXES):
+        return 'tar'
+    return None
+
+
+def iter_members(stream, filename, expand_archives=True):
+    """Yield (member name, file object) for each archive member, or the upload itself"""
+    kind = archive_type(filename) if expand_archives else None
+
+    if kind == 'tar':
+        # Stream mode: members are read in order straight from the upload
+        with tarfile.open(fileobj=stream, mode='r|*') as tar:
+            for info in tar:
+                if info.isfile():
+                    yield info.name, tar.extractfile(info)
+    elif kind == 'zip':
+        # The central directory is at the end, so this needs the (spooled, seekable) upload
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as member:
+                        yield info.filename, member
+    else:
+        yield filename, stream
+
+
+def _consume(check, feed):
+    """Worker side: hash buffers from the feed until the empty end marker"""
+    error = None
+    while True:
+        data = feed.get()
+        if isinstance(data, Exception):
+            return {'error': str(data)}
+        if not data:
+            break
+        # After a failure keep draining so the reader never blocks on a full feed
+        if error is None:
+            try:
+                check.update(data)
+            except Exception as e:
+                error = e
+
+    try:
+        if error is None:
+            return check.result()
+    except Exception as e:
+        error = e
+    return {'error': str(error)}
+
+
+def check_uploads(uploads, leak_index, chunk_index=None, algorithms=('sha256',), workers=DEFAULT_WORKERS,
+                  partial_threshold=DEFAULT_PARTIAL_LEAK_THRESHOLD, expand_archives=True):
+    """Check (filename, stream) uploads; yields one event per file or member as it finishes, then a summary"""
+    if chunk_index is not None and not chunk_index.asset_count():
+        chunk_index = None
+
+    summary = {'event': 'complete', 'files': 0, 'leaked': 0, 'errors': 0, 'bytes': 0}
+
+    def finished(future, archive, name):
+        result = future.result()
+        summary['files'] += 1
+        if 'error' in result:
+            summary['errors'] += 1
+        else:
+            summary['bytes'] += result['size']
+            summary['leaked'] += int(result['leak_check']['leaked'])
+        return dict({'event': 'member', 'archive': archive, 'name': name}, **result)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {}
+        for filename, stream in uploads:
+            archive = filename if archive_type(filename) and expand_archives else None
+            try:
+                for name, member in iter_members(stream, filename, expand_archives):
+                    feed = queue.Queue(maxsize=MEMBER_QUEUE_CHUNKS)
+                    check = FileCheck(leak_index, chunk_index, algorithms, partial_threshold)
+                    pending[pool.submit(_consume, check, feed)] = (archive, name)
+                    try:
+                        while True:
+                            data = member.read(READ_CHUNK_SIZE)
+                            feed.put(data)
+                            if not data:
+                                break
+                    except Exception as e:
+                        feed.put(e)
+
+                    for future in [f for f in pending if f.done()]:
+                        yield finished(future, *pending.pop(future))
+            except Exception as e:
+                summary['files'] += 1
+                summary['errors'] += 1
+                yield {'event': 'member', 'archive': archive, 'name': filename,
+                       'error': f'Unreadable archive: {e}'}
+
+        for future in as_completed(list(pending)):
+            yield finished(future, *pending.pop(future))
+
+    yield summary
@@ -0,0 +1,167 @@
+"""Background job queue for long-running analyses.
+
+Jobs are accepted into a bounded queue and run by a fixed pool of worker
+threads. Handlers report progress through the job, which is also where
+cancellation is checked, so a cancelled job stops at its next progress
+report.
+"""
+import queue
+import threading
+import time
+import uuid
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_DEPTH = 50
+DEFAULT_RETENTION = 3600
+
+
+class JobCancelled(BaseException):
+    """Raised inside a running job once it has been cancelled.
+
+    Derived from BaseException so the analyzer's `except Exception` blocks
+    don't swallow it.
+    """
+
+
+class QueueFull(Exception):
+    """The job queue is at its configured depth"""
+
+
+class Job:
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = 'queued'
+        self.stage = 'queued'
+        self.comments_scraped = 0
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+
+    @property
+    def done(self):
+        return self.status in ('completed', 'failed', 'cancelled')
+
+    def report_progress(self, stage, comments_scraped=None):
+        """Progress callback for handlers; raises JobCancelled if the job was cancelled"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.stage = stage
+        if comments_scraped is not None:
+            self.comments_scraped = comments_scraped
+
+    def to_dict(self, include_result=True):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'progress': {
+                'stage': self.stage,
+                'comments_scraped': self.comments_scraped
+            },
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.status == 'completed':
+            data['result'] = self.result
+        return data
+
+
+class JobQueue:
+    """Bounded queue of jobs processed by a fixed number of worker threads"""
+
+    def __init__(self, handler, workers=DEFAULT_WORKERS, max_queue=DEFAULT_QUEUE_DEPTH,
+                 retention=DEFAULT_RETENTION):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.retention = retention
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._running = 0
+
+        for n in range(self.workers):
+            threading.Thread(target=self._worker, name=f'aegis-job-{n}', daemon=True).start()
+
+    def submit(self, params):
+        """Queue a job and return it; raises QueueFull when the queue is at capacity"""
+        self._prune()
+        job = Job(params)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise QueueFull(f'Job queue is full ({self.max_queue} jobs waiting)')
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns the job or None if unknown"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        job._cancel.set()
+        if job.status == 'queued':
+            job.status = 'cancelled'
+            job.finished = time.time()
+        return job
+
+    def stats(self):
+        with self._lock:
+            running = self._running
+            jobs = len(self._jobs)
+        return {
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'queued': self._queue.qsize(),
+            'running': running,
+            'tracked_jobs': jobs
+        }
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.done and job.finished and job.finished < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job.status == 'cancelled':
+                    continue
+
+                with self._lock:
+                    self._running += 1
+                job.status = 'running'
+                job.started = time.time()
+                try:
+                    job.result = self.handler(job)
+                    job.status = 'completed'
+                except JobCancelled:
+                    job.status = 'cancelled'
+                except Exception as e:
+                    job.status = 'failed'
+                    job.error = str(e)
+                finally:
+                    job.stage = job.status
+                    job.finished = time.time()
+                    with self._lock:
+                        self._running -= 1
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,192 @@
+"""Keyword matching for copyright detection.
+
+KeywordIndex is an Aho-Corasick automaton, so every keyword is matched in one
+pass over a comment no matter how many keywords there are. Indexes are cached
+by a hash of the keyword list, and large rights-holder lists can be preloaded
+as named catalogs and referenced as "catalog:<name>" in the keywords
+parameter.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+
+KEYWORD_MODES = ('substring', 'word')
+CATALOG_PREFIX = 'catalog:'
+INDEX_CACHE_SIZE = 32
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+
+class KeywordIndex:
+    """Matches a fixed keyword list against texts, case-insensitively.
+
+    Both sides are casefolded. In 'substring' mode a keyword matches
+    anywhere (like the old `keyword.lower() in text.lower()` check); in
+    'word' mode it must not be
+    preceded or followed by a letter, digit or underscore.
+    """
+
+    def __init__(self, keywords, mode='substring'):
+        if mode not in KEYWORD_MODES:
+            raise ValueError(f"Keyword mode must be one of {', '.join(KEYWORD_MODES)}")
+        self.keywords = list(keywords)
+        self.mode = mode
+        self._lengths = [len(k.casefold()) for k in self.keywords]
+
+        # Empty keywords are contained in every text
+        self._always = set()
+
+        goto = [{}]
+        output = [[]]
+        for position, keyword in enumerate(self.keywords):
+            key = keyword.casefold()
+            if not key:
+                if mode == 'substring':
+                    self._always.add(position)
+                continue
+            node = 0
+            for ch in key:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    output.append([])
+                node = nxt
+            output[node].append(position)
+
+        # Failure links, breadth first so shorter suffixes are resolved first
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                output[nxt] = output[nxt] + output[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = [tuple(o) for o in output]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def find(self, text):
+        """Return the keywords found in the text, in keyword-list order"""
+        goto, fail, output = self._goto, self._fail, self._output
+        whole_word = self.mode == 'word'
+        text = text.casefold()
+        found = set(self._always)
+
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not output[node]:
+                continue
+            for position in output[node]:
+                if position in found:
+                    continue
+                if whole_word:
+                    start = i - self._lengths[position] + 1
+                    if start > 0 and _is_word_char(text[start - 1]):
+                        continue
+                    if i + 1 < len(text) and _is_word_char(text[i + 1]):
+                        continue
+                found.add(position)
+
+        return [self.keywords[p] for p in sorted(found)]
+
+
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def keyword_list_hash(keywords, mode='substring'):
+    payload = json.dumps([mode, list(keywords)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_keyword_index(keywords, mode='substring'):
+    """Return a KeywordIndex for the list, building it only once per distinct list"""
+    key = keyword_list_hash(keywords, mode)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = KeywordIndex(keywords, mode)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+class KeywordCatalogs:
+    """Named keyword lists loaded from a directory of .txt files.
+
+    Each file holds one keyword per line (blank lines and lines starting with
+    '#' are ignored); the catalog name is the file name without extension.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.catalogs = {}
+        if directory:
+            self.load_directory(directory)
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get('AEGIS_KEYWORD_CATALOGS') or None)
+
+    def load_directory(self, directory):
+        for filename in sorted(os.listdir(directory)):
+            name, ext = os.path.splitext(filename)
+            if ext.lower() != '.txt':
+                continue
+            with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                keywords = [line.strip() for line in f]
+            self.add(name, [k for k in keywords if k and not k.startswith('#')])
+        return len(self.catalogs)
+
+    def add(self, name, keywords):
+        self.catalogs[name] = list(keywords)
+        # Build the substring index up front so the first request doesn't pay for it
+        get_keyword_index(self.catalogs[name])
+
+    def summary(self):
+        return [{'name': name, 'keywords': len(keywords)}
+                for name, keywords in sorted(self.catalogs.items())]
+
+    def resolve(self, keywords):
+        """Expand "catalog:<name>" entries into the catalog's keywords.
+
+        Accepts a list or a single string; raises ValueError for an unknown
+        catalog.
+        """
+        if not keywords:
+            return []
+        if isinstance(keywords, str):
+            keywords = [keywords]
+
+        resolved = []
+        for keyword in keywords:
+            if keyword.startswith(CATALOG_PREFIX):
+                name = keyword[len(CATALOG_PREFIX):]
+                if name not in self.catalogs:
+                    raise ValueError(f'Unknown keyword catalog: {name}')
+                resolved.extend(self.catalogs[name])
+            else:
+                resolved.append(keyword)
+        return resolved
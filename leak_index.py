@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""Local index of SHA-256 digests of known leaked or protected assets.
+
+The index is a directory holding:
+
+- digests.bin  sorted fixed-width records (32-byte digest + uint32 source id),
+               memory-mapped and binary searched, so a lookup is O(log n)
+               without loading the digests into RAM
+- pending.bin  unsorted journal of records appended since the last compaction
+- sources.json metadata of the sources records point to (platform, url, ...)
+
+    python leak_index.py ingest --platform Telegram --url https://t.me/c/1 hashes.txt
+    python leak_index.py ingest-files --platform YouTube --url https://youtu.be/x ./leaked/
+    python leak_index.py add <sha256> --platform Telegram
+    python leak_index.py lookup <sha256 | file>
+"""
+import argparse
+import bisect
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+DEFAULT_INDEX_DIR = 'aegis_leak_index'
+MAGIC = b'AEGISLK1'
+DIGEST_SIZE = 32
+RECORD = struct.Struct('>32sI')
+RECORD_SIZE = RECORD.size
+
+# Pending records are merged into digests.bin once the journal grows past this
+PENDING_LIMIT = 100000
+# Records sorted in memory at a time during bulk ingest
+RUN_SIZE = 1000000
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def parse_digest(value):
+    """Return a 32-byte digest from raw bytes or a hex string"""
+    if isinstance(value, (bytes, bytearray)) and len(value) == DIGEST_SIZE:
+        return bytes(value)
+    try:
+        digest = bytes.fromhex(value.strip())
+    except (AttributeError, ValueError):
+        digest = b''
+    if len(digest) != DIGEST_SIZE:
+        raise ValueError(f'Not a SHA-256 digest: {value!r}')
+    return digest
+
+
+def hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.digest()
+
+
+def _iter_records(f):
+    """Yield whole records from a binary file object, ignoring a torn tail"""
+    batch = RECORD_SIZE * 4096
+    while True:
+        data = f.read(batch)
+        if not data:
+            return
+        for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+            yield data[offset:offset + RECORD_SIZE]
+
+
+class _DigestView:
+    """Sequence of the digests in a mapped digests.bin, for bisect"""
+
+    def __init__(self, buf, count):
+        self.buf = buf
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        offset = len(MAGIC) + i * RECORD_SIZE
+        return self.buf[offset:offset + DIGEST_SIZE]
+
+    def source_id(self, i):
+        offset = len(MAGIC) + i * RECORD_SIZE
+        return RECORD.unpack_from(self.buf, offset)[1]
+
+
+class LeakIndex:
+    """Memory-mapped digest index; safe to share between request threads"""
+
+    def __init__(self, directory=DEFAULT_INDEX_DIR):
+        self.directory = directory
+        self.digests_path = os.path.join(directory, 'digests.bin')
+        self.pending_path = os.path.join(directory, 'pending.bin')
+        self.sources_path = os.path.join(directory, 'sources.json')
+        self._lock = threading.RLock()
+        self._file = None
+        self._mm = None
+        self._view = _DigestView(b'', 0)
+        self._pending = {}
+        self._pending_count = 0
+        self._sources = []
+        self._signature = None
+        self._open()
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get('AEGIS_LEAK_INDEX') or DEFAULT_INDEX_DIR)
+
+    def _stat_signature(self):
+        signature = []
+        for path in (self.digests_path, self.pending_path, self.sources_path):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _close(self):
+        if self._mm is not None:
+            self._mm.close()
+        if self._file is not None:
+            self._file.close()
+        self._file = self._mm = None
+        self._view = _DigestView(b'', 0)
+
+    def _open(self):
+        """(Re)load the index files as they are on disk"""
+        with self._lock:
+            self._close()
+            self._signature = self._stat_signature()
+
+            try:
+                with open(self.sources_path, 'r', encoding='utf-8') as f:
+                    self._sources = json.load(f)
+            except FileNotFoundError:
+                self._sources = []
+
+            if os.path.exists(self.digests_path) and os.path.getsize(self.digests_path) > len(MAGIC):
+                self._file = open(self.digests_path, 'rb')
+                self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                if self._mm[:len(MAGIC)] != MAGIC:
+                    self._close()
+                    raise ValueError(f'{self.digests_path} is not a leak index file')
+                self._view = _DigestView(self._mm, (len(self._mm) - len(MAGIC)) // RECORD_SIZE)
+
+            self._pending = {}
+            self._pending_count = 0
+            if os.path.exists(self.pending_path):
+                with open(self.pending_path, 'rb') as f:
+                    for record in _iter_records(f):
+                        digest, source_id = RECORD.unpack(record)
+                        self._pending.setdefault(digest, set()).add(source_id)
+                        self._pending_count += 1
+
+    def refresh(self):
+        """Pick up changes written by another process (e.g. the ingest CLI)"""
+        if self._stat_signature() != self._signature:
+            self._open()
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def __len__(self):
+        return len(self._view) + self._pending_count
+
+    def stats(self):
+        return {
+            'entries': len(self._view),
+            'pending': self._pending_count,
+            'sources': len(self._sources)
+        }
+
+    def _write_sources(self):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self._sources, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.sources_path)
+
+    def add_source(self, platform, url='', confidence=100, name=''):
+        """Register source metadata and return its id (existing sources are reused)"""
+        with self._lock:
+            self.refresh()
+            for source in self._sources:
+                if (source['platform'], source['url'], source['name']) == (platform, url, name):
+                    return source['id']
+            source_id = len(self._sources)
+            self._sources.append({
+                'id': source_id,
+                'name': name,
+                'platform': platform,
+                'url': url,
+                'confidence': confidence,
+                'added': time.time()
+            })
+            self._write_sources()
+            self._signature = self._stat_signature()
+            return source_id
+
+    def lookup(self, digest):
+        """Return the sources a digest is indexed under (empty if unknown)"""
+        digest = parse_digest(digest)
+        with self._lock:
+            self.refresh()
+            view = self._view
+            source_ids = set(self._pending.get(digest, ()))
+            i = bisect.bisect_left(view, digest)
+            while i < len(view) and view[i] == digest:
+                source_ids.add(view.source_id(i))
+                i += 1
+            return [dict(self._sources[s]) for s in sorted(source_ids) if s < len(self._sources)]
+
+    def append(self, digest, source_id):
+        """Add one record through the pending journal"""
+        digest = parse_digest(digest)
+        with self._lock:
+            self.refresh()
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.pending_path, 'ab') as f:
+                f.write(RECORD.pack(digest, source_id))
+            self._pending.setdefault(digest, set()).add(source_id)
+            self._pending_count += 1
+            self._signature = self._stat_signature()
+            if self._pending_count >= PENDING_LIMIT:
+                self.compact()
+
+    def compact(self):
+        """Merge the pending journal into digests.bin"""
+        with self._lock:
+            self.refresh()
+            records = sorted(RECORD.pack(d, s) for d, ids in self._pending.items() for s in ids)
+            self._merge([iter(records)])
+
+    def bulk_ingest(self, digests, source_id):
+        """Add many digests under one source; returns the number of digests read.
+
+        Digests are sorted in runs of RUN_SIZE that are spilled to temporary
+        files, then merged with the existing index in one sequential pass.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        run_files = []
+        count = 0
+        try:
+            buffer = []
+            for digest in digests:
+                buffer.append(RECORD.pack(parse_digest(digest), source_id))
+                count += 1
+                if len(buffer) >= RUN_SIZE:
+                    run_files.append(self._spill(buffer))
+                    buffer = []
+
+            with self._lock:
+                self.refresh()
+                runs = [_iter_records(f) for f in run_files]
+                pending = sorted(RECORD.pack(d, s) for d, ids in self._pending.items() for s in ids)
+                runs.append(iter(sorted(buffer)))
+                runs.append(iter(pending))
+                self._merge(runs)
+        finally:
+            for f in run_files:
+                f.close()
+        return count
+
+    def _spill(self, buffer):
+        buffer.sort()
+        f = tempfile.TemporaryFile(dir=self.directory)
+        f.write(b''.join(buffer))
+        f.seek(0)
+        return f
+
+    def _merge(self, runs):
+        """Write digests.bin as the merge of itself and the sorted runs, then clear the journal"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                out.write(MAGIC)
+                existing = (self._mm[len(MAGIC) + i * RECORD_SIZE:len(MAGIC) + (i + 1) * RECORD_SIZE]
+                            for i in range(len(self._view)))
+                previous = None
+                for record in heapq.merge(existing, *runs):
+                    if record != previous:
+                        out.write(record)
+                        previous = record
+            self._close()
+            os.replace(tmp_path, self.digests_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if os.path.exists(self.pending_path):
+            os.remove(self.pending_path)
+        self._open()
+
+
+def _read_digest_lists(paths):
+    """Hex digests from text files (one per line, '#' comments), '-' for stdin"""
+    for path in paths:
+        f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+        try:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    yield line.split()[0]
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def _walk_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the local leak hash index')
+    parser.add_argument('--index', default=os.environ.get('AEGIS_LEAK_INDEX') or DEFAULT_INDEX_DIR,
+                        help='Index directory (default: $AEGIS_LEAK_INDEX or aegis_leak_index)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def source_args(p):
+        p.add_argument('--platform', required=True, help='Where the leak was found, e.g. Telegram')
+        p.add_argument('--url', default='', help='Link to the leak')
+        p.add_argument('--name', default='', help='Label for the source')
+        p.add_argument('--confidence', type=int, default=100)
+
+    p = commands.add_parser('ingest', help='Bulk-add digests from hash list files')
+    source_args(p)
+    p.add_argument('files', nargs='+', help="Text files of hex SHA-256 digests, '-' for stdin")
+
+    p = commands.add_parser('ingest-files', help='Hash files or directories and add them')
+    source_args(p)
+    p.add_argument('paths', nargs='+')
+
+    p = commands.add_parser('add', help='Append a single digest')
+    source_args(p)
+    p.add_argument('digest')
+
+    commands.add_parser('compact', help='Merge pending appends into the sorted index')
+    commands.add_parser('stats', help='Show index size')
+
+    p = commands.add_parser('lookup', help='Look up a digest or a file')
+    p.add_argument('target')
+
+    args = parser.parse_args()
+    index = LeakIndex(args.index)
+
+    if args.command in ('ingest', 'ingest-files', 'add'):
+        source_id = index.add_source(args.platform, args.url, args.confidence, args.name)
+        if args.command == 'add':
+            index.append(args.digest, source_id)
+            print(f"✅ Added 1 digest for {args.platform}")
+        else:
+            digests = (_read_digest_lists(args.files) if args.command == 'ingest'
+                       else (hash_file(path) for path in _walk_files(args.paths)))
+            count = index.bulk_ingest(digests, source_id)
+            print(f"✅ Ingested {count} digests for {args.platform}")
+    elif args.command == 'compact':
+        index.compact()
+        print("✅ Compacted index")
+    elif args.command == 'lookup':
+        digest = hash_file(args.target) if os.path.isfile(args.target) else args.target
+        sources = index.lookup(digest)
+        if sources:
+            print(f"🚨 Found in {len(sources)} source(s):")
+            for source in sources:
+                print(f"   - {source['platform']} {source['url']} ({source['confidence']}%)")
+        else:
+            print("✅ Not in the index")
+
+    print(f"📊 {json.dumps(index.stats())}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""Load generator for the API server.
+
+Runs each scenario at increasing concurrency and reports throughput and
+p50/p95/p99 latency per endpoint. With --spawn it first starts
+stub_services.py and api_server.py on local ports, wired to the stand-ins
+(synthetic YouTube comments, stub Apify and Groq), so it needs no network
+access:
+
+    python load_test.py --spawn --concurrency 1,4,16 --requests 200
+    python load_test.py --spawn --stub-latency 0.05 --http-error-rate 0.02 --scenarios analyze,instagram
+    python load_test.py --base-url http://staging:5000 --scenarios health,analyze_stats
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from comment_corpus import generate_comments
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONCURRENCY = (1, 4, 16)
+DEFAULT_SCENARIOS = ('health', 'analyze', 'analyze_stats', 'scrape', 'detect_bots', 'instagram')
+STARTUP_TIMEOUT = 60
+
+
+def video_id(i, videos):
+    """11-character video ID, cycling through `videos` distinct ones"""
+    return f'load{i % videos:07d}'
+
+
+def build_scenarios(videos, limit):
+    """Scenario name -> (method, path, function of the request number returning the JSON body)"""
+    bot_comments = list(generate_comments(500, 'load-test'))
+    return {
+        'health': ('GET', '/api/health', lambda i: None),
+        'analyze': ('POST', '/api/analyze', lambda i: {
+            'video_url': video_id(i, videos), 'limit': limit, 'use_store': False}),
+        'analyze_stats': ('POST', '/api/analyze', lambda i: {
+            'video_url': video_id(i, videos), 'limit': limit, 'use_store': False, 'fields': 'statistics'}),
+        'scrape': ('POST', '/api/scrape', lambda i: {
+            'video_url': video_id(i, videos), 'limit': limit, 'use_store': False, 'page_size': 100}),
+        'detect_bots': ('POST', '/api/detect-bots', lambda i: {'comments': bot_comments}),
+        'instagram': ('POST', '/api/instagram-analyze', lambda i: {
+            'post_url': f'https://www.instagram.com/p/load{i % videos:07d}/',
+            'apify_token': 'stub', 'groq_api_key': 'stub', 'comments_limit': 30}),
+    }
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_level(base_url, scenario, concurrency, total, timeout):
+    """Send `total` requests of one scenario with `concurrency` in flight; returns the stats"""
+    method, path, body = scenario
+    local = threading.local()
+
+    def send(i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, json=body(i), timeout=timeout)
+            ok = response.status_code < 400
+            if ok and response.headers.get('Content-Type', '').startswith('application/json'):
+                ok = response.json().get('success', True) is not False
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(send, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in outcomes)
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'errors': sum(1 for _, ok in outcomes if not ok),
+        'throughput': total / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port, process, timeout=STARTUP_TIMEOUT):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Process exited with status {process.returncode} during startup')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Nothing listening on port {port} after {timeout}s')
+
+
+def spawn_servers(args):
+    """Start the stand-ins and an API server using them; returns (base URL, processes)"""
+    stub_port = _free_port()
+    api_port = _free_port()
+    workdir = tempfile.mkdtemp(prefix='aegis_load_')
+    stub_url = f'http://127.0.0.1:{stub_port}'
+
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'stub_services.py'), '--port', str(stub_port),
+         '--latency', str(args.stub_latency), '--jitter', str(args.stub_jitter),
+         '--http-error-rate', str(args.http_error_rate), '--seed', '0'],
+        cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    env = dict(
+        os.environ,
+        AEGIS_YOUTUBE_BACKEND='fake',
+        AEGIS_FAKE_COMMENTS=str(args.limit),
+        AEGIS_FAKE_LATENCY=str(args.youtube_latency),
+        AEGIS_FAKE_ERROR_RATE=str(args.youtube_error_rate),
+        AEGIS_COMMENT_DB='',
+        AEGIS_LEAK_INDEX=os.path.join(workdir, 'leak_index'),
+        AEGIS_CHUNK_INDEX=os.path.join(workdir, 'chunks.db'),
+        GROQ_BASE_URL=stub_url,
+        APIFY_BASE_URL=stub_url,
+        ACTOR_ID='stub~instagram-scraper',
+    )
+    api = subprocess.Popen(
+        [sys.executable, '-c',
+         f"import api_server; api_server.app.run(host='127.0.0.1', port={api_port}, threaded=True)"],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    processes = [stub, api]
+    try:
+        _wait_for_port(stub_port, stub)
+        _wait_for_port(api_port, api)
+    except Exception:
+        stop_servers(processes)
+        raise
+    print(f"🧪 Stub services on {stub_url}, API server on http://127.0.0.1:{api_port}")
+    return f'http://127.0.0.1:{api_port}', processes
+
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the Aegis API server')
+    parser.add_argument('--base-url', default='http://localhost:5000', help='API server to test (ignored with --spawn)')
+    parser.add_argument('--spawn', action='store_true', help='Start local stand-ins and an API server first')
+    parser.add_argument('--scenarios', default=','.join(DEFAULT_SCENARIOS))
+    parser.add_argument('--concurrency', default=','.join(map(str, DEFAULT_CONCURRENCY)),
+                        help='Comma-separated concurrency levels, run in order')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per scenario and level')
+    parser.add_argument('--videos', type=int, default=20, help='Distinct video IDs/posts to cycle through')
+    parser.add_argument('--limit', type=int, default=200, help='Comments per video')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Per-request timeout in seconds')
+    parser.add_argument('--stub-latency', type=float, default=0.0, help='Apify/Groq stand-in latency (s)')
+    parser.add_argument('--stub-jitter', type=float, default=0.0)
+    parser.add_argument('--http-error-rate', type=float, default=0.0, help='Apify/Groq stand-in HTTP error rate')
+    parser.add_argument('--youtube-latency', type=float, default=0.0, help='Fake scrape latency per page (s)')
+    parser.add_argument('--youtube-error-rate', type=float, default=0.0, help='Fraction of failing fake scrapes')
+    parser.add_argument('-o', '--output', help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    scenarios = build_scenarios(args.videos, args.limit)
+    names = [n.strip() for n in args.scenarios.split(',') if n.strip()]
+    unknown = set(names) - set(scenarios)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))} (use {', '.join(scenarios)})")
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+
+    processes = []
+    base_url = args.base_url.rstrip('/')
+    if args.spawn:
+        base_url, processes = spawn_servers(args)
+
+    results = []
+    try:
+        print(f"{'scenario':<14} {'conc':>5} {'reqs':>6} {'errors':>7} {'req/s':>8} "
+              f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name in names:
+            for concurrency in levels:
+                stats = run_level(base_url, scenarios[name], concurrency, args.requests, args.timeout)
+                results.append(dict(scenario=name, **stats))
+                print(f"{name:<14} {concurrency:>5} {stats['requests']:>6} {stats['errors']:>7} "
+                      f"{stats['throughput']:>8.1f} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+                      f"{stats['p99_ms']:>9.1f}", flush=True)
+    finally:
+        if processes:
+            stop_servers(processes)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'base_url': base_url, 'results': results}, f, indent=2)
+        print(f"\n💾 Results saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
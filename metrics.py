@@ -0,0 +1,273 @@
+"""Counters and histograms for the analysis pipeline, in Prometheus text format.
+
+Stages are timed with `timed(stage)`, which observes the stage histogram and
+also adds the time to the current request's breakdown, if one was started
+with `start_timings()` or `collect_timings()` (returned to clients that ask
+for `timings`). Instrumentation sits around
+whole stages and external calls, never inside per-comment loops, so it costs
+a few microseconds per request.
+
+The registry is dependency-free and per process; /api/metrics renders it.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds, from sub-millisecond detector passes to slow scrapes
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RATE_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(f'{name}{labels} {_format_value(value)}' for name, labels, value in self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count per label combination"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in values]
+
+
+class Gauge(_Metric):
+    """Current value per label combination, or read from `function` when rendering"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        if self.function is not None:
+            # function() returns a number, or {label value(s): number} for labelled gauges
+            values = self.function()
+            if not isinstance(values, dict):
+                values = {(): values}
+            values = [(key if isinstance(key, tuple) else (key,), value) for key, value in values.items()]
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in values]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self):
+        with self._lock:
+            values = [(key, list(counts), total, n) for key, (counts, total, n) in self._values.items()]
+        samples = []
+        for key, counts, total, n in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+                samples.append((f'{self.name}_bucket', labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((f'{self.name}_sum', labels, total))
+            samples.append((f'{self.name}_count', labels, n))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} is already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'aegis_stage_seconds', 'Time spent per pipeline stage', ('stage',))
+SCRAPED_COMMENTS = REGISTRY.counter(
+    'aegis_scraped_comments_total', 'Comments scraped, by source', ('source',))
+SCRAPE_RATE = REGISTRY.histogram(
+    'aegis_scrape_comments_per_second', 'Scrape throughput per video', ('source',), RATE_BUCKETS)
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    'aegis_llm_request_seconds', 'Latency of LLM classification calls', ('outcome',))
+LLM_BATCH_SIZE = REGISTRY.histogram(
+    'aegis_llm_batch_size', 'Comments per LLM classification call', buckets=BATCH_SIZE_BUCKETS)
+APIFY_REQUESTS = REGISTRY.counter(
+    'aegis_apify_requests_total', 'Apify scraper calls, by HTTP status', ('status',))
+CACHE_LOOKUPS = REGISTRY.counter(
+    'aegis_cache_lookups_total', 'Cache lookups, by cache and result (hit/miss)', ('cache', 'result'))
+TRIAGE_DECISIONS = REGISTRY.counter(
+    'aegis_triage_decisions_total', 'Comments decided by the local triage model or sent to the LLM', ('decision',))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'aegis_http_request_seconds', 'API response time until the body starts', ('endpoint', 'method', 'status'))
+
+_breakdown = contextvars.ContextVar('aegis_timings', default=None)
+
+
+class Timings:
+    """Per-request stage breakdown"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def to_dict(self):
+        return {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 2),
+            'stages_ms': {stage: round(seconds * 1000, 2) for stage, seconds in self.stages.items()}
+        }
+
+
+def start_timings():
+    """Record the stages timed from here on in this thread (or context) into a new Timings"""
+    timings = Timings()
+    _breakdown.set(timings)
+    return timings
+
+
+@contextmanager
+def collect_timings():
+    """Record the stages timed in this context (and this thread) into a Timings"""
+    timings = Timings()
+    token = _breakdown.set(timings)
+    try:
+        yield timings
+    finally:
+        _breakdown.reset(token)
+
+
+class _Stage:
+    seconds = 0.0
+
+
+@contextmanager
+def timed(stage):
+    """Time a block as `stage`; the yielded object holds the elapsed seconds afterwards"""
+    record = _Stage()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(record.seconds, stage=stage)
+        timings = _breakdown.get()
+        if timings is not None:
+            timings.add(stage, record.seconds)
+
+
+def record_scrape(count, seconds, source):
+    SCRAPED_COMMENTS.inc(count, source=source)
+    if count and seconds > 0:
+        SCRAPE_RATE.observe(count / seconds, source=source)
+
+
+def record_cache(cache, hits, misses):
+    if hits:
+        CACHE_LOOKUPS.inc(hits, cache=cache, result='hit')
+    if misses:
+        CACHE_LOOKUPS.inc(misses, cache=cache, result='miss')
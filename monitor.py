@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""Continuous monitoring of a watch list of videos.
+
+Each video is polled on its own schedule. A poll downloads only comments
+newer than the stored ones and feeds just that delta to the video's
+RunningAnalysis (YouTubeAnalyzer.update_analysis), so detectors never
+rescan old comments. The state is saved in the comment store, and a
+restarted monitor carries on where it stopped. Poll intervals follow
+comment velocity: the next poll is timed to find about `target_new`
+comments, within [min_interval, max_interval], so busy videos are checked
+often and quiet ones back off. At most `concurrency` videos are scraped at
+once across the whole list.
+
+An alert fires whenever a video's threat level rises to or past the
+threshold; handlers print it or POST it to a webhook.
+
+    python monitor.py watch_list.txt --threshold HIGH --webhook https://hooks.example.com/aegis
+    python monitor.py dQw4w9WgXcQ,9bZkp7q1a2s --min-interval 30 --max-interval 1800 --concurrency 2
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from author_index import AuthorIndex
+from comment_store import CommentStore
+from http_clients import build_session
+from keyword_index import KeywordCatalogs
+from youtube_analyzer import YouTubeAnalyzer
+
+THREAT_LEVELS = ('LOW', 'MODERATE', 'HIGH', 'CRITICAL')
+DEFAULT_THRESHOLD = 'HIGH'
+DEFAULT_MIN_INTERVAL = 60.0
+DEFAULT_MAX_INTERVAL = 3600.0
+DEFAULT_TARGET_NEW = 50
+DEFAULT_CONCURRENCY = 2
+DEFAULT_LIMIT = 500
+# Interval growth after a poll that found nothing new
+IDLE_BACKOFF = 2.0
+# Weight of the latest poll in the comment velocity estimate
+VELOCITY_SMOOTHING = 0.5
+
+
+class WatchedVideo:
+    """Schedule and running detector state of one video on the watch list"""
+
+    def __init__(self, video_id, analyzer, keywords=None, keyword_mode='substring',
+                 min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL):
+        self.video_id = video_id
+        self.keywords = keywords
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = min_interval
+        self.next_due = 0.0
+        self.last_polled = None
+        self.velocity = None  # new comments per second, smoothed
+        self.polls = 0
+        self.last_error = None
+        self.running = analyzer.load_analysis(video_id, keywords, keyword_mode)
+        # A restarted monitor only alerts on levels above what the saved state already had
+        self.threat_level = self.running.statistics()['threat_level'] if self.running.total_comments else None
+
+    def reschedule(self, new_comments, now):
+        """Pick the next interval from the comment velocity since the previous poll"""
+        if self.last_polled is not None:
+            rate = new_comments / max(now - self.last_polled, 1e-6)
+            if self.velocity is None:
+                self.velocity = rate
+            else:
+                self.velocity = VELOCITY_SMOOTHING * rate + (1 - VELOCITY_SMOOTHING) * self.velocity
+
+        if self.last_polled is not None and not new_comments:
+            interval = self.interval * IDLE_BACKOFF
+        elif self.velocity:
+            interval = DEFAULT_TARGET_NEW / self.velocity
+        else:
+            interval = self.min_interval
+        self.interval = min(self.max_interval, max(self.min_interval, interval))
+        self.last_polled = now
+        self.next_due = now + self.interval
+
+    def status(self):
+        return {
+            'video_id': self.video_id,
+            'polls': self.polls,
+            'threat_level': self.threat_level,
+            'total_comments': self.running.total_comments,
+            'interval': round(self.interval, 1),
+            'next_due': datetime.fromtimestamp(self.next_due).isoformat(timespec='seconds') if self.next_due else None,
+            'comments_per_minute': round(self.velocity * 60, 2) if self.velocity is not None else None,
+            'last_error': self.last_error
+        }
+
+
+def print_alert(alert):
+    print(f"🚨 {alert['video_id']}: threat level {alert['previous_level'] or 'none'} → {alert['threat_level']} "
+          f"({alert['new_comments']} new comments; {alert['statistics']['harassment_comments']} harassment, "
+          f"{alert['statistics']['bot_comments']} bot, {alert['statistics']['copyright_violations']} copyright)")
+
+
+def webhook_alert(url, timeout=10):
+    """Alert handler POSTing each alert as JSON to `url`"""
+    session = build_session(pool_size=1)
+
+    def send(alert):
+        try:
+            response = session.post(url, json=alert, timeout=timeout)
+            if response.status_code >= 400:
+                print(f"❌ Webhook returned HTTP {response.status_code} for {alert['video_id']}")
+        except Exception as e:
+            print(f"❌ Webhook failed for {alert['video_id']}: {e}")
+    return send
+
+
+class Monitor:
+    """Polls watched videos on adaptive schedules with a cap on concurrent scrapes"""
+
+    def __init__(self, analyzer, limit=DEFAULT_LIMIT, concurrency=DEFAULT_CONCURRENCY, threshold=DEFAULT_THRESHOLD,
+                 alert_handlers=None):
+        if analyzer.store is None:
+            raise ValueError('Monitoring needs a comment store to tell new comments from seen ones')
+        if threshold not in THREAT_LEVELS:
+            raise ValueError(f"Unknown threat level '{threshold}' (use {', '.join(THREAT_LEVELS)})")
+        self.analyzer = analyzer
+        self.limit = limit
+        self.concurrency = max(1, concurrency)
+        self.threshold = threshold
+        self.alert_handlers = list(alert_handlers) if alert_handlers is not None else [print_alert]
+        self.videos = {}
+        self._stop = threading.Event()
+
+    def watch(self, video, keywords=None, keyword_mode='substring', min_interval=DEFAULT_MIN_INTERVAL,
+              max_interval=DEFAULT_MAX_INTERVAL):
+        """Add a video URL or ID to the watch list; returns its WatchedVideo"""
+        video_id = self.analyzer.extract_video_id(video)
+        if not video_id:
+            raise ValueError(f'Invalid YouTube URL or video ID: {video}')
+        watched = WatchedVideo(video_id, self.analyzer, keywords, keyword_mode, min_interval, max_interval)
+        self.videos[video_id] = watched
+        return watched
+
+    def poll(self, watched):
+        """Fetch a video's new comments, analyze only those and return the alert, if any"""
+        new_comments, _ = self.analyzer.update_analysis(watched.video_id, watched.running, self.limit)
+
+        watched.polls += 1
+        watched.last_error = None
+        watched.reschedule(len(new_comments), time.time())
+
+        previous = watched.threat_level
+        statistics = watched.running.statistics()
+        watched.threat_level = statistics['threat_level']
+        print(f"🔁 {watched.video_id}: +{len(new_comments)} new, {statistics['total_comments']} total, "
+              f"threat {watched.threat_level}, next poll in {watched.interval:.0f}s")
+
+        rank = THREAT_LEVELS.index(watched.threat_level)
+        if rank >= THREAT_LEVELS.index(self.threshold) and (previous is None or rank > THREAT_LEVELS.index(previous)):
+            return {
+                'video_id': watched.video_id,
+                'video_url': f'https://www.youtube.com/watch?v={watched.video_id}',
+                'timestamp': datetime.now().isoformat(),
+                'previous_level': previous,
+                'threat_level': watched.threat_level,
+                'threshold': self.threshold,
+                'new_comments': len(new_comments),
+                'statistics': statistics
+            }
+        return None
+
+    def _poll_safely(self, watched):
+        try:
+            return self.poll(watched)
+        except Exception as e:
+            # Try again after the longest wait rather than hammering a failing video
+            print(f"❌ Error polling {watched.video_id}: {e}")
+            watched.last_error = str(e)
+            watched.interval = watched.max_interval
+            watched.next_due = time.time() + watched.interval
+            return None
+
+    def _alert(self, alert):
+        for handler in self.alert_handlers:
+            handler(alert)
+
+    def run_once(self):
+        """Poll every video now (at most `concurrency` at a time); returns the alerts"""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            alerts = [a for a in pool.map(self._poll_safely, list(self.videos.values())) if a]
+        for alert in alerts:
+            self._alert(alert)
+        return alerts
+
+    def run(self, duration=None):
+        """Poll videos as they come due until stop() is called or `duration` seconds pass"""
+        deadline = time.time() + duration if duration is not None else None
+        in_flight = {}  # future -> WatchedVideo
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while not self._stop.is_set() and (deadline is None or time.time() < deadline):
+                now = time.time()
+                busy = set(in_flight.values())
+                due = sorted((v for v in self.videos.values() if v not in busy and v.next_due <= now),
+                             key=lambda v: v.next_due)
+                # Only hand the pool what it can start now, so the most overdue videos go first next time
+                for watched in due[:self.concurrency - len(in_flight)]:
+                    in_flight[pool.submit(self._poll_safely, watched)] = watched
+
+                # Sleep until the next video comes due, or while the pool is full until a poll finishes
+                timeout = None
+                if len(in_flight) < self.concurrency:
+                    busy = set(in_flight.values())
+                    waiting = [v.next_due for v in self.videos.values() if v not in busy]
+                    timeout = max(0.0, min(waiting) - time.time()) if waiting else None
+                if deadline is not None:
+                    remaining = max(0.0, deadline - time.time())
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                if in_flight:
+                    done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        del in_flight[future]
+                        alert = future.result()
+                        if alert:
+                            self._alert(alert)
+                else:
+                    self._stop.wait(timeout if timeout is not None else 1.0)
+
+            for future in in_flight:
+                alert = future.result()
+                if alert:
+                    self._alert(alert)
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        return [watched.status() for watched in self.videos.values()]
+
+
+def load_watch_list(source):
+    """Watch list entries from a JSON file, a text file (one video per line) or a comma-separated string
+
+    JSON entries are video strings or objects with "video" and optional
+    "keywords", "min_interval" and "max_interval".
+    """
+    if os.path.isfile(source):
+        with open(source, encoding='utf-8') as f:
+            if source.endswith('.json'):
+                entries = json.load(f)
+            else:
+                entries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    else:
+        entries = [v.strip() for v in source.split(',') if v.strip()]
+    return [entry if isinstance(entry, dict) else {'video': entry} for entry in entries]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monitor a watch list of YouTube videos')
+    parser.add_argument('videos', help='Comma-separated video URLs/IDs, a text file with one per line, or a JSON file')
+    parser.add_argument('--keywords', help='Comma-separated keywords or catalog: references for every video')
+    parser.add_argument('--keyword-mode', default='substring', choices=('substring', 'word'))
+    parser.add_argument('--min-interval', type=float, default=DEFAULT_MIN_INTERVAL, help='Seconds')
+    parser.add_argument('--max-interval', type=float, default=DEFAULT_MAX_INTERVAL, help='Seconds')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='Newest comments kept per video')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Videos scraped at the same time across the watch list')
+    parser.add_argument('--threshold', default=DEFAULT_THRESHOLD, choices=THREAT_LEVELS)
+    parser.add_argument('--webhook', help='POST alerts as JSON to this URL (alerts are printed either way)')
+    parser.add_argument('--db', default=os.environ.get('AEGIS_COMMENT_DB') or 'aegis_comments.db',
+                        help='Comment store holding the comments already seen')
+    parser.add_argument('--duration', type=float, help='Stop after this many seconds')
+    parser.add_argument('--once', action='store_true', help='Poll every video once and exit')
+    args = parser.parse_args()
+
+    catalogs = KeywordCatalogs.from_env()
+    default_keywords = catalogs.resolve(args.keywords.split(',')) if args.keywords else None
+
+    handlers = [print_alert]
+    if args.webhook:
+        handlers.append(webhook_alert(args.webhook))
+
+    try:
+        analyzer = YouTubeAnalyzer(store=CommentStore(args.db), authors=AuthorIndex.from_env())
+        monitor = Monitor(analyzer, args.limit, args.concurrency, args.threshold, handlers)
+        for entry in load_watch_list(args.videos):
+            keywords = catalogs.resolve(entry['keywords']) if entry.get('keywords') else default_keywords
+            monitor.watch(entry['video'], keywords, args.keyword_mode,
+                          float(entry.get('min_interval', args.min_interval)),
+                          float(entry.get('max_interval', args.max_interval)))
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    print(f"👀 Monitoring {len(monitor.videos)} videos (threshold {args.threshold}, "
+          f"{args.concurrency} concurrent scrapes)")
+    try:
+        if args.once:
+            monitor.run_once()
+        else:
+            monitor.run(args.duration)
+    except KeyboardInterrupt:
+        monitor.stop()
+
+    print("\n" + "="*60)
+    print("📊 MONITOR STATUS")
+    print("="*60)
+    for status in monitor.status():
+        print(f"{status['video_id']}: {status['polls']} polls, {status['total_comments']} comments, "
+              f"threat {status['threat_level']}, interval {status['interval']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+"""Near-duplicate text grouping used by the bot detector.
+
+Comments are grouped the same way the original pairwise SequenceMatcher loop
+did it (every comment joins the earliest earlier "leader" it is more than 85%
+similar to, otherwise it becomes a leader itself), but candidate leaders come
+from a MinHash/LSH table over character shingles instead of a scan of every
+earlier comment.
+"""
+import base64
+import hashlib
+import random
+import sys
+import zlib
+from array import array
+from difflib import SequenceMatcher
+
+SIMILARITY_THRESHOLD = 0.85
+SHINGLE_SIZE = 3
+NUM_BINS = 48
+BAND_SIZE = 3
+
+# Short texts have too few 3-shingles for reliable banding, so they are also
+# indexed by 2-shingles in a separate table. Leaders up to the longest length
+# a short text can still be 85% similar to are kept there.
+SHORT_TEXT_LENGTH = 24
+SHORT_LEADER_LENGTH = 33
+SHORT_NUM_BINS = 32
+SHORT_BAND_SIZE = 2
+
+_MASK = 0xFFFFFFFF
+_EMPTY = _MASK + 1
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Return the set of character shingles of a text"""
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def is_similar(text1, text2, matcher=None, threshold=SIMILARITY_THRESHOLD):
+    """Same test as SequenceMatcher(None, text1, text2).ratio() > threshold.
+
+    The cheap upper bounds are checked first so most non-matches never reach
+    the full ratio() computation. Pass a matcher with seq2 already set to
+    text2 to reuse its cached analysis across many calls.
+    """
+    if matcher is None:
+        matcher = SequenceMatcher(None, text1, text2)
+    else:
+        matcher.set_seq1(text1)
+    return (matcher.real_quick_ratio() > threshold
+            and matcher.quick_ratio() > threshold
+            and matcher.ratio() > threshold)
+
+
+def text_digest(text):
+    """64-bit digest standing in for a text as a dict key"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def minhash_signature(shingle_set, num_bins=NUM_BINS):
+    """One-permutation MinHash signature with rotation densification"""
+    bins = [_EMPTY] * num_bins
+    for shingle in shingle_set:
+        h = zlib.crc32(shingle.encode('utf-8'))
+        b = h % num_bins
+        if h < bins[b]:
+            bins[b] = h
+
+    # Empty bins borrow the value of the next filled bin so that short texts
+    # still produce a full signature
+    if _EMPTY in bins:
+        filled = {i for i, v in enumerate(bins) if v != _EMPTY}
+        if not filled:
+            return tuple(bins)
+        for i in range(num_bins):
+            if bins[i] == _EMPTY:
+                for distance in range(1, num_bins):
+                    j = (i + distance) % num_bins
+                    if j in filled:
+                        bins[i] = (bins[j] + distance * 0x9E3779B1) & _MASK
+                        break
+    return tuple(bins)
+
+
+class NearDuplicateIndex:
+    """Incremental greedy grouping of near-identical texts.
+
+    Texts are added in order; add() returns the position of the group leader
+    the text joined. Only leaders are stored in the LSH buckets, which is
+    enough because a text can only ever join a leader. Only leader texts are
+    kept; other texts are remembered by their digest. With max_members set,
+    each group lists at most that many member positions (sizes stay exact).
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, shingle_size=SHINGLE_SIZE,
+                 num_bins=NUM_BINS, band_size=BAND_SIZE, max_members=None):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.num_bins = num_bins
+        self.band_size = band_size
+        self.max_members = max_members
+        self.size = 0
+        self.groups = {}         # leader position -> member positions (the first max_members)
+        self.sizes = {}          # leader position -> number of members
+        self._leader_text = {}   # leader position -> text
+        self._text_leader = {}   # text digest -> leader it joined
+        self._buckets = [{} for _ in range(num_bins // band_size)]
+        self._short_buckets = [{} for _ in range(SHORT_NUM_BINS // SHORT_BAND_SIZE)]
+
+    @staticmethod
+    def _split(signature, band_size):
+        return [signature[i:i + band_size] for i in range(0, len(signature), band_size)]
+
+    def _lookup(self, tables, candidates):
+        for buckets, bands in tables:
+            for bucket, band in zip(buckets, bands):
+                members = bucket.get(band)
+                if members:
+                    candidates.update(members)
+
+    def _tables(self, text, shingle_set):
+        if shingle_set is None:
+            shingle_set = shingles(text, self.shingle_size)
+        tables = [(self._buckets, self._split(
+            minhash_signature(shingle_set, self.num_bins), self.band_size))]
+        if len(text) < SHORT_LEADER_LENGTH:
+            tables.append((self._short_buckets, self._split(
+                minhash_signature(shingles(text, 2), SHORT_NUM_BINS), SHORT_BAND_SIZE)))
+        return tables
+
+    def _find_leader(self, text, tables):
+        """Earliest leader the text is similar to, or None"""
+        candidates = set()
+        self._lookup(tables if len(text) < SHORT_TEXT_LENGTH else tables[:1], candidates)
+        if candidates:
+            matcher = SequenceMatcher(None)
+            matcher.set_seq2(text)
+            for candidate in sorted(candidates):
+                if is_similar(self._leader_text[candidate], text, matcher, self.threshold):
+                    return candidate
+        return None
+
+    def _join(self, leader, positions, count):
+        self.sizes[leader] += count
+        members = self.groups[leader]
+        if self.max_members is None:
+            members.extend(positions)
+        else:
+            members.extend(positions[:self.max_members - len(members)])
+
+    def _new_leader(self, position, text, tables):
+        self.groups[position] = []
+        self.sizes[position] = 0
+        self._leader_text[position] = text
+        for buckets, bands in tables:
+            for bucket, band in zip(buckets, bands):
+                bucket.setdefault(band, []).append(position)
+
+    def add(self, text, shingle_set=None, digest=None):
+        """Add the next text and return the position of its group leader"""
+        position = self.size
+        self.size += 1
+        if digest is None:
+            digest = text_digest(text)
+
+        # Identical texts always join the same leader as the first copy
+        leader = self._text_leader.get(digest)
+        if leader is None:
+            tables = self._tables(text, shingle_set)
+            leader = self._find_leader(text, tables)
+            if leader is None:
+                leader = position
+                self._new_leader(position, text, tables)
+            self._text_leader[digest] = leader
+        self._join(leader, [position], 1)
+        return leader
+
+    def merge(self, other):
+        """Append another index, built from the texts that came after ours.
+
+        Only the other side's leader texts are kept, so they are replayed in
+        order and each of its groups joins whichever group its leader joins
+        here. Returns a map from the other side's leaders to leaders here.
+        """
+        offset = self.size
+        leaders = {}
+        for leader in sorted(other.sizes):
+            text = other._leader_text[leader]
+            ours = self._text_leader.get(text_digest(text))
+            if ours is None:
+                tables = self._tables(text, None)
+                ours = self._find_leader(text, tables)
+                if ours is None:
+                    ours = offset + leader
+                    self._new_leader(ours, text, tables)
+            leaders[leader] = ours
+            self._join(ours, [offset + p for p in other.groups[leader]], other.sizes[leader])
+        for digest, leader in other._text_leader.items():
+            self._text_leader.setdefault(digest, leaders[leader])
+        self.size += other.size
+        return leaders
+
+    def extend(self, texts, shingle_sets=None):
+        if shingle_sets is None:
+            shingle_sets = [None] * len(texts)
+        for text, shingle_set in zip(texts, shingle_sets):
+            self.add(text, shingle_set)
+
+    def leader_text(self, leader):
+        return self._leader_text[leader]
+
+    def to_dict(self):
+        """JSON-serializable state, LSH tables included so loading needs no hashing"""
+        return {
+            'threshold': self.threshold,
+            'shingle_size': self.shingle_size,
+            'num_bins': self.num_bins,
+            'band_size': self.band_size,
+            'max_members': self.max_members,
+            'size': self.size,
+            'groups': [[leader, self.sizes[leader], members] for leader, members in self.groups.items()],
+            'leader_texts': [[leader, text] for leader, text in self._leader_text.items()],
+            'text_leaders': [[digest, leader] for digest, leader in self._text_leader.items()],
+            'bands': _pack_bands(self._buckets),
+            'short_bands': _pack_bands(self._short_buckets)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data['threshold'], data['shingle_size'], data['num_bins'], data['band_size'],
+                    data['max_members'])
+        index.size = data['size']
+        index.groups = {leader: list(members) for leader, _, members in data['groups']}
+        index.sizes = {leader: size for leader, size, _ in data['groups']}
+        index._leader_text = {leader: text for leader, text in data['leader_texts']}
+        index._text_leader = {digest: leader for digest, leader in data['text_leaders']}
+        _unpack_bands(data['bands'], index._buckets, index.band_size)
+        _unpack_bands(data['short_bands'], index._short_buckets, SHORT_BAND_SIZE)
+        return index
+
+    def similar_groups(self, min_size=1):
+        """Groups in leader order, each a list of positions"""
+        return [self.groups[leader] for leader, size in sorted(self.sizes.items())
+                if size >= min_size]
+
+
+def _encode_array(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode('ascii')
+
+
+def _decode_array(typecode, text):
+    values = array(typecode)
+    values.frombytes(base64.b64decode(text))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _pack_bands(buckets):
+    """An LSH table as base64 arrays: the indexed leaders, and each one's bands in table order"""
+    bands_by_leader = {}
+    for i, bucket in enumerate(buckets):
+        for band, members in bucket.items():
+            for leader in members:
+                bands_by_leader.setdefault(leader, [None] * len(buckets))[i] = band
+    leaders = sorted(bands_by_leader)
+    values = [value for leader in leaders for band in bands_by_leader[leader] for value in band]
+    # A bin value is 2**32 only for an empty shingle set, which never happens in practice
+    typecode = 'I' if not values or max(values) <= _MASK else 'Q'
+    return {
+        'typecode': typecode,
+        'leaders': _encode_array(array('Q', leaders)),
+        'values': _encode_array(array(typecode, values))
+    }
+
+
+def _unpack_bands(packed, buckets, band_size):
+    leaders = _decode_array('Q', packed['leaders'])
+    values = _decode_array(packed['typecode'], packed['values']).tolist()
+    width = band_size * len(buckets)
+    for n, leader in enumerate(leaders):
+        start = n * width
+        for bucket, offset in zip(buckets, range(start, start + width, band_size)):
+            bucket.setdefault(tuple(values[offset:offset + band_size]), []).append(leader)
+
+
+def find_similar_groups(texts, threshold=SIMILARITY_THRESHOLD, min_size=1, shingle_sets=None):
+    """Group near-identical texts in roughly linear time"""
+    index = NearDuplicateIndex(threshold)
+    index.extend(texts, shingle_sets)
+    return index.similar_groups(min_size)
+
+
+def pairwise_similar_groups(texts, threshold=SIMILARITY_THRESHOLD, min_size=1):
+    """Reference O(n^2) grouping, identical to the original detector loop"""
+    groups = []
+    checked = set()
+    for i, text1 in enumerate(texts):
+        if i in checked:
+            continue
+
+        group = [i]
+        for j in range(i + 1, len(texts)):
+            if j in checked:
+                continue
+            if SequenceMatcher(None, text1, texts[j]).ratio() > threshold:
+                group.append(j)
+                checked.add(j)
+
+        if len(group) >= min_size:
+            groups.append(group)
+    return groups
+
+
+def verify_similar_groups(texts, sample_size=500, min_size=3, seed=0,
+                          threshold=SIMILARITY_THRESHOLD):
+    """Check the LSH grouping against the pairwise reference on a sample.
+
+    A random sample (kept in original order) is grouped both ways; groups are
+    reported as lists of positions into ``texts``.
+    """
+    positions = list(range(len(texts)))
+    if len(positions) > sample_size:
+        positions = sorted(random.Random(seed).sample(positions, sample_size))
+    sample = [texts[p] for p in positions]
+
+    def as_positions(groups):
+        return {tuple(positions[i] for i in group) for group in groups}
+
+    expected = as_positions(pairwise_similar_groups(sample, threshold, min_size))
+    actual = as_positions(find_similar_groups(sample, threshold, min_size))
+    matched = expected & actual
+
+    return {
+        'sample_size': len(sample),
+        'reference_groups': len(expected),
+        'index_groups': len(actual),
+        'matched_groups': len(matched),
+        'missing_groups': sorted(list(g) for g in expected - actual),
+        'unexpected_groups': sorted(list(g) for g in actual - expected),
+        'recall': round(len(matched) / len(expected), 4) if expected else 1.0,
+        'precision': round(len(matched) / len(actual), 4) if actual else 1.0,
+        'identical': expected == actual
+    }
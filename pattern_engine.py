@@ -0,0 +1,202 @@
+"""Precompiled rule engine shared by the spam, harassment and piracy detectors.
+
+Every rule is a list of literal terms. All terms of all rules are compiled into
+one alternation, so a comment is scanned once and the result covers every
+detector. Rules carry their own metadata (detector, category), which is what
+the detectors report instead of inspecting the pattern strings.
+"""
+import json
+import os
+import re
+import threading
+
+DETECTORS = ('spam', 'harassment', 'piracy')
+
+# Highest priority first, used when a comment matches several harassment categories
+HARASSMENT_TYPE_PRIORITY = [
+    'body_shaming',
+    'threats',
+    'personal_attacks',
+    'hate_speech',
+    'general_harassment',
+]
+
+DEFAULT_RULES = [
+    # Spam
+    {'id': 'spam.call_to_action', 'detector': 'spam', 'category': 'call_to_action',
+     'terms': ['click here', 'visit', 'check out', 'link in bio']},
+    {'id': 'spam.giveaway', 'detector': 'spam', 'category': 'giveaway',
+     'terms': ['free', 'win', 'prize', 'gift', 'giveaway']},
+    {'id': 'spam.follow_bait', 'detector': 'spam', 'category': 'follow_bait',
+     'terms': ['subscribe', 'sub4sub', 'follow']},
+    {'id': 'spam.contact', 'detector': 'spam', 'category': 'contact',
+     'terms': ['whatsapp', 'telegram', 'contact']},
+    {'id': 'spam.money', 'detector': 'spam', 'category': 'money',
+     'terms': ['earn money', 'make money', 'get rich']},
+
+    # Harassment: body shaming
+    {'id': 'harassment.appearance', 'detector': 'harassment', 'category': 'body_shaming',
+     'terms': ['fat', 'ugly', 'disgusting', 'gross', 'hideous']},
+    {'id': 'harassment.weight', 'detector': 'harassment', 'category': 'body_shaming',
+     'terms': ['lose weight', 'too fat', 'too skinny', 'anorexic']},
+    {'id': 'harassment.animal_insult', 'detector': 'harassment', 'category': 'body_shaming',
+     'terms': ['pig', 'whale', 'cow', 'beast']},
+    # Harassment: personal attacks
+    {'id': 'harassment.insult', 'detector': 'harassment', 'category': 'personal_attacks',
+     'terms': ['stupid', 'idiot', 'moron', 'dumb', 'retard']},
+    {'id': 'harassment.self_harm', 'detector': 'harassment', 'category': 'threats',
+     'terms': ['kill yourself', 'die', 'kys', 'end yourself']},
+    {'id': 'harassment.belittling', 'detector': 'harassment', 'category': 'general_harassment',
+     'terms': ['loser', 'failure', 'worthless', 'pathetic']},
+    # Harassment: hate speech
+    {'id': 'harassment.hate', 'detector': 'harassment', 'category': 'hate_speech',
+     'terms': ['hate you', 'despise', 'disgusting person']},
+    {'id': 'harassment.degrading', 'detector': 'harassment', 'category': 'hate_speech',
+     'terms': ['trash', 'garbage', 'scum']},
+    # Harassment: threats
+    {'id': 'harassment.violence', 'detector': 'harassment', 'category': 'threats',
+     'terms': ['gonna kill', 'will kill', 'threat', 'hurt you']},
+    {'id': 'harassment.intimidation', 'detector': 'harassment', 'category': 'general_harassment',
+     'terms': ['beat you', 'fight you', 'come after']},
+
+    # Piracy
+    {'id': 'piracy.download', 'detector': 'piracy', 'category': 'download',
+     'terms': ['download', 'torrent', 'magnet', 'pirate']},
+    {'id': 'piracy.full_release', 'detector': 'piracy', 'category': 'full_release',
+     'terms': ['free download', 'full movie', 'full video']},
+    {'id': 'piracy.leak', 'detector': 'piracy', 'category': 'leak',
+     'terms': ['leaked', 'leak', 'rip']},
+    {'id': 'piracy.rip_format', 'detector': 'piracy', 'category': 'rip_format',
+     'terms': ['camrip', 'cam rip', 'dvdrip', 'webrip']},
+    {'id': 'piracy.free_stream', 'detector': 'piracy', 'category': 'free_stream',
+     'terms': ['watch free', 'stream free']},
+    {'id': 'piracy.illegal', 'detector': 'piracy', 'category': 'illegal',
+     'terms': ['illegal', 'pirated', 'cracked']},
+]
+
+
+def _normalize_rule(rule):
+    """Validate a rule definition and fill in derived fields"""
+    if not isinstance(rule, dict):
+        raise ValueError('Each rule must be an object')
+    rule_id = rule.get('id')
+    if not rule_id:
+        raise ValueError('Rule is missing an id')
+    if rule.get('detector') not in DETECTORS:
+        raise ValueError(f"Rule {rule_id}: detector must be one of {', '.join(DETECTORS)}")
+    terms = rule.get('terms')
+    if not terms or not all(isinstance(t, str) and t for t in terms):
+        raise ValueError(f'Rule {rule_id}: terms must be a non-empty list of strings')
+
+    return {
+        'id': rule_id,
+        'detector': rule['detector'],
+        'category': rule.get('category') or rule['detector'],
+        'terms': list(terms),
+        # Same form as the old per-detector regexes, reported as matched_patterns
+        'pattern': rule.get('pattern') or '(?i)(' + '|'.join(terms) + ')',
+    }
+
+
+class PatternEngine:
+    """All detector rules compiled into a single matcher"""
+
+    def __init__(self, rules=None, rules_file=None):
+        self.rules_file = rules_file
+        self._lock = threading.Lock()
+        self._compiled = None
+        if rules is None and rules_file:
+            rules = self._read_rules_file(rules_file)
+        self.load(rules if rules is not None else DEFAULT_RULES)
+
+    @classmethod
+    def from_env(cls):
+        """Use the rules file from AEGIS_RULES_FILE if set, otherwise the built-in rules"""
+        return cls(rules_file=os.environ.get('AEGIS_RULES_FILE') or None)
+
+    @staticmethod
+    def _read_rules_file(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('rules', []) if isinstance(data, dict) else data
+
+    @property
+    def rules(self):
+        return self._compiled[0]
+
+    def load(self, rules):
+        """Validate and compile a rule set, then swap it in atomically"""
+        if not isinstance(rules, (list, tuple)) or not rules:
+            raise ValueError('Rules must be a non-empty list')
+        rules = tuple(_normalize_rule(r) for r in rules)
+        ids = [r['id'] for r in rules]
+        if len(set(ids)) != len(ids):
+            raise ValueError('Rule ids must be unique')
+
+        # For every term, the rules it triggers: its own rule plus every rule
+        # with a term contained in it. Scanning only reports the longest term
+        # at each position, so shorter overlapping terms come from here.
+        term_rules = {}
+        for term in {t.lower() for r in rules for t in r['terms']}:
+            term_rules[term] = frozenset(
+                i for i, r in enumerate(rules)
+                if any(t.lower() in term for t in r['terms'])
+            )
+
+        terms = sorted(term_rules, key=len, reverse=True)
+        regex = re.compile('|'.join(re.escape(t) for t in terms)) if terms else None
+
+        with self._lock:
+            self._compiled = (rules, regex, term_rules)
+        return len(rules)
+
+    def reload(self, rules=None):
+        """Reload from the given rules, the rules file, or the built-in defaults"""
+        if rules is None:
+            rules = self._read_rules_file(self.rules_file) if self.rules_file else DEFAULT_RULES
+        return self.load(rules)
+
+    @staticmethod
+    def _match(regex, term_rules, text):
+        matched = set()
+        pos = 0
+        while True:
+            m = regex.search(text, pos)
+            if not m:
+                break
+            matched |= term_rules[m.group()]
+            pos = m.start() + 1
+        return matched
+
+    def scan(self, text, folded=None):
+        """Return every rule matched by the text, in rule order.
+
+        Matching is case-insensitive. `folded` is an optional de-obfuscated
+        form of the text (see preprocess.py); only harassment rules are
+        matched against it.
+        """
+        rules, regex, term_rules = self._compiled
+        if regex is None:
+            return ()
+
+        matched = self._match(regex, term_rules, text.lower())
+        if folded is not None:
+            matched |= {i for i in self._match(regex, term_rules, folded.lower())
+                        if rules[i]['detector'] == 'harassment'}
+
+        return tuple(rules[i] for i in sorted(matched))
+
+    @staticmethod
+    def classify_harassment(rules):
+        """Pick the harassment type from matched rules by category priority"""
+        categories = [r['category'] for r in rules if r['detector'] == 'harassment']
+        if not categories:
+            return 'general_harassment'
+
+        # Custom categories from a rules file rank just above general_harassment
+        def rank(category):
+            if category in HARASSMENT_TYPE_PRIORITY:
+                return HARASSMENT_TYPE_PRIORITY.index(category)
+            return HARASSMENT_TYPE_PRIORITY.index('general_harassment') - 0.5
+
+        return min(categories, key=rank)
@@ -0,0 +1,123 @@
+"""Per-comment text preprocessing shared by all detectors.
+
+prepare_comments() runs once per analysis and gives every detector the same
+records: the casefolded text (exact duplicates, rule and keyword scans), a
+folded form with Unicode look-alikes, leetspeak and spaced-out letters undone
+(harassment scan), its tokens, and character shingles (near duplicates).
+"""
+import re
+import unicodedata
+
+from comment_batch import CommentBatch
+from near_duplicates import shingles
+
+LEET_TABLE = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b', '@': 'a', '$': 's',
+})
+LEET_CHARS = frozenset('0134578@$')
+
+# "k y s" / "i.d.i.o.t": runs of at least this many single-character tokens are joined
+MIN_SPACED_RUN = 3
+
+_TOKEN_RE = re.compile(r'[\w@$]+|[^\w\s@$]+')
+_WORD_RE = re.compile(r'[\w@$]')
+
+
+def normalize_text(text):
+    """Casefolded NFKC text with whitespace collapsed (cache keys, fingerprints, aggregation)"""
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+
+def _strip_marks(text):
+    """Drop combining marks (accents) after canonical decomposition"""
+    if text.isascii():
+        return text
+    return ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+
+
+def fold_text(casefolded):
+    """Return (tokens, folded) for an already casefolded text.
+
+    `folded` keeps punctuation between words, so phrases never match across
+    ", " or "..."; a single mark between single letters ("i.d.i.o.t") is
+    taken as spacing. It is the input itself when nothing evasive was undone,
+    so callers can skip scanning it twice.
+    """
+    normalized = _strip_marks(unicodedata.normalize('NFKC', casefolded).casefold())
+    changed = normalized != casefolded
+
+    tokens = []
+    parts = []  # words and punctuation of the folded text
+    run = []    # single-character words, each with the mark before it
+    mark = None
+    for token in _TOKEN_RE.findall(normalized):
+        if not _WORD_RE.match(token):
+            if run and mark is None and len(token) == 1:
+                mark = token  # joins the run if another single letter follows
+                continue
+            changed |= _flush_run(run, tokens, parts)
+            parts.extend(filter(None, (mark, token)))
+            mark = None
+            continue
+
+        # Leetspeak only inside words, so plain numbers stay numbers
+        if not LEET_CHARS.isdisjoint(token) and any(ch.isalpha() for ch in token):
+            token = token.translate(LEET_TABLE)
+            changed = True
+
+        if len(token) == 1:
+            run.append((mark, token))
+            mark = None
+            continue
+        changed |= _flush_run(run, tokens, parts)
+        if mark:
+            parts.append(mark)
+            mark = None
+        tokens.append(token)
+        parts.append(token)
+    changed |= _flush_run(run, tokens, parts)
+    if mark:
+        parts.append(mark)
+
+    return tokens, ' '.join(parts) if changed else casefolded
+
+
+def _flush_run(run, tokens, parts):
+    """Move a run of single-character words to tokens and parts; True if it was joined"""
+    joined = len(run) >= MIN_SPACED_RUN
+    if joined:
+        word = ''.join(token for _, token in run)
+        tokens.append(word)
+        parts.append(word)
+    else:
+        for mark, token in run:
+            if mark:
+                parts.append(mark)
+            tokens.append(token)
+            parts.append(token)
+    run.clear()
+    return joined
+
+
+class PreparedComment:
+    """Normalized forms of one comment's text"""
+
+    __slots__ = ('text', 'folded', 'tokens', '_shingles')
+
+    def __init__(self, text):
+        self.text = text.casefold().strip()
+        self.tokens, self.folded = fold_text(self.text)
+        self._shingles = None
+
+    @property
+    def shingles(self):
+        """Character shingles of the casefolded text, computed on first use"""
+        if self._shingles is None:
+            self._shingles = shingles(self.text)
+        return self._shingles
+
+
+def prepare_comments(comments):
+    """One PreparedComment per comment, in order"""
+    texts = comments.texts() if isinstance(comments, CommentBatch) else (c['text'] for c in comments)
+    return [PreparedComment(text) for text in texts]
@@ -0,0 +1,206 @@
+"""Opt-in profiles of single API requests.
+
+A request that asks for it (and a server with profiling switched on) runs
+under one of two profilers, in the request's thread only:
+
+- `cprofile`: deterministic, exact call counts; saved as a pstats file that
+  snakeviz, gprof2dot or `python -m pstats` can open
+- `sampling`: a helper thread records the request thread's stack every few
+  milliseconds; saved as collapsed stacks for flamegraph.pl or speedscope,
+  and light enough for long scrapes
+
+Artifacts are written to the profile directory under a random ID and the
+oldest are removed beyond `keep`. Requests that do not opt in never touch
+this module.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_MODES = ('cprofile', 'sampling')
+DEFAULT_MODE = 'cprofile'
+DEFAULT_DIRECTORY = 'profiles'
+DEFAULT_KEEP = 50
+DEFAULT_SAMPLE_INTERVAL = 0.005
+DEFAULT_REPORT_LINES = 50
+SORT_KEYS = ('cumulative', 'tottime', 'calls')
+SUFFIXES = {'cprofile': '.pstats', 'sampling': '.collapsed'}
+
+_PROFILE_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ProfilerBusy(RuntimeError):
+    """Another request is already running under cProfile"""
+
+
+def parse_mode(value):
+    """Profiler for a request flag or header value; None when profiling was not asked for"""
+    if value is None or value is False:
+        return None
+    if value is True:
+        return DEFAULT_MODE
+    value = str(value).strip().lower()
+    if value in ('', '0', 'false', 'no', 'off'):
+        return None
+    if value in ('1', 'true', 'yes', 'on'):
+        return DEFAULT_MODE
+    if value not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{value}' (use {', '.join(PROFILE_MODES)})")
+    return value
+
+
+def _frame_label(code):
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}'
+
+
+class StackSampler:
+    """Counts the stacks of one thread, sampled from a helper thread"""
+
+    def __init__(self, thread_id, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='aegis-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed format: one "root;...;leaf count" line per stack"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class Profile:
+    """One profiled request: its ID, profiler and, once finished, where the artifact went"""
+
+    def __init__(self, mode):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.seconds = None
+        self.path = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'mode': self.mode,
+            'seconds': round(self.seconds, 4) if self.seconds is not None else None,
+            'url': f'/api/profiles/{self.id}'
+        }
+
+
+class ProfileStore:
+    """Directory of profile artifacts, newest `keep` kept"""
+
+    # cProfile hooks the interpreter, so only one request is traced at a time
+    _cprofile_lock = threading.Lock()
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, keep=DEFAULT_KEEP, sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        self.directory = directory
+        self.keep = keep
+        self.sample_interval = sample_interval
+
+    @classmethod
+    def from_env(cls):
+        """Store configured by AEGIS_PROFILE_DIR, AEGIS_PROFILE_KEEP and AEGIS_PROFILE_INTERVAL"""
+        return cls(
+            directory=os.environ.get('AEGIS_PROFILE_DIR', DEFAULT_DIRECTORY),
+            keep=int(os.environ.get('AEGIS_PROFILE_KEEP', DEFAULT_KEEP)),
+            sample_interval=float(os.environ.get('AEGIS_PROFILE_INTERVAL', DEFAULT_SAMPLE_INTERVAL))
+        )
+
+    @contextmanager
+    def profile(self, mode=DEFAULT_MODE):
+        """Profile the block in the calling thread and save the artifact when it ends"""
+        profile = Profile(mode)
+        start = time.perf_counter()
+        if mode == 'cprofile':
+            if not self._cprofile_lock.acquire(blocking=False):
+                raise ProfilerBusy('Another request is being profiled with cProfile; try again or use sampling')
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                try:
+                    yield profile
+                finally:
+                    profiler.disable()
+            finally:
+                self._cprofile_lock.release()
+            profile.seconds = time.perf_counter() - start
+            profile.path = self._path(profile.id, mode)
+            os.makedirs(self.directory, exist_ok=True)
+            profiler.dump_stats(profile.path)
+        else:
+            sampler = StackSampler(threading.get_ident(), self.sample_interval)
+            sampler.start()
+            try:
+                yield profile
+            finally:
+                sampler.stop()
+            profile.seconds = time.perf_counter() - start
+            profile.path = self._path(profile.id, mode)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(profile.path, 'w', encoding='utf-8') as f:
+                f.write(sampler.collapsed())
+        self._prune()
+
+    def _path(self, profile_id, mode):
+        return os.path.join(self.directory, profile_id + SUFFIXES[mode])
+
+    def _prune(self):
+        """Delete the oldest artifacts beyond `keep`"""
+        try:
+            entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                       if os.path.splitext(name)[1] in SUFFIXES.values()]
+        except FileNotFoundError:
+            return
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for path in entries[self.keep:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def find(self, profile_id):
+        """(mode, path) of a saved profile, or None"""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        for mode in PROFILE_MODES:
+            path = self._path(profile_id, mode)
+            if os.path.exists(path):
+                return mode, path
+        return None
+
+    def report(self, path, sort='cumulative', lines=DEFAULT_REPORT_LINES):
+        """Plain-text pstats table of a cProfile artifact"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort '{sort}' (use {', '.join(SORT_KEYS)})")
+        out = io.StringIO()
+        stats = pstats.Stats(path, stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(lines)
+        return out.getvalue()
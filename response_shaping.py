@@ -0,0 +1,227 @@
+"""Shaping of analysis responses before they leave the API.
+
+- `fields` keeps only the named top-level keys of a result ("flags" selects
+  the detector output without the raw comments)
+- `page_size` cuts the comment lists to their first page; the full result is
+  kept in a ResultCache and later pages are fetched with opaque cursors
+- JSON is encoded with orjson when it is installed, and buffered responses
+  are gzip or brotli compressed for clients that accept it
+"""
+import base64
+import binascii
+import gzip
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask.json.provider import DefaultJSONProvider
+
+from comment_batch import to_json
+
+try:
+    import orjson
+except ImportError:  # the standard json module is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # only gzip is offered
+    brotli = None
+
+PAGINATED_FIELDS = ('comments', 'harassment_comments', 'copyright_violations')
+FIELD_GROUPS = {
+    'flags': ('statistics', 'bot_indicators', 'harassment_indicators', 'harassment_comments',
+              'copyright_violations', 'conclusion'),
+}
+# Kept whatever `fields` says, so clients can always tell what they got
+ALWAYS_INCLUDED = ('success', 'video_id', 'error', 'timings')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEFAULT_RESULT_ENTRIES = 32
+DEFAULT_RESULT_TTL = 900
+
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = ('application/json',)
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def parse_fields(value):
+    """Field names from a list or comma-separated string; None selects everything"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = set()
+    for name in value:
+        name = str(name).strip()
+        if name:
+            fields.update(FIELD_GROUPS.get(name, (name,)))
+    return fields or None
+
+
+def parse_page_size(value):
+    """Page size from a request parameter; None turns pagination off"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError('page_size must be an integer')
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('page_size must be an integer')
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f'page_size must be between 1 and {MAX_PAGE_SIZE}')
+    return page_size
+
+
+def encode_cursor(field, offset):
+    return base64.urlsafe_b64encode(f'{field}:{offset}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(field, offset) from a cursor made by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        field, offset = raw.rsplit(':', 1)
+        offset = int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if field not in PAGINATED_FIELDS or offset < 0:
+        raise ValueError('Invalid cursor')
+    return field, offset
+
+
+def project(result, fields):
+    """Copy of a result with only the selected top-level keys"""
+    if fields is None:
+        return dict(result)
+    unknown = sorted(fields - result.keys())
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(result)})")
+    return {key: value for key, value in result.items() if key in fields or key in ALWAYS_INCLUDED}
+
+
+def page(result, field, offset=0, page_size=DEFAULT_PAGE_SIZE):
+    """One page of a comment list in a result, with the cursor of the next one"""
+    if field not in PAGINATED_FIELDS or field not in result:
+        raise ValueError(f"'{field}' cannot be paginated in this result")
+    items = result[field]
+    end = offset + page_size
+    return {
+        'items': items[offset:end],
+        'total': len(items),
+        'next_cursor': encode_cursor(field, end) if end < len(items) else None
+    }
+
+
+def shape_result(result, fields=None, page_size=None, result_id=None):
+    """Project a result to `fields` and cut its comment lists to the first page"""
+    if not result.get('success'):
+        return result
+    shaped = project(result, fields)
+    if page_size:
+        pagination = {}
+        for field in PAGINATED_FIELDS:
+            if field in shaped:
+                first = page(result, field, 0, page_size)
+                shaped[field] = first['items']
+                pagination[field] = {'total': first['total'], 'next_cursor': first['next_cursor']}
+        shaped['result_id'] = result_id
+        shaped['pagination'] = pagination
+    return shaped
+
+
+class ResultCache:
+    """Recent full results for cursor pagination, LRU with a TTL, safe across threads"""
+
+    def __init__(self, max_entries=DEFAULT_RESULT_ENTRIES, ttl=DEFAULT_RESULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._results = OrderedDict()  # result_id -> (stored at, result)
+        self._lock = threading.Lock()
+
+    def put(self, result):
+        """Store a result; returns its result_id"""
+        result_id = uuid.uuid4().hex
+        with self._lock:
+            self._results[result_id] = (time.time(), result)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result_id
+
+    def get(self, result_id):
+        """Return a stored result, or None if it is unknown or expired"""
+        with self._lock:
+            entry = self._results.get(result_id)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl:
+                del self._results[result_id]
+                return None
+            self._results.move_to_end(result_id)
+            return entry[1]
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._results), 'max_entries': self.max_entries, 'ttl': self.ttl}
+
+
+def _default(obj):
+    try:
+        return to_json(obj)
+    except TypeError:
+        return DefaultJSONProvider.default(obj)
+
+
+def encode_json(obj, sort_keys=False):
+    """JSON text of obj; orjson when installed, otherwise the json module"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+        except orjson.JSONEncodeError:
+            pass  # e.g. lone surrogates or huge ints, which the json module accepts
+    return json.dumps(obj, default=_default, sort_keys=sort_keys)
+
+
+class AegisJSONProvider(DefaultJSONProvider):
+    """Serializes comment batches and detector results, building their dicts only here"""
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.get('indent') is not None:
+            return super().dumps(obj, **kwargs)
+        return encode_json(obj, kwargs.get('sort_keys', self.sort_keys))
+
+
+def compress_response(response, accept_encodings, min_size=COMPRESS_MIN_SIZE):
+    """Brotli- or gzip-encode a buffered JSON response if the client accepts it"""
+    if (response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or not 200 <= response.status_code < 300):
+        return response
+
+    encoding = accept_encodings.best_match(ENCODINGS)
+    if not encoding:
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    if encoding == 'br':
+        data = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
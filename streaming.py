@@ -0,0 +1,283 @@
+"""Running analysis state for streaming and incremental scans.
+
+RunningAnalysis consumes comments batch by batch and keeps only what the final
+summary needs (duplicate/similarity groups, the flagged harassment comments and
+copyright violations, spam counts and examples), so adding a batch only costs
+as much as the batch itself.
+
+Raw comments are dropped after each batch. Exact-duplicate groups are keyed by
+a 64-bit text digest and the near-duplicate index keeps only its leaders'
+texts, so a repeated comment costs a counter increment. Each group lists the
+ids and authors of at most MAX_GROUP_MEMBERS members (its count stays exact),
+and a 100-character display text once it has two members. Memory therefore
+grows with the number of distinct texts, not comments; flagged harassment
+comments and copyright violations are still kept in full.
+
+The state round-trips through to_dict()/from_dict(), so it can be saved
+between scans, and two states built from consecutive runs of comments can be
+merged as if one had seen them all.
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from comment_batch import CommentBatch
+from near_duplicates import NearDuplicateIndex, text_digest
+from preprocess import prepare_comments
+
+EXAMPLES_PER_INDICATOR = 5
+MAX_GROUP_MEMBERS = 100
+STATE_VERSION = 3
+
+
+def rules_fingerprint(rules):
+    """Hash of the detector rules; saved state is only reused under the same rules"""
+    return hashlib.sha256(json.dumps(list(rules), sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _add_members(members, new):
+    members.extend(new[:MAX_GROUP_MEMBERS - len(members)])
+
+
+class RunningAnalysis:
+    """Accumulates detector results over batches of comments"""
+
+    def __init__(self, analyzer, keywords=None, keyword_mode='substring'):
+        self.analyzer = analyzer
+        self.keywords = keywords
+        self.keyword_mode = keyword_mode
+        self.batches = 0
+        self.total_comments = 0
+
+        # Bot detection: groups hold [comment_id, author] of their first MAX_GROUP_MEMBERS members
+        self._exact_groups = {}  # text digest -> [count, display text, members]
+        self._similar = NearDuplicateIndex(max_members=0)
+        self._similar_members = {}  # leader -> members
+
+        self._harassment_comments = []
+        self._violations = []
+        self.spam_count = 0
+        self._spam_examples = []
+
+    @property
+    def harassment_count(self):
+        return len(self._harassment_comments)
+
+    @property
+    def violation_count(self):
+        return len(self._violations)
+
+    def add_batch(self, comments):
+        """Run the per-comment detectors on a batch and return its flags event"""
+        analyzer = self.analyzer
+        comments = CommentBatch.coerce(comments)
+        prepared = prepare_comments(comments)
+        matches = analyzer.scan_comments(comments, prepared)
+        _, harassment_comments = analyzer.detect_harassment(comments, matches)
+        violations = analyzer.detect_copyright_violations(
+            comments, self.keywords, matches, self.keyword_mode, prepared)
+        spam_comments = analyzer.detect_spam(comments, matches)
+
+        bot_comments = []
+        for i, p in enumerate(prepared):
+            text = p.text
+            member = [comments.ids[i], comments.author(i)]
+            digest = text_digest(text)
+
+            exact = self._exact_groups.setdefault(digest, [0, None, []])
+            exact[0] += 1
+            if exact[1] is None and exact[0] >= 2:
+                exact[1] = text[:100]
+            _add_members(exact[2], [member])
+            leader = self._similar.add(text, p.shingles, digest)
+            similar = self._similar_members.setdefault(leader, [])
+            _add_members(similar, [member])
+            similar_size = self._similar.sizes[leader]
+
+            if exact[0] >= 3 or similar_size >= 3:
+                # A group that just reached three flags its earlier members too
+                if similar_size == 3:
+                    flagged = similar
+                elif exact[0] == 3 and similar_size < 3:
+                    flagged = exact[2]
+                else:
+                    flagged = [member]
+                for comment_id, author in flagged:
+                    bot_comments.append({
+                        'comment_id': comment_id,
+                        'author': author,
+                        'type': 'duplicate_text' if exact[0] >= 3 else 'similar_text',
+                        'group_size': max(exact[0], similar_size)
+                    })
+
+        self._harassment_comments.extend(harassment_comments)
+        self._violations.extend(violations)
+        self.spam_count += len(spam_comments)
+        self._spam_examples.extend(spam_comments[:EXAMPLES_PER_INDICATOR - len(self._spam_examples)])
+
+        self.batches += 1
+        self.total_comments += len(comments)
+
+        return {
+            'event': 'flags',
+            'batch': self.batches,
+            'comments_scanned': self.total_comments,
+            'bot_comments': bot_comments,
+            'harassment_comments': harassment_comments,
+            'copyright_violations': violations,
+            'spam_comments': spam_comments
+        }
+
+    def merge(self, other):
+        """Append another state, built from the comments that came after ours, to this one"""
+        if (other.keywords, other.keyword_mode) != (self.keywords, self.keyword_mode):
+            raise ValueError('Cannot merge analyses made with different keywords')
+
+        for digest, (count, text, members) in other._exact_groups.items():
+            exact = self._exact_groups.setdefault(digest, [0, None, []])
+            exact[0] += count
+            exact[1] = exact[1] or text
+            _add_members(exact[2], members)
+        # Their groups join whatever their leaders join in our index
+        leaders = self._similar.merge(other._similar)
+        for leader, members in sorted(other._similar_members.items()):
+            _add_members(self._similar_members.setdefault(leaders[leader], []), members)
+
+        self._harassment_comments.extend(other._harassment_comments)
+        self._violations.extend(other._violations)
+        self.spam_count += other.spam_count
+        self._spam_examples.extend(other._spam_examples[:EXAMPLES_PER_INDICATOR - len(self._spam_examples)])
+
+        self.batches += other.batches
+        self.total_comments += other.total_comments
+        return self
+
+    def to_dict(self):
+        """JSON-serializable state"""
+        return {
+            'version': STATE_VERSION,
+            'rules': rules_fingerprint(self.analyzer.patterns.rules),
+            'keywords': self.keywords,
+            'keyword_mode': self.keyword_mode,
+            'batches': self.batches,
+            'total_comments': self.total_comments,
+            'exact_groups': [[digest] + group for digest, group in self._exact_groups.items()],
+            'similar': self._similar.to_dict(),
+            'similar_members': [[leader, members] for leader, members in self._similar_members.items()],
+            'harassment_comments': list(self._harassment_comments),
+            'violations': list(self._violations),
+            'spam_count': self.spam_count,
+            'spam_examples': list(self._spam_examples)
+        }
+
+    @classmethod
+    def from_dict(cls, analyzer, data):
+        """State saved by to_dict(); ValueError if it is from another version or rule set"""
+        if data.get('version') != STATE_VERSION:
+            raise ValueError('Saved analysis state has an unsupported version')
+        if data.get('rules') != rules_fingerprint(analyzer.patterns.rules):
+            raise ValueError('Saved analysis state was built with different detector rules')
+        running = cls(analyzer, data['keywords'], data['keyword_mode'])
+        running.batches = data['batches']
+        running.total_comments = data['total_comments']
+        running._exact_groups = {digest: [count, text, members]
+                                 for digest, count, text, members in data['exact_groups']}
+        running._similar = NearDuplicateIndex.from_dict(data['similar'])
+        running._similar_members = {leader: members for leader, members in data['similar_members']}
+        running._harassment_comments = data['harassment_comments']
+        running._violations = data['violations']
+        running.spam_count = data['spam_count']
+        running._spam_examples = data['spam_examples']
+        return running
+
+    def bot_indicators(self):
+        """Bot indicators in the same shape detect_bot_comments returns"""
+        indicators = []
+        for count, text, members in self._exact_groups.values():
+            if count >= 3:
+                indicators.append({
+                    'type': 'duplicate_text',
+                    'severity': 'high',
+                    'text': text,
+                    'count': count,
+                    'authors': [author for _, author in members],
+                    'comment_ids': [comment_id for comment_id, _ in members]
+                })
+
+        for leader, size in sorted(self._similar.sizes.items()):
+            if size >= 3:
+                members = self._similar_members[leader]
+                indicators.append({
+                    'type': 'similar_text',
+                    'severity': 'medium',
+                    'text': self._similar.leader_text(leader)[:100],
+                    'count': size,
+                    'similarity': '85%+',
+                    'authors': [author for _, author in members],
+                    'comment_ids': [comment_id for comment_id, _ in members]
+                })
+
+        if self.spam_count:
+            indicators.append({
+                'type': 'spam_pattern',
+                'severity': 'medium',
+                'count': self.spam_count,
+                'examples': list(self._spam_examples)
+            })
+        return indicators
+
+    def bot_comment_count(self):
+        count = sum(group[0] for group in self._exact_groups.values() if group[0] >= 3)
+        count += sum(size for size in self._similar.sizes.values() if size >= 3)
+        return count
+
+    def harassment_indicators(self):
+        types = {}
+        for entry in self._harassment_comments:
+            types.setdefault(entry['type'], []).append(entry)
+        return [{
+            'type': h_type,
+            'severity': 'high' if len(entries) > 5 else 'medium',
+            'count': len(entries),
+            'examples': entries[:EXAMPLES_PER_INDICATOR]
+        } for h_type, entries in types.items()]
+
+    def harassment_comments(self):
+        return list(self._harassment_comments)
+
+    def statistics(self):
+        bot_comment_count = self.bot_comment_count()
+        return {
+            'total_comments': self.total_comments,
+            'bot_comments': bot_comment_count,
+            'harassment_comments': self.harassment_count,
+            'copyright_violations': self.violation_count,
+            'threat_level': self.analyzer._threat_level(
+                bot_comment_count, self.violation_count, self.harassment_count)
+        }
+
+    def copyright_violations(self):
+        return list(self._violations)
+
+    def summary(self, video_id):
+        """Final event with the aggregate results"""
+        statistics = self.statistics()
+        harassment_indicators = self.harassment_indicators()
+        conclusion = self.analyzer._generate_conclusion(
+            statistics['total_comments'], statistics['bot_comments'],
+            statistics['harassment_comments'], statistics['copyright_violations'],
+            statistics['threat_level'], harassment_indicators
+        )
+        return {
+            'event': 'complete',
+            'success': True,
+            'video_id': video_id,
+            'video_url': f'https://www.youtube.com/watch?v={video_id}',
+            'timestamp': datetime.now().isoformat(),
+            'statistics': statistics,
+            'bot_indicators': self.bot_indicators(),
+            'harassment_indicators': harassment_indicators,
+            'harassment_comments': self.harassment_comments(),
+            'copyright_violations': self.copyright_violations(),
+            'conclusion': conclusion
+        }
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Local stand-ins for external services, for testing without network access.
+
+Serves a Groq-compatible chat completions endpoint that answers the batched
+toxicity prompt from toxicity_classifier.py, and Apify's run-sync endpoint
+returning Instagram posts with synthetic comments (comment_corpus.py).
+Latency, the fraction of malformed verdicts and the fraction of requests
+failing with HTTP errors are configurable so retry paths can be exercised.
+
+    python stub_services.py --port 5055 --latency 0.2 --error-rate 0.1 --http-error-rate 0.02
+    GROQ_BASE_URL=http://localhost:5055 APIFY_BASE_URL=http://localhost:5055 python api_server.py
+
+YouTube scraping is replaced inside the API server instead, with
+AEGIS_YOUTUBE_BACKEND=fake (see load_test.py).
+"""
+import argparse
+import json
+import random
+import re
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+from flask import Flask, request, jsonify
+
+from comment_corpus import generate_comments
+from pattern_engine import PatternEngine
+
+app = Flask(__name__)
+
+config = {
+    'latency': 0.0,
+    'jitter': 0.0,
+    'error_rate': 0.0,
+    'http_error_rate': 0.0,
+}
+
+REPLY_EVERY = 4
+REPLIES_PER_THREAD = 2
+
+_patterns = PatternEngine()
+_rng = random.Random()
+
+
+def _sleep():
+    delay = config['latency'] + _rng.uniform(0, config['jitter'])
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _http_error():
+    """An error response for the configured fraction of requests, otherwise None"""
+    if _rng.random() >= config['http_error_rate']:
+        return None
+    status = _rng.choice((429, 500, 503))
+    return jsonify({'error': {'message': f'Stub failure (HTTP {status})', 'type': 'stub_error'}}), status
+
+
+def _verdict(text):
+    """Rule-based stand-in for the model's judgement"""
+    rules = [r for r in _patterns.scan(text) if r['detector'] == 'harassment']
+    categories = {r['category'] for r in rules}
+    if not rules:
+        return {
+            'toxicity_level': 'low',
+            'threat_level': 'none',
+            'harassment_level': 'none',
+            'overall_safety': 'safe',
+            'explanation': 'No harmful language detected'
+        }
+    severe = len(rules) > 1 or 'threats' in categories
+    return {
+        'toxicity_level': 'high' if severe else 'medium',
+        'threat_level': 'high' if 'threats' in categories else 'low',
+        'harassment_level': 'high' if severe else 'medium',
+        'overall_safety': 'dangerous' if severe else 'concerning',
+        'explanation': 'Matched ' + ', '.join(sorted(categories))
+    }
+
+
+@app.route('/openai/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    """Groq / OpenAI chat completions stand-in"""
+    _sleep()
+    error = _http_error()
+    if error:
+        return error
+    data = request.get_json(force=True, silent=True) or {}
+    prompt = ''.join(m.get('content', '') for m in data.get('messages', []))
+
+    match = re.search(r'Comments to analyze: (\[.*\])\n\nRespond', prompt, re.S)
+    comments = json.loads(match.group(1)) if match else []
+
+    results = []
+    for comment in comments:
+        verdict = _verdict(comment.get('text', ''))
+        if _rng.random() < config['error_rate']:
+            # Drop a field so the client treats this verdict as unparseable
+            verdict.pop('overall_safety')
+        results.append(dict(id=comment.get('id'), **verdict))
+
+    content = json.dumps({'results': results})
+    return jsonify({
+        'id': f'chatcmpl-{uuid.uuid4().hex}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': data.get('model', 'stub'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'prompt_tokens': len(prompt) // 4,
+            'completion_tokens': len(content) // 4,
+            'total_tokens': (len(prompt) + len(content)) // 4
+        }
+    })
+
+
+def _instagram_comment(comment):
+    return {
+        'id': comment['id'],
+        'text': comment['text'],
+        'ownerUsername': comment['author'].lstrip('@'),
+        'ownerProfilePicUrl': comment['photo'],
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'likesCount': _rng.randint(0, 50),
+        'repliesCount': 0,
+        'replies': []
+    }
+
+
+def _instagram_post(url, index, comments_limit, replies=False):
+    """One post item shaped like the Instagram scraper actor's dataset items
+
+    With `replies`, every REPLY_EVERY-th comment gets REPLIES_PER_THREAD replies.
+    """
+    shortcode = f"{zlib.crc32(f'{url}:{index}'.encode()):011d}"
+    owner = url.rstrip('/').rsplit('/', 1)[-1] or 'creator'
+    comments = [_instagram_comment(c) for c in generate_comments(
+        comments_limit, f'{url}:{index}', harassment_ratio=0.15, spam_ratio=0.05)]
+    if replies:
+        threads = comments[::REPLY_EVERY]
+        extra = [_instagram_comment(c) for c in generate_comments(
+            len(threads) * REPLIES_PER_THREAD, f'{url}:{index}:replies', harassment_ratio=0.15)]
+        for position, comment in enumerate(threads):
+            comment['replies'] = extra[position * REPLIES_PER_THREAD:(position + 1) * REPLIES_PER_THREAD]
+            comment['repliesCount'] = len(comment['replies'])
+    return {
+        'id': shortcode,
+        'type': 'Image',
+        'shortCode': shortcode,
+        'url': f'https://www.instagram.com/p/{shortcode}/',
+        'caption': 'Stub post',
+        'ownerUsername': owner,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'likesCount': _rng.randint(0, 5000),
+        'commentsCount': len(comments),
+        'latestComments': comments
+    }
+
+
+@app.route('/v2/acts/<path:actor_id>/run-sync-get-dataset-items', methods=['POST'])
+def apify_run_sync(actor_id):
+    """Apify run-sync stand-in for the Instagram scraper actor"""
+    _sleep()
+    error = _http_error()
+    if error:
+        return error
+    if not request.args.get('token'):
+        return jsonify({'error': {'type': 'token-not-provided', 'message': 'Authentication token was not provided'}}), 401
+
+    data = request.get_json(force=True, silent=True) or {}
+    comments_limit = int(data.get('commentsLimit', 30))
+    items = []
+    for url in data.get('directUrls') or []:
+        for index in range(int(data.get('resultsLimit', 1))):
+            items.append(_instagram_post(url, index, comments_limit, bool(data.get('includeCommentReplies'))))
+    return jsonify(items), 201
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-ins for external services')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--latency', type=float, default=0.0, help='Base response latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of malformed verdicts')
+    parser.add_argument('--http-error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with HTTP 429/500/503')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    config.update(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                  http_error_rate=args.http_error_rate)
+    if args.seed is not None:
+        _rng.seed(args.seed)
+
+    print(f"🧪 Stub services running on http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comment_corpus import generate_comments  # noqa: E402
+from comment_store import CommentStore  # noqa: E402
+import stub_services  # noqa: E402
+from youtube_analyzer import YouTubeAnalyzer  # noqa: E402
+
+
+class ListDownloader:
+    """YoutubeCommentDownloader stand-in serving a mutable list of comments, newest first"""
+
+    def __init__(self, comments):
+        self.comments = list(comments)
+        self.requests = 0
+
+    def get_comments(self, youtube_id, sort_by=None, language=None, **kwargs):
+        self.requests += 1
+        for comment in list(self.comments):
+            yield {
+                'cid': comment['id'],
+                'text': comment['text'],
+                'author': comment['author'],
+                'channel': comment['channel'],
+                'time': comment['time'],
+                'votes': comment['likes'],
+                'replies': comment['replies'],
+                'photo': comment['photo'],
+                'heart': comment['heart']
+            }
+
+    def post(self, comments):
+        """New comments appear above the existing ones"""
+        self.comments[:0] = comments
+
+
+@pytest.fixture
+def corpus():
+    return list(generate_comments(400, seed=7))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CommentStore(str(tmp_path / 'comments.db'))
+
+
+@pytest.fixture
+def analyzer(store, corpus):
+    analyzer = YouTubeAnalyzer(store=store)
+    analyzer.downloader = ListDownloader(corpus)
+    return analyzer
+
+
+@pytest.fixture(scope='session')
+def stub_url():
+    """Base URL of stub_services.py (Groq and Apify stand-ins) served from a thread"""
+    server = make_server('127.0.0.1', 0, stub_services.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
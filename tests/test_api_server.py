@@ -0,0 +1,128 @@
+"""API tests against stub_services.py, with YouTube served from the synthetic corpus"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory, stub_url):
+    data = tmp_path_factory.mktemp('api')
+    env = {
+        'AEGIS_YOUTUBE_BACKEND': 'fake',
+        'AEGIS_FAKE_COMMENTS': '300',
+        'AEGIS_COMMENT_DB': str(data / 'comments.db'),
+        'AEGIS_AUTHOR_DB': str(data / 'authors.db'),
+        'AEGIS_LEAK_INDEX': str(data / 'leaks'),
+        'AEGIS_CHUNK_INDEX': str(data / 'chunks.db'),
+        'AEGIS_TRIAGE_MODEL': str(data / 'missing.npz'),
+        'APIFY_BASE_URL': stub_url,
+        'GROQ_BASE_URL': stub_url,
+        'APIFY_TOKEN': 'test',
+        'GROQ_API_KEY': 'test',
+        'ACTOR_ID': 'apify~instagram-scraper',
+        'AEGIS_ADMIN_TOKEN': 'admin-secret',
+    }
+    saved = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+    try:
+        import api_server  # reads its configuration from the environment on import
+        yield api_server.app.test_client()
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def test_analyze_fields_flags(client):
+    response = client.post('/api/analyze', json={'video_url': 'dQw4w9WgXcQ', 'limit': 200, 'fields': 'flags'})
+    body = response.get_json()
+    assert response.status_code == 200, body
+    assert 'comments' not in body
+    assert body['statistics']['total_comments'] == 200
+
+
+@pytest.mark.parametrize('scan', [1, 2])
+def test_incremental_fields_flags(client, scan):
+    response = client.post('/api/analyze', json={
+        'video_url': 'jNQXAC9IVRw', 'limit': 200, 'incremental': True, 'fields': 'flags', 'page_size': 5})
+    body = response.get_json()
+    assert response.status_code == 200, body
+    assert body['pagination']['harassment_comments']['total'] == body['statistics']['harassment_comments']
+
+
+def test_unknown_field_is_rejected(client):
+    response = client.post('/api/analyze', json={'video_url': 'dQw4w9WgXcQ', 'limit': 50, 'fields': 'nonsense'})
+    assert response.status_code == 400
+
+
+def instagram(client, **options):
+    response = client.post('/api/instagram-analyze', json=dict(
+        {'post_url': 'https://www.instagram.com/p/TEST/', 'comments_limit': 20}, **options))
+    body = response.get_json()
+    assert response.status_code == 200, body
+    return body
+
+
+def test_instagram_replies_are_opt_in(client):
+    body = instagram(client)
+    assert len(body['comments']) == 20
+    assert all(set(c) == {'username', 'text', 'toxicity_analysis'} for c in body['comments'])
+
+
+def test_instagram_replies_do_not_count_toward_comments_limit(client):
+    body = instagram(client, include_replies=True, replies_limit=6)
+    replies = [c for c in body['comments'] if 'reply_to' in c]
+    assert len(replies) == 6
+    assert len(body['comments']) == 26
+
+
+def link_weight(body):
+    return sum(edge['value'] for edge in body['app_data']['threat']['network']['edges'])
+
+
+def test_unclassified_replies_still_link_authors(client):
+    without = instagram(client)
+    body = instagram(client, include_replies=True, replies_limit=0)
+    assert not any('reply_to' in c for c in body['comments'])
+    assert link_weight(body) > link_weight(without)
+
+
+RULES = [{'id': 'spam.custom', 'detector': 'spam', 'terms': ['buy now']}]
+
+
+def test_rules_reload_needs_admin_token(client):
+    assert client.post('/api/rules/reload').status_code == 403
+    response = client.post('/api/rules/reload', json={'rules': RULES}, headers={'X-Aegis-Admin-Token': 'wrong'})
+    assert response.status_code == 403
+    assert client.get('/api/rules').get_json()['total'] > 1
+
+
+def test_invalid_rules_are_rejected_before_the_swap(client):
+    before = client.get('/api/rules').get_json()['total']
+    for rules in ([], ['spam'], [{'id': 'x', 'detector': 'nope', 'terms': ['a']}], 'spam'):
+        response = client.post('/api/rules/reload', json={'rules': rules},
+                               headers={'Authorization': 'Bearer admin-secret'})
+        assert response.status_code == 400, rules
+    assert client.get('/api/rules').get_json()['total'] == before
+
+
+def test_admin_can_replace_and_restore_rules(client):
+    headers = {'X-Aegis-Admin-Token': 'admin-secret'}
+    response = client.post('/api/rules/reload', json={'rules': RULES}, headers=headers)
+    assert response.get_json() == {'success': True, 'total': 1}
+    response = client.post('/api/rules/reload', headers=headers)
+    assert response.get_json()['total'] > 1
+
+
+def test_importing_the_server_writes_no_files(tmp_path):
+    env = {name: value for name, value in os.environ.items() if not name.startswith('AEGIS_')}
+    env['PYTHONPATH'] = ROOT
+    subprocess.run([sys.executable, '-c', 'import api_server'], cwd=tmp_path, env=env,
+                   check=True, capture_output=True)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,35 @@
+from batch_analysis import aggregate_results, analyze_batch
+from comment_batch import CommentBatch
+
+
+def video_result(video_id, texts):
+    comments = [{'id': f'{video_id}{i}', 'text': text, 'author': f'a{i}', 'channel': '', 'time': '',
+                 'likes': 0, 'replies': 0, 'photo': '', 'heart': False} for i, text in enumerate(texts)]
+    return {
+        'success': True,
+        'video_id': video_id,
+        'statistics': {'total_comments': len(texts), 'bot_comments': 0, 'harassment_comments': 0,
+                       'copyright_violations': 0, 'threat_level': 'LOW'},
+        'comments': CommentBatch(comments),
+        'bot_indicators': [],
+        'harassment_comments': [],
+        'copyright_violations': []
+    }
+
+
+def test_repeated_texts_ignore_case_and_spacing():
+    aggregate = aggregate_results([
+        video_result('v1', ['Great  video', 'STRASSE']),
+        video_result('v2', ['great video ', 'straße']),
+    ])
+    assert [(t['text'], t['count'], t['videos']) for t in aggregate['top_repeated_texts']] == [
+        ('great video', 2, 2), ('strasse', 2, 2)]
+
+
+def test_invalid_entries_of_any_type_are_reported(analyzer):
+    videos = ['dQw4w9WgXcQ', ['not', 'a', 'video'], {'id': 'x'}, 'nope', 'https://youtu.be/dQw4w9WgXcQ']
+    result = analyze_batch(analyzer, videos, limit=50, processes=0)
+
+    assert [v.get('video_id') for v in result['videos'][:1]] == ['dQw4w9WgXcQ']
+    assert [v['video'] for v in result['videos'][1:]] == [['not', 'a', 'video'], {'id': 'x'}, 'nope']
+    assert result['aggregate']['videos_failed'] == 3
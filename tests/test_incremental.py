@@ -0,0 +1,121 @@
+import json
+
+from comment_batch import to_json
+from comment_store import CommentStore
+from comment_corpus import generate_comments
+from response_shaping import parse_fields, shape_result
+from streaming import MAX_GROUP_MEMBERS, RunningAnalysis
+
+VIDEO = 'dQw4w9WgXcQ'
+
+
+def fresh_comments(count, seed):
+    return [dict(c, id=f'new{seed}_{i}') for i, c in enumerate(generate_comments(count, seed=seed))]
+
+
+def summary_counts(running):
+    return running.statistics(), sorted(
+        (i['type'], i['count']) for i in running.bot_indicators() + running.harassment_indicators())
+
+
+def test_sync_only_returns_new_comments(analyzer, corpus):
+    first = analyzer.sync_comments(VIDEO, limit=len(corpus) + 10)
+    assert [c['id'] for c in first] == [c['id'] for c in corpus]
+
+    assert analyzer.sync_comments(VIDEO, limit=len(corpus) + 10) == []
+
+    new = fresh_comments(20, seed=1)
+    analyzer.downloader.post(new)
+    assert [c['id'] for c in analyzer.sync_comments(VIDEO, limit=len(corpus) + 10)] == [c['id'] for c in new]
+    assert len(analyzer.store.get_comments(VIDEO, 10000)) == len(corpus) + 20
+
+
+def test_running_analysis_merge_equals_single_pass(analyzer, corpus):
+    whole = RunningAnalysis(analyzer, ['movie'])
+    whole.add_batch(corpus)
+
+    first, second = RunningAnalysis(analyzer, ['movie']), RunningAnalysis(analyzer, ['movie'])
+    first.add_batch(corpus[:150])
+    second.add_batch(corpus[150:])
+    first.merge(second)
+
+    assert summary_counts(first) == summary_counts(whole)
+    assert first.copyright_violations() == whole.copyright_violations()
+
+
+def test_running_analysis_round_trips_through_json(analyzer, corpus):
+    running = RunningAnalysis(analyzer, ['movie'])
+    running.add_batch(corpus[:200])
+    restored = RunningAnalysis.from_dict(analyzer, json.loads(json.dumps(running.to_dict())))
+    restored.add_batch(corpus[200:])
+    running.add_batch(corpus[200:])
+    assert summary_counts(restored) == summary_counts(running)
+
+
+def test_incremental_analysis_matches_full_analysis(analyzer, corpus):
+    limit = len(corpus) + 100
+    first = analyzer.analyze_incremental(VIDEO, ['movie'], limit=limit)
+    assert first['incremental']['analyzed_comments'] == len(corpus)
+
+    analyzer.downloader.post(fresh_comments(30, seed=2))
+    second = analyzer.analyze_incremental(VIDEO, ['movie'], limit=limit)
+    assert second['incremental'] == {'new_comments': 30, 'analyzed_comments': 30, 'scans': 2}
+
+    full = analyzer.analyze_video(VIDEO, ['movie'], limit=limit, use_store=False)
+    assert second['statistics'] == full['statistics']
+
+
+def test_sync_with_larger_limit_skips_stored_comments(analyzer, corpus):
+    analyzer.sync_comments(VIDEO, limit=100)
+    again = analyzer.sync_comments(VIDEO, limit=150)
+    assert [c['id'] for c in again] == [c['id'] for c in corpus[100:150]]
+
+
+def test_rescan_with_larger_limit_does_not_double_count(analyzer):
+    analyzer.analyze_incremental(VIDEO, ['movie'], limit=100)
+    rescan = analyzer.analyze_incremental(VIDEO, ['movie'], limit=150)
+    assert rescan['incremental']['analyzed_comments'] == 50
+
+    full = analyzer.analyze_video(VIDEO, ['movie'], limit=150, use_store=False)
+    assert rescan['statistics'] == full['statistics']
+
+
+def test_incremental_result_has_the_flags_fields(analyzer, corpus):
+    result = analyzer.analyze_incremental(VIDEO, ['movie'], limit=len(corpus))
+    full = analyzer.analyze_video(VIDEO, ['movie'], limit=len(corpus), use_store=False)
+
+    shaped = shape_result(result, parse_fields('flags'), page_size=10, result_id='r1')
+    assert shaped['pagination']['harassment_comments']['total'] == result['statistics']['harassment_comments']
+    assert [c['comment_id'] for c in result['harassment_comments']] == \
+        [c['comment_id'] for c in full['harassment_comments']]
+    assert result['harassment_indicators'] == json.loads(json.dumps(full['harassment_indicators'], default=to_json))
+
+
+def bot_ids(running):
+    return {i for indicator in running.bot_indicators() for i in indicator.get('comment_ids', [])}
+
+
+def test_streamed_bot_flags_cover_every_group_member(analyzer, corpus):
+    running = RunningAnalysis(analyzer)
+    streamed = []
+    for start in range(0, len(corpus), 50):
+        streamed += [c['comment_id'] for c in running.add_batch(corpus[start:start + 50])['bot_comments']]
+    assert len(streamed) == len(set(streamed))
+    assert set(streamed) == bot_ids(running) and streamed
+
+
+def test_repeated_comments_do_not_grow_the_state(analyzer):
+    running = RunningAnalysis(analyzer)
+    running.add_batch([dict(id=f'c{i}', text='Nice video! Check my channel', author=f'a{i}') for i in range(500)])
+    state = running.to_dict()
+    assert running.bot_comment_count() == 1000
+    assert len(state['exact_groups']) == 1 and len(state['similar']['leader_texts']) == 1
+    assert [len(indicator['comment_ids']) for indicator in running.bot_indicators()[:2]] == [MAX_GROUP_MEMBERS] * 2
+
+
+def test_store_creates_its_database_on_first_use(tmp_path):
+    path = tmp_path / 'comments.db'
+    store = CommentStore(str(path))
+    assert not path.exists()
+    assert store.video_state(VIDEO) is None
+    assert path.exists()
@@ -0,0 +1,81 @@
+import re
+
+import pytest
+
+from comment_batch import to_json
+from pattern_engine import PatternEngine
+
+# The per-detector regexes the detectors used before the shared rule engine
+BASELINE_PATTERNS = {
+    'spam': [
+        r'(?i)(click here|visit|check out|link in bio)',
+        r'(?i)(free|win|prize|gift|giveaway)',
+        r'(?i)(subscribe|sub4sub|follow)',
+        r'(?i)(whatsapp|telegram|contact)',
+        r'(?i)(earn money|make money|get rich)',
+    ],
+    'harassment': [
+        r'(?i)(fat|ugly|disgusting|gross|hideous)',
+        r'(?i)(lose weight|too fat|too skinny|anorexic)',
+        r'(?i)(pig|whale|cow|beast)',
+        r'(?i)(stupid|idiot|moron|dumb|retard)',
+        r'(?i)(kill yourself|die|kys|end yourself)',
+        r'(?i)(loser|failure|worthless|pathetic)',
+        r'(?i)(hate you|despise|disgusting person)',
+        r'(?i)(trash|garbage|scum)',
+        r'(?i)(gonna kill|will kill|threat|hurt you)',
+        r'(?i)(beat you|fight you|come after)',
+    ],
+    'piracy': [
+        r'(?i)(download|torrent|magnet|pirate)',
+        r'(?i)(free download|full movie|full video)',
+        r'(?i)(leaked|leak|rip)',
+        r'(?i)(camrip|cam rip|dvdrip|webrip)',
+        r'(?i)(watch free|stream free)',
+        r'(?i)(illegal|pirated|cracked)',
+    ],
+}
+
+EDGE_CASES = [
+    '', 'first', 'FREE DOWNLOAD full movie leaked', 'kill yourself you fat pig', 'Tripod', 'diet tips',
+    'gonna kill it', 'Whale watching', 'disgusting person', 'come after you', 'camrip webrip dvdrip',
+    'I hate you trash', 'DIE', 'watch free stream free', 'earn money on telegram', 'sub4sub',
+]
+
+
+def baseline_matches(text):
+    return {pattern for patterns in BASELINE_PATTERNS.values() for pattern in patterns if re.search(pattern, text)}
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return PatternEngine()
+
+
+def test_scan_matches_baseline_regexes(engine, corpus):
+    for text in EDGE_CASES + [c['text'] for c in corpus]:
+        assert {rule['pattern'] for rule in engine.scan(text)} == baseline_matches(text), text
+
+
+def test_harassment_findings_match_baseline(analyzer, corpus):
+    _, harassment_comments = analyzer.detect_harassment(corpus)
+    flagged = {entry['comment_id']: entry for entry in to_json(harassment_comments)}
+    for comment in corpus:
+        expected = [p for p in BASELINE_PATTERNS['harassment'] if re.search(p, comment['text'])]
+        if expected:
+            assert flagged[comment['id']]['matched_patterns'] == expected
+        else:
+            assert comment['id'] not in flagged
+
+
+def test_folded_text_only_adds_harassment_rules(engine):
+    matched = engine.scan('1d10t, check out my channel', 'idiot , check out my channel')
+    assert [rule['id'] for rule in matched] == ['spam.call_to_action', 'harassment.insult']
+
+
+def test_rule_validation(engine):
+    with pytest.raises(ValueError):
+        PatternEngine([{'id': 'x', 'detector': 'nope', 'terms': ['a']}])
+    with pytest.raises(ValueError):
+        PatternEngine([{'id': 'x', 'detector': 'spam', 'terms': ['a']},
+                       {'id': 'x', 'detector': 'spam', 'terms': ['b']}])
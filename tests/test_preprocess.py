@@ -0,0 +1,50 @@
+import pytest
+
+from pattern_engine import PatternEngine
+from preprocess import PreparedComment, fold_text
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return PatternEngine()
+
+
+def rule_ids(engine, text):
+    prepared = PreparedComment(text)
+    return [rule['id'] for rule in engine.scan(prepared.text, prepared.folded)]
+
+
+@pytest.mark.parametrize('text', [
+    'That beat, you know… was fire',
+    'He will die… laughing',
+    'come after… the chorus',
+    'Café vibes, beat. You rock',
+    'Great beat! You nailed it',
+    'What a fight; you could feel it',
+])
+def test_folding_never_joins_words_across_punctuation(engine, text):
+    # Whatever the raw text matches is kept; the folded form adds nothing
+    assert rule_ids(engine, text) == [rule['id'] for rule in engine.scan(text.casefold())]
+
+
+@pytest.mark.parametrize('text, rule', [
+    ('k y s', 'harassment.self_harm'),
+    ('k.y.s.', 'harassment.self_harm'),
+    ('i-d-i-o-t', 'harassment.insult'),
+    ('1d10t', 'harassment.insult'),
+    ('u r a l0s3r', 'harassment.belittling'),
+    ('ｓｔｕｐｉｄ', 'harassment.insult'),
+])
+def test_folding_undoes_evasion(engine, text, rule):
+    assert rule in rule_ids(engine, text)
+
+
+def test_folded_is_input_when_nothing_changed():
+    text = 'plain comment, nothing to see. 2024 was great'
+    assert fold_text(text)[1] is text
+
+
+def test_punctuation_is_kept_but_not_tokenized():
+    tokens, folded = fold_text('café, beat. you')
+    assert tokens == ['cafe', 'beat', 'you']
+    assert folded == 'cafe , beat . you'
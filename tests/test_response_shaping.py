@@ -0,0 +1,75 @@
+import pytest
+
+from response_shaping import ResultCache, decode_cursor, page, parse_fields, parse_page_size, shape_result
+
+
+@pytest.fixture
+def result():
+    return {
+        'success': True,
+        'video_id': 'abc',
+        'statistics': {'total_comments': 5},
+        'bot_indicators': [],
+        'harassment_indicators': [],
+        'harassment_comments': [{'comment_id': f'h{i}'} for i in range(5)],
+        'copyright_violations': [{'comment_id': 'v0'}],
+        'comments': [{'id': f'c{i}'} for i in range(5)],
+        'conclusion': 'ok'
+    }
+
+
+def test_parse_fields_expands_groups():
+    assert parse_fields(None) is None
+    assert parse_fields(' statistics, ,conclusion') == {'statistics', 'conclusion'}
+    assert 'harassment_comments' in parse_fields(['flags'])
+    assert 'comments' not in parse_fields('flags')
+
+
+def test_parse_page_size_bounds():
+    assert parse_page_size('') is None
+    assert parse_page_size('20') == 20
+    for value in ('0', '100000', 'x', True):
+        with pytest.raises(ValueError):
+            parse_page_size(value)
+
+
+def test_project_keeps_selected_and_always_included(result):
+    shaped = shape_result(result, parse_fields('flags'))
+    assert 'comments' not in shaped
+    assert shaped['success'] and shaped['video_id'] == 'abc'
+    with pytest.raises(ValueError):
+        shape_result(result, {'nonsense'})
+
+
+def test_pagination_walks_every_item(result):
+    shaped = shape_result(result, None, page_size=2, result_id='r1')
+    assert shaped['harassment_comments'] == result['harassment_comments'][:2]
+    assert shaped['pagination']['harassment_comments']['total'] == 5
+
+    items = list(shaped['harassment_comments'])
+    cursor = shaped['pagination']['harassment_comments']['next_cursor']
+    while cursor:
+        field, offset = decode_cursor(cursor)
+        chunk = page(result, field, offset, 2)
+        items += chunk['items']
+        cursor = chunk['next_cursor']
+    assert items == result['harassment_comments']
+
+
+def test_invalid_cursor():
+    for cursor in ('', 'not-base64!', 'Ym9ndXM6MQ'):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+def test_failed_results_are_not_shaped():
+    failed = {'success': False, 'error': 'boom'}
+    assert shape_result(failed, {'statistics'}, page_size=1) is failed
+
+
+def test_result_cache_lru():
+    cache = ResultCache(max_entries=2)
+    first = cache.put({'n': 1})
+    cache.put({'n': 2})
+    cache.put({'n': 3})
+    assert cache.get(first) is None
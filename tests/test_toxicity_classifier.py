@@ -0,0 +1,54 @@
+import pytest
+from groq import Groq
+
+import stub_services
+from toxicity_classifier import FAILED_ANALYSIS, ToxicityClassifier, parse_verdicts
+from verdict_cache import VerdictCache
+
+TEXTS = ['you are a stupid idiot', 'lovely video', '', 'LOVELY  video', 'I will kill you', 'nice edit']
+
+
+@pytest.fixture
+def client(stub_url):
+    return Groq(api_key='test', base_url=stub_url, max_retries=0)
+
+
+@pytest.fixture
+def flaky_stub():
+    saved = dict(stub_services.config)
+    yield stub_services.config
+    stub_services.config.update(saved)
+
+
+def test_classify_keeps_order_and_collapses_duplicates(client):
+    classifier = ToxicityClassifier(client, batch_size=2, workers=2)
+    analyses = classifier.classify(TEXTS)
+
+    assert [a['harassment_level'] for a in analyses] == ['medium', 'none', 'none', 'none', 'high', 'none']
+    assert analyses[2]['explanation'] == 'Empty comment'
+    assert classifier.stats['duplicates_collapsed'] == 1
+    assert classifier.stats['llm_classified'] == 4
+
+
+def test_cached_verdicts_skip_the_llm(client):
+    cache = VerdictCache()
+    ToxicityClassifier(client, cache=cache).classify(TEXTS)
+    classifier = ToxicityClassifier(client, cache=cache)
+    classifier.classify(TEXTS)
+    assert classifier.stats['cache_hits'] == 4
+    assert classifier.stats['llm_classified'] == 0
+
+
+def test_malformed_verdicts_are_retried_one_by_one(client, flaky_stub):
+    flaky_stub['error_rate'] = 1.0
+    classifier = ToxicityClassifier(client, batch_size=3, max_retries=1)
+    analyses = classifier.classify(TEXTS)
+    assert classifier.stats['failed'] == 4
+    assert analyses[0] == FAILED_ANALYSIS
+
+
+def test_parse_verdicts_skips_incomplete_entries():
+    content = ('Sure! {"results": [{"id": 1, "toxicity_level": "low", "threat_level": "none", '
+               '"harassment_level": "none", "overall_safety": "safe", "explanation": "ok"}, {"id": 2}]}')
+    assert list(parse_verdicts(content)) == ['1']
+    assert parse_verdicts('no json here') == {}
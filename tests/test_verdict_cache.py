@@ -0,0 +1,62 @@
+import sqlite3
+import time
+
+from preprocess import normalize_text
+from verdict_cache import VerdictCache, verdict_key
+
+VERDICT = {'is_toxic': True, 'score': 0.9}
+
+
+def test_key_ignores_case_and_spacing():
+    assert normalize_text('  FIRST\n  comment ') == 'first comment'
+    assert verdict_key('First  comment', 'm', 'v1') == verdict_key('first comment', 'm', 'v1')
+    assert verdict_key('first comment', 'm', 'v1') != verdict_key('first comment', 'm', 'v2')
+
+
+def test_memory_tier_is_lru():
+    cache = VerdictCache(max_entries=2)
+    cache.put('a', VERDICT)
+    cache.put('b', VERDICT)
+    cache.get('a')
+    cache.put('c', VERDICT)
+    assert cache.get('b') is None
+    assert cache.get('a') == VERDICT
+    assert cache.stats()['memory_hits'] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / 'verdicts.db')
+    VerdictCache(disk_path=path).put('a', VERDICT)
+    cache = VerdictCache(disk_path=path)
+    assert cache.get('a') == VERDICT
+    assert cache.get('a') == VERDICT
+    assert (cache.counters['disk_hits'], cache.counters['memory_hits']) == (1, 1)
+
+
+def test_disk_tier_expires_entries(tmp_path):
+    path = str(tmp_path / 'verdicts.db')
+    VerdictCache(disk_path=path).put('a', VERDICT)
+    with sqlite3.connect(path) as conn:
+        conn.execute('UPDATE verdicts SET created = created - 100')
+    cache = VerdictCache(disk_path=path, ttl=10)
+    assert cache.get('a') is None
+    assert cache.counters['misses'] == 1
+
+
+def test_memory_tier_expires_entries(monkeypatch):
+    cache = VerdictCache(ttl=10)
+    cache.put('a', VERDICT)
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert cache.get('a') is None
+    assert cache.stats()['memory_entries'] == 0
+
+
+def test_disk_hits_keep_their_age_in_memory(tmp_path, monkeypatch):
+    path = str(tmp_path / 'verdicts.db')
+    VerdictCache(disk_path=path).put('a', VERDICT)
+    cache = VerdictCache(disk_path=path, ttl=10)
+    assert cache.get('a') == VERDICT
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert cache.get('a') is None
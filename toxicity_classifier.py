@@ -0,0 +1,183 @@
+"""Batched, concurrent LLM toxicity classification for Instagram comments.
+
+Duplicate comments are collapsed and looked up in the verdict cache first.
+The rest are packed several per structured prompt, batches are sent in
+parallel, and verdicts are matched back to comments by ID. Comments whose
+verdict is missing or fails to parse are retried on their own.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import LLM_BATCH_SIZE, LLM_REQUEST_SECONDS, record_cache
+from verdict_cache import verdict_key
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_RETRIES = 2
+TOKENS_PER_COMMENT = 120
+
+# Bump whenever build_prompt changes so cached verdicts are not reused
+PROMPT_VERSION = 'batch-v1'
+
+VERDICT_FIELDS = ('toxicity_level', 'threat_level', 'harassment_level', 'overall_safety', 'explanation')
+
+FAILED_ANALYSIS = {
+    "toxicity_level": "unknown",
+    "threat_level": "unknown",
+    "harassment_level": "unknown",
+    "overall_safety": "unknown",
+    "explanation": "Analysis failed"
+}
+
+EMPTY_ANALYSIS = {
+    "toxicity_level": "none",
+    "threat_level": "none",
+    "harassment_level": "none",
+    "overall_safety": "safe",
+    "explanation": "Empty comment"
+}
+
+
+def build_prompt(batch):
+    """Prompt asking for one verdict per (id, text) pair"""
+    payload = json.dumps([{'id': cid, 'text': text} for cid, text in batch], ensure_ascii=False)
+    return (
+        "Analyze each of the following social media comments for toxicity, threats, and harassment.\n"
+        "Comments are given as a JSON array of objects with \"id\" and \"text\".\n"
+        "Provide a JSON response with the following structure, one result per comment:\n"
+        "{\n"
+        "  \"results\": [\n"
+        "    {\n"
+        "      \"id\": \"the comment id\",\n"
+        "      \"toxicity_level\": \"low/medium/high\",\n"
+        "      \"threat_level\": \"none/low/medium/high\",\n"
+        "      \"harassment_level\": \"none/low/medium/high\",\n"
+        "      \"overall_safety\": \"safe/concerning/dangerous\",\n"
+        "      \"explanation\": \"brief explanation of the analysis\"\n"
+        "    }\n"
+        "  ]\n"
+        "}\n\n"
+        f"Comments to analyze: {payload}\n\n"
+        "Respond only with valid JSON."
+    )
+
+
+def parse_verdicts(content):
+    """Extract {id: verdict} from a model response, skipping malformed entries"""
+    start, end = content.find('{'), content.rfind('}')
+    if start < 0 or end < start:
+        return {}
+    try:
+        data = json.loads(content[start:end + 1])
+    except ValueError:
+        return {}
+
+    results = data.get('results') if isinstance(data, dict) else None
+    if not isinstance(results, list):
+        return {}
+
+    verdicts = {}
+    for item in results:
+        if not isinstance(item, dict) or 'id' not in item:
+            continue
+        if not all(field in item for field in VERDICT_FIELDS):
+            continue
+        verdicts[str(item['id'])] = {field: item[field] for field in VERDICT_FIELDS}
+    return verdicts
+
+
+class ToxicityClassifier:
+    """Classifies comment texts with a chat-completions client (Groq or compatible)"""
+
+    def __init__(self, client, model=DEFAULT_MODEL, batch_size=DEFAULT_BATCH_SIZE,
+                 workers=DEFAULT_WORKERS, max_retries=DEFAULT_MAX_RETRIES, cache=None):
+        self.client = client
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.max_retries = max(0, max_retries)
+        self.cache = cache
+        self.stats = {}
+
+    def _classify_batch(self, batch):
+        LLM_BATCH_SIZE.observe(len(batch))
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            resp = self.client.chat.completions.create(
+                messages=[{"role": "user", "content": build_prompt(batch)}],
+                model=self.model,
+                temperature=0.1,
+                max_tokens=TOKENS_PER_COMMENT * len(batch) + 50
+            )
+            verdicts = parse_verdicts(resp.choices[0].message.content or '')
+            if len(verdicts) < len(batch):
+                outcome = 'incomplete'
+        except Exception:
+            verdicts = {}
+            outcome = 'error'
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
+        return {cid: verdicts[cid] for cid, _ in batch if cid in verdicts}
+
+    def _run(self, pending, batch_size, pool):
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        results = {}
+        for verdicts in pool.map(self._classify_batch, batches):
+            results.update(verdicts)
+        return results
+
+    def classify(self, texts):
+        """Return one analysis per text, in order"""
+        analyses = [dict(EMPTY_ANALYSIS) if not text.strip() else None for text in texts]
+
+        # Collapse duplicates: one entry per distinct normalized text
+        positions = {}
+        for i, text in enumerate(texts):
+            if analyses[i] is None:
+                positions.setdefault(verdict_key(text, self.model, PROMPT_VERSION), []).append(i)
+
+        keys = []
+        cache_hits = 0
+        for key, indices in positions.items():
+            verdict = self.cache.get(key) if self.cache is not None else None
+            if verdict is None:
+                keys.append(key)
+                continue
+            cache_hits += 1
+            for i in indices:
+                analyses[i] = dict(verdict)
+
+        pending = [(str(n), texts[positions[key][0]]) for n, key in enumerate(keys)]
+        results = {}
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                results = self._run(pending, self.batch_size, pool)
+
+                # Only comments without a usable verdict are sent again, one per prompt
+                for _ in range(self.max_retries):
+                    pending = [(cid, text) for cid, text in pending if cid not in results]
+                    if not pending:
+                        break
+                    results.update(self._run(pending, 1, pool))
+
+        for cid, verdict in results.items():
+            key = keys[int(cid)]
+            if self.cache is not None:
+                self.cache.put(key, verdict)
+            for i in positions[key]:
+                analyses[i] = dict(verdict)
+
+        if self.cache is not None:
+            record_cache('verdict', cache_hits, len(keys))
+        self.stats = {
+            'comments': len(texts),
+            'unique_texts': len(positions),
+            'duplicates_collapsed': sum(len(p) - 1 for p in positions.values()),
+            'cache_hits': cache_hits,
+            'cache_misses': len(keys),
+            'llm_classified': len(results),
+            'failed': len(keys) - len(results)
+        }
+        return [a if a is not None else dict(FAILED_ANALYSIS) for a in analyses]
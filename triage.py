@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""Local first-stage toxicity model, scored in NumPy batches.
+
+Comments are turned into hashed byte n-grams of their normalized text (the
+hashing is vectorized over the whole batch, no per-comment Python loop) and
+scored by a logistic regression. It is cheap enough for every comment, so
+Instagram analysis only sends the uncertain band between `low` and `high` to
+the LLM, and harassment findings carry the model's score.
+
+There is no built-in model. Train one from labelled comments (JSON lines
+with "text" and a 0/1 "label", or saved Instagram results with their
+"toxicity_analysis"), or bootstrap one from the detector rules on the
+synthetic corpus, then check the cost/recall trade-off of the thresholds:
+
+    python triage.py train --jsonl labelled.jsonl -o aegis_triage.npz
+    python triage.py train --synthetic 20000 -o aegis_triage.npz
+    python triage.py evaluate aegis_triage.npz --jsonl held_out.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # triage is unavailable and every comment goes to the LLM
+    np = None
+
+from preprocess import normalize_text
+
+DEFAULT_MODEL_PATH = 'aegis_triage.npz'
+DEFAULT_FEATURES = 2 ** 18
+NGRAM_SIZES = (2, 3, 4, 5)
+DEFAULT_LOW = 0.1
+DEFAULT_HIGH = 0.9
+DEFAULT_LLM_FRACTION = 1.0
+DEFAULT_EPOCHS = 150
+DEFAULT_LEARNING_RATE = 0.05
+DEFAULT_L2 = 1e-6
+
+# Comments scored per NumPy batch, which bounds the n-gram arrays' memory
+SCORE_BATCH = 5000
+
+FNV_OFFSET = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+
+TOXIC_LEVELS = ('medium', 'high')
+DECISIONS = ('safe', 'toxic', 'llm')
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError('The triage model needs numpy (pip install numpy)')
+
+
+def hash_ngrams(texts, sizes=NGRAM_SIZES, n_features=DEFAULT_FEATURES):
+    """Sparse hashed n-gram features of a batch: (rows, columns, values) arrays
+
+    Each text is normalized, padded with spaces so word edges form n-grams of
+    their own, and hashed with FNV-1a per n-gram, for all texts at once.
+    Values are ±1 (a hash bit picks the sign, so collisions tend to cancel)
+    scaled by 1/sqrt(n-grams in the text).
+    """
+    _require_numpy()
+    encoded = [f' {normalize_text(text)} '.encode('utf-8') for text in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+    doc = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)
+
+    rows, hashes = [], []
+    with np.errstate(over='ignore'):
+        for size in sizes:
+            count = len(data) - size + 1
+            if count <= 0:
+                continue
+            h = np.full(count, FNV_OFFSET ^ size, dtype=np.uint64)
+            for k in range(size):
+                h = (h ^ data[k:k + count]) * np.uint64(FNV_PRIME)
+            # Drop n-grams running across two texts
+            inside = doc[:count] == doc[size - 1:size - 1 + count]
+            rows.append(doc[:count][inside])
+            hashes.append(h[inside])
+
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0)
+    rows = np.concatenate(rows)
+    hashes = np.concatenate(hashes)
+    hashes ^= hashes >> np.uint64(29)
+    columns = (hashes % np.uint64(n_features)).astype(np.int64)
+    signs = np.where((hashes >> np.uint64(63)) == 1, -1.0, 1.0)
+    grams = np.bincount(rows, minlength=len(encoded))
+    values = signs / np.sqrt(np.maximum(grams[rows], 1))
+    return rows, columns, values
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class TriageModel:
+    """Hashed n-gram logistic regression"""
+
+    def __init__(self, weights, bias=0.0, sizes=NGRAM_SIZES, metadata=None):
+        _require_numpy()
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.sizes = tuple(int(size) for size in sizes)
+        self.metadata = metadata or {}
+
+    @property
+    def n_features(self):
+        return len(self.weights)
+
+    @classmethod
+    def load(cls, path):
+        _require_numpy()
+        with np.load(path) as data:
+            metadata = json.loads(str(data['metadata'])) if 'metadata' in data else {}
+            return cls(data['weights'], float(data['bias']), data['sizes'].tolist(), metadata)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, weights=self.weights, bias=np.float64(self.bias),
+                                sizes=np.array(self.sizes), metadata=np.array(json.dumps(self.metadata)))
+
+    def _logits(self, texts):
+        rows, columns, values = hash_ngrams(texts, self.sizes, self.n_features)
+        return np.bincount(rows, weights=self.weights[columns] * values, minlength=len(texts)) + self.bias
+
+    def score(self, texts):
+        """Toxicity probability per text, as a NumPy array"""
+        texts = list(texts)
+        scores = np.empty(len(texts))
+        for start in range(0, len(texts), SCORE_BATCH):
+            batch = texts[start:start + SCORE_BATCH]
+            scores[start:start + len(batch)] = _sigmoid(self._logits(batch))
+        return scores
+
+    @classmethod
+    def train(cls, texts, labels, n_features=DEFAULT_FEATURES, sizes=NGRAM_SIZES, epochs=DEFAULT_EPOCHS,
+              learning_rate=DEFAULT_LEARNING_RATE, l2=DEFAULT_L2):
+        """Fit on texts and 0/1 labels with full-batch Adam; classes are weighted to balance"""
+        _require_numpy()
+        texts = list(texts)
+        labels = np.asarray(labels, dtype=np.float64)
+        if len(texts) != len(labels) or not len(texts):
+            raise ValueError('Training needs as many labels as texts, and at least one of each')
+        positives = labels.sum()
+        if positives in (0, len(labels)):
+            raise ValueError('Training needs both toxic and non-toxic examples')
+
+        rows, columns, values = hash_ngrams(texts, sizes, n_features)
+        sample_weight = np.where(labels == 1, len(labels) / (2 * positives),
+                                 len(labels) / (2 * (len(labels) - positives)))
+        weights = np.zeros(n_features)
+        bias = 0.0
+        moments = [np.zeros(n_features), np.zeros(n_features), 0.0, 0.0]
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        for step in range(1, epochs + 1):
+            z = np.bincount(rows, weights=weights[columns] * values, minlength=len(texts)) + bias
+            error = (_sigmoid(z) - labels) * sample_weight / len(labels)
+            grad_w = np.bincount(columns, weights=values * error[rows], minlength=n_features) + l2 * weights
+            grad_b = error.sum()
+
+            moments[0] = beta1 * moments[0] + (1 - beta1) * grad_w
+            moments[1] = beta2 * moments[1] + (1 - beta2) * grad_w ** 2
+            moments[2] = beta1 * moments[2] + (1 - beta1) * grad_b
+            moments[3] = beta2 * moments[3] + (1 - beta2) * grad_b ** 2
+            correction1, correction2 = 1 - beta1 ** step, 1 - beta2 ** step
+            weights -= learning_rate * (moments[0] / correction1) / (np.sqrt(moments[1] / correction2) + eps)
+            bias -= learning_rate * (moments[2] / correction1) / (np.sqrt(moments[3] / correction2) + eps)
+
+        return cls(weights, bias, sizes, {
+            'trained_on': len(texts),
+            'toxic_examples': int(positives),
+            'epochs': epochs,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+        })
+
+
+def route(scores, low=DEFAULT_LOW, high=DEFAULT_HIGH, max_llm_fraction=DEFAULT_LLM_FRACTION):
+    """Decision per score: 'safe' below `low`, 'toxic' from `high`, 'llm' in between
+
+    At most `max_llm_fraction` of the comments go to the LLM; beyond that the
+    most uncertain ones (closest to the middle of the band) are kept and the
+    rest are decided locally at the band's midpoint.
+    """
+    if not 0 <= low <= high <= 1:
+        raise ValueError('Triage thresholds need 0 <= low <= high <= 1')
+    if not 0 <= max_llm_fraction <= 1:
+        raise ValueError('The LLM fraction must be between 0 and 1')
+    scores = np.asarray(scores, dtype=np.float64)
+    middle = (low + high) / 2
+    decisions = np.where(scores < low, 0, np.where(scores >= high, 1, 2))
+
+    uncertain = np.flatnonzero(decisions == 2)
+    budget = int(max_llm_fraction * len(scores))
+    if len(uncertain) > budget:
+        by_certainty = uncertain[np.argsort(np.abs(scores[uncertain] - middle), kind='stable')]
+        decided = by_certainty[budget:]
+        decisions[decided] = np.where(scores[decided] >= middle, 1, 0)
+    return [DECISIONS[d] for d in decisions]
+
+
+def local_verdict(score, decision):
+    """Verdict in the LLM's shape for a comment the model decided on its own"""
+    toxic = decision == 'toxic'
+    return {
+        'toxicity_level': 'high' if toxic else 'low',
+        'threat_level': 'unknown' if toxic else 'none',
+        'harassment_level': 'unknown' if toxic else 'none',
+        'overall_safety': 'concerning' if toxic else 'safe',
+        'explanation': f"Local triage model score {score:.2f} ({'toxic' if toxic else 'not toxic'})"
+    }
+
+
+def cascade_stats(decisions, low, high, max_llm_fraction):
+    """Counts of a route() result for the response"""
+    total = len(decisions)
+    forwarded = decisions.count('llm')
+    return {
+        'enabled': True,
+        'low': low,
+        'high': high,
+        'max_llm_fraction': max_llm_fraction,
+        'scored': total,
+        'local_safe': decisions.count('safe'),
+        'local_toxic': decisions.count('toxic'),
+        'forwarded': forwarded,
+        'forwarded_fraction': round(forwarded / total, 4) if total else 0.0
+    }
+
+
+def load_from_env():
+    """Model at AEGIS_TRIAGE_MODEL (default aegis_triage.npz), or None if there is none"""
+    path = os.environ.get('AEGIS_TRIAGE_MODEL', DEFAULT_MODEL_PATH)
+    if not path or not os.path.exists(path):
+        return None
+    if np is None:
+        print("⚠️ numpy is not installed; the triage model is not used")
+        return None
+    return TriageModel.load(path)
+
+
+def _label(record):
+    """0/1 label of a JSON line: "label", or an Instagram comment's toxicity_analysis"""
+    if 'label' in record:
+        label = record['label']
+        if isinstance(label, str):
+            return 1 if label.strip().lower() in ('1', 'true', 'toxic', 'yes') else 0
+        return 1 if label else 0
+    analysis = record.get('toxicity_analysis') or {}
+    levels = (analysis.get('toxicity_level'), analysis.get('harassment_level'))
+    if 'unknown' in levels or not analysis:
+        return None
+    return 1 if any(level in TOXIC_LEVELS for level in levels) else 0
+
+
+def read_jsonl(path):
+    texts, labels = [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            label = _label(record)
+            if label is not None and record.get('text'):
+                texts.append(record['text'])
+                labels.append(label)
+    return texts, labels
+
+
+def synthetic_examples(count, seed=0):
+    """Synthetic comments labelled by the harassment rules, to bootstrap a model"""
+    from comment_batch import CommentBatch
+    from comment_corpus import generate_comments
+    from youtube_analyzer import YouTubeAnalyzer
+
+    comments = CommentBatch(generate_comments(count, seed, harassment_ratio=0.2))
+    analyzer = YouTubeAnalyzer()
+    matches = analyzer.scan_comments(comments)
+    labels = [1 if any(r['detector'] == 'harassment' for r in rules) else 0 for rules in matches]
+    return list(comments.texts()), labels
+
+
+def evaluate(model, texts, labels, thresholds):
+    """Forwarded fraction, recall and precision of the cascade per (low, high)
+
+    Comments sent to the LLM are counted as classified correctly, so recall
+    and precision show what the local decisions cost.
+    """
+    start = time.perf_counter()
+    scores = model.score(texts)
+    seconds = time.perf_counter() - start
+    labels = np.asarray(labels)
+    results = []
+    for low, high in thresholds:
+        decisions = np.array(route(scores, low, high))
+        flagged = (decisions == 'toxic') | ((decisions == 'llm') & (labels == 1))
+        caught = (flagged & (labels == 1)).sum()
+        results.append({
+            'low': low,
+            'high': high,
+            'forwarded_fraction': round(float((decisions == 'llm').mean()), 4),
+            'recall': round(float(caught / max(labels.sum(), 1)), 4),
+            'precision': round(float(caught / max(flagged.sum(), 1)), 4)
+        })
+    return {'comments': len(texts), 'comments_per_second': round(len(texts) / seconds) if seconds else None,
+            'thresholds': results}
+
+
+def _thresholds(value):
+    pairs = []
+    for pair in value.split(','):
+        low, high = pair.split(':')
+        pairs.append((float(low), float(high)))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train or evaluate the local toxicity triage model')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train = commands.add_parser('train', help='Fit a model and save it')
+    train.add_argument('--jsonl', help='Labelled comments, one JSON object per line')
+    train.add_argument('--synthetic', type=int, help='Bootstrap from this many rule-labelled synthetic comments')
+    train.add_argument('--features', type=int, default=DEFAULT_FEATURES, help='Hashed feature space size')
+    train.add_argument('--epochs', type=int, default=DEFAULT_EPOCHS)
+    train.add_argument('-o', '--output', default=DEFAULT_MODEL_PATH)
+
+    evaluation = commands.add_parser('evaluate', help='Cost/recall of thresholds on labelled comments')
+    evaluation.add_argument('model')
+    evaluation.add_argument('--jsonl', help='Labelled comments, one JSON object per line')
+    evaluation.add_argument('--synthetic', type=int, help='Evaluate on rule-labelled synthetic comments')
+    evaluation.add_argument('--seed', type=int, default=1, help='Seed of the synthetic comments')
+    evaluation.add_argument('--thresholds', type=_thresholds, default=[(0.05, 0.95), (0.1, 0.9), (0.2, 0.8), (0.3, 0.7)],
+                            help='Comma-separated low:high pairs')
+    args = parser.parse_args()
+
+    if not args.jsonl and not args.synthetic:
+        parser.error('Give --jsonl or --synthetic')
+    try:
+        if args.jsonl:
+            texts, labels = read_jsonl(args.jsonl)
+        else:
+            texts, labels = synthetic_examples(args.synthetic, getattr(args, 'seed', 0))
+
+        if args.command == 'train':
+            start = time.perf_counter()
+            model = TriageModel.train(texts, labels, args.features, epochs=args.epochs)
+            model.save(args.output)
+            print(f"✅ Trained on {len(texts)} comments ({sum(labels)} toxic) in "
+                  f"{time.perf_counter() - start:.1f}s, saved to {args.output}")
+        else:
+            report = evaluate(TriageModel.load(args.model), texts, labels, args.thresholds)
+            print(f"📊 {report['comments']} comments, {report['comments_per_second']} scored per second")
+            print(f"{'low':>6} {'high':>6} {'to LLM':>8} {'recall':>8} {'precision':>10}")
+            for row in report['thresholds']:
+                print(f"{row['low']:>6.2f} {row['high']:>6.2f} {row['forwarded_fraction']:>8.1%} "
+                      f"{row['recall']:>8.1%} {row['precision']:>10.1%}")
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
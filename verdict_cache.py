@@ -0,0 +1,134 @@
+"""Content-addressed cache of LLM toxicity verdicts.
+
+Verdicts are keyed by a hash of the normalized comment text, the model name
+and the prompt version, so repeated comments ("first", emoji, copy-pasted
+spam) are classified once. An in-memory LRU sits in front of an optional
+SQLite tier with a TTL and a size cap.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from preprocess import normalize_text
+
+DEFAULT_MEMORY_ENTRIES = 10000
+DEFAULT_DISK_ENTRIES = 500000
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Disk eviction runs once per this many writes
+EVICTION_INTERVAL = 500
+
+
+def verdict_key(text, model, prompt_version):
+    payload = '\0'.join((model, prompt_version, normalize_text(text)))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class VerdictCache:
+    """Two-tier (memory LRU + optional SQLite) verdict cache, safe across threads"""
+
+    def __init__(self, max_entries=DEFAULT_MEMORY_ENTRIES, disk_path=None,
+                 ttl=DEFAULT_TTL, max_disk_entries=DEFAULT_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # key -> (created, verdict)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+        if disk_path:
+            with self._connect() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS verdicts '
+                    '(key TEXT PRIMARY KEY, verdict TEXT NOT NULL, created REAL NOT NULL)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_verdicts_created ON verdicts (created)')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.disk_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _remember(self, key, verdict, created=None):
+        with self._lock:
+            self._memory[key] = (time.time() if created is None else created, verdict)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return a cached verdict or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, verdict = entry
+                if time.time() - created <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.counters['memory_hits'] += 1
+                    return dict(verdict)
+                del self._memory[key]
+
+        if self.disk_path:
+            with self._connect() as conn:
+                row = conn.execute(
+                    'SELECT verdict, created FROM verdicts WHERE key = ?', (key,)
+                ).fetchone()
+                if row and time.time() - row[1] <= self.ttl:
+                    verdict = json.loads(row[0])
+                    self._remember(key, verdict, row[1])
+                    self._count('disk_hits')
+                    return dict(verdict)
+                if row:
+                    conn.execute('DELETE FROM verdicts WHERE key = ?', (key,))
+
+        self._count('misses')
+        return None
+
+    def put(self, key, verdict):
+        self._remember(key, dict(verdict))
+        if not self.disk_path:
+            return
+
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO verdicts (key, verdict, created) VALUES (?, ?, ?)',
+                (key, json.dumps(verdict), time.time())
+            )
+            with self._lock:
+                self._writes += 1
+                evict = self._writes % EVICTION_INTERVAL == 0
+            if evict:
+                self._evict(conn)
+
+    def _evict(self, conn):
+        """Drop expired rows, then the oldest rows beyond the size cap"""
+        conn.execute('DELETE FROM verdicts WHERE created < ?', (time.time() - self.ttl,))
+        excess = conn.execute('SELECT COUNT(*) FROM verdicts').fetchone()[0] - self.max_disk_entries
+        if excess > 0:
+            conn.execute(
+                'DELETE FROM verdicts WHERE key IN '
+                '(SELECT key FROM verdicts ORDER BY created LIMIT ?)', (excess,)
+            )
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+            counters['memory_entries'] = len(self._memory)
+        lookups = counters['memory_hits'] + counters['disk_hits'] + counters['misses']
+        counters['hit_rate'] = round((lookups - counters['misses']) / lookups, 4) if lookups else 0.0
+        return counters
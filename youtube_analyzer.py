@@ -7,7 +7,15 @@ import re
 from collections import Counter
 from datetime import datetime
 from youtube_comment_downloader import YoutubeCommentDownloader, SORT_BY_RECENT
-from difflib import SequenceMatcher
+from near_duplicates import find_similar_groups, verify_similar_groups
+from pattern_engine import PatternEngine
+from keyword_index import KeywordCatalogs, get_keyword_index, keyword_list_hash
+from streaming import RunningAnalysis
+from preprocess import prepare_comments
+from comment_batch import CommentBatch, FlaggedComments, to_json
+from author_index import collect_activity
+from graph import build_graph, thread_id, DEFAULT_TOP_NODES
+from metrics import record_scrape, timed
 
 # Fix Windows console encoding
 if sys.platform == "win32":
@@ -16,9 +24,99 @@ if sys.platform == "win32":
         sys.stdout = codecs.getwriter('utf-8')(sys.stdout.detach())
         sys.stderr = codecs.getwriter('utf-8')(sys.stderr.detach())
 
+# Consecutive already-stored comments that mark the end of the new ones
+KNOWN_COMMENT_STREAK = 3
+
+# Comments between progress reports while scraping
+PROGRESS_INTERVAL = 50
+
+def _no_progress(stage, comments_scraped=None):
+    pass
+
+def _spam_entry(comment, rule):
+    return {
+        'author': comment['author'],
+        'text': comment['text'][:100],
+        'pattern': rule['pattern'],
+        'rule_id': rule['id']
+    }
+
+def _harassment_entry(comment, finding):
+    rules, h_type = finding
+    return {
+        'author': comment['author'],
+        'text': comment['text'],
+        'time': comment['time'],
+        'likes': comment['likes'],
+        'matched_patterns': [r['pattern'] for r in rules],
+        'matched_rules': [r['id'] for r in rules],
+        'severity': 'high' if len(rules) > 1 else 'medium',
+        'comment_id': comment['id'],
+        'type': h_type
+    }
+
+def _violation_entry(comment, finding):
+    rules, keyword_matches = finding
+    return {
+        'author': comment['author'],
+        'text': comment['text'],
+        'time': comment['time'],
+        'likes': comment['likes'],
+        'matched_patterns': [r['pattern'] for r in rules],
+        'matched_rules': [r['id'] for r in rules],
+        'keyword_matches': keyword_matches,
+        'severity': 'high' if rules else 'medium',
+        'comment_id': comment['id']
+    }
+
+def _scored(entries, risks):
+    """Flagged comment entries with their author's risk score added"""
+    if isinstance(entries, FlaggedComments):
+        entries.annotate('author_risk', risks, default=0.0)
+        return entries
+    return [dict(entry, author_risk=risks.get(entry['author'], 0.0)) for entry in entries]
+
+def _annotate_author_risk(result, risks):
+    """Put authors' cross-video risk scores (author name -> score) into a result's flags"""
+    for indicator in result['bot_indicators']:
+        if 'authors' in indicator:
+            indicator['author_risk'] = [risks.get(author, 0.0) for author in indicator['authors']]
+        else:
+            indicator['examples'] = _scored(indicator['examples'], risks)
+    for indicator in result['harassment_indicators']:
+        indicator['examples'] = _scored(indicator['examples'], risks)
+    if 'harassment_comments' in result:
+        result['harassment_comments'] = _scored(result['harassment_comments'], risks)
+    result['copyright_violations'] = _scored(result['copyright_violations'], risks)
+
+def _flagged_names(result):
+    """Authors named anywhere in a result's flags"""
+    names = set()
+    for indicator in result['bot_indicators']:
+        names.update(indicator.get('authors', ()))
+        names.update(example['author'] for example in indicator.get('examples', ()))
+    for indicator in result['harassment_indicators']:
+        names.update(example['author'] for example in indicator['examples'])
+    names.update(violation['author'] for violation in result['copyright_violations'])
+    return names
+
+def _flag_rows(comments, bot_ids, harassment_comments, violations):
+    """Row indices each detector flagged, in the shape collect_activity takes"""
+    rows = {cid: i for i, cid in enumerate(comments.ids)}
+    return {
+        'bot': [rows[cid] for cid in bot_ids if cid in rows],
+        'harassment': harassment_comments.indices,
+        'copyright': violations.indices
+    }
+
 class YouTubeAnalyzer:
-    def __init__(self):
+    def __init__(self, store=None, authors=None):
         self.downloader = YoutubeCommentDownloader()
+        self.store = store
+        self.authors = authors
+        self.network_nodes = DEFAULT_TOP_NODES
+        self.triage = None  # TriageModel scoring harassment findings (see triage.py)
+        self.patterns = PatternEngine.from_env()
         
     def extract_video_id(self, url_or_id):
         """Extract video ID from YouTube URL or return ID if already provided"""
@@ -38,49 +136,118 @@ class YouTubeAnalyzer:
         
         return None
     
-    def scrape_comments(self, video_id, limit=200):
-        """Scrape comments from YouTube video"""
+    def iter_comments(self, video_id, limit=200, progress=None):
+        """Yield comments from YouTube video as they are downloaded"""
+        comments = self.downloader.get_comments(
+            youtube_id=video_id,
+            sort_by=SORT_BY_RECENT,
+            language='en'
+        )
+        
+        count = 0
+        for comment in comments:
+            if count >= limit:
+                break
+                
+            yield {
+                'id': comment.get('cid', f'comment_{count}'),
+                'text': comment.get('text', ''),
+                'author': comment.get('author', 'Unknown'),
+                'channel': comment.get('channel', ''),
+                'time': comment.get('time', ''),
+                'likes': comment.get('votes', 0),
+                'replies': comment.get('replies', 0),
+                'photo': comment.get('photo', ''),
+                'heart': comment.get('heart', False)
+            }
+            count += 1
+            if progress and count % PROGRESS_INTERVAL == 0:
+                progress('scraping', count)
+    
+    def sync_comments(self, video_id, limit=200, progress=None):
+        """Download comments newer than the stored ones into the comment store.
+        
+        Returns the comments that were not stored before, newest first. If
+        the store holds fewer than `limit` comments of a video that was not
+        fully scraped, the whole range is downloaded again instead of stopping
+        at known comments; the ones already stored are refreshed but not
+        returned.
+        """
+        state = self.store.video_state(video_id)
+        incremental = state is not None and (state['complete'] or state['count'] >= limit)
+        known_ids = self.store.latest_ids(video_id) if incremental else set()
+        
+        fetched = []
+        seen = 0
+        streak = 0
+        stopped_at_known = False
+        for comment in self.iter_comments(video_id, limit, progress):
+            seen += 1
+            if comment['id'] in known_ids:
+                # Pinned comments can show up out of order, so wait for a run of known ones
+                streak += 1
+                if streak >= KNOWN_COMMENT_STREAK:
+                    stopped_at_known = True
+                    break
+                continue
+            streak = 0
+            fetched.append(comment)
+        
+        # The video is complete once a scan ran off the end of its comments;
+        # stopping at known comments keeps whatever was recorded before
+        complete = None if stopped_at_known else seen < limit
+        stored = self.store.stored_ids(video_id, (c['id'] for c in fetched)) if state is not None else set()
+        self.store.merge(video_id, fetched, complete)
+        return [c for c in fetched if c['id'] not in stored]
+    
+    def scrape_comments(self, video_id, limit=200, use_store=True, progress=None):
+        """Scrape comments from YouTube video into a CommentBatch"""
         try:
             print(f"🔍 Scraping comments from video: {video_id}")
-            comments = self.downloader.get_comments(
-                youtube_id=video_id,
-                sort_by=SORT_BY_RECENT,
-                language='en'
-            )
+            if progress:
+                progress('scraping', 0)
+            if self.store is not None and use_store:
+                with timed('scrape') as stage:
+                    new_comments = self.sync_comments(video_id, limit, progress)
+                    comments_list = CommentBatch(self.store.get_comments(video_id, limit))
+                record_scrape(len(new_comments), stage.seconds, 'store')
+                print(f"✅ Scraped {len(new_comments)} comments, {len(comments_list)} total from store")
+                return comments_list
             
-            comments_list = []
-            for comment in comments:
-                if len(comments_list) >= limit:
-                    break
-                    
-                comments_list.append({
-                    'id': comment.get('cid', f'comment_{len(comments_list)}'),
-                    'text': comment.get('text', ''),
-                    'author': comment.get('author', 'Unknown'),
-                    'channel': comment.get('channel', ''),
-                    'time': comment.get('time', ''),
-                    'likes': comment.get('votes', 0),
-                    'replies': comment.get('replies', 0),
-                    'photo': comment.get('photo', ''),
-                    'heart': comment.get('heart', False)
-                })
+            with timed('scrape') as stage:
+                comments_list = CommentBatch(self.iter_comments(video_id, limit, progress))
+            record_scrape(len(comments_list), stage.seconds, 'youtube')
             
             print(f"✅ Scraped {len(comments_list)} comments")
             return comments_list
             
         except Exception as e:
             print(f"❌ Error scraping comments: {e}")
-            return []
+            return CommentBatch()
+    
+    def scan_comments(self, comments, prepared=None):
+        """Run every detector rule over each comment in a single pass
+        
+        Harassment rules also see the folded form of comments that were
+        written to dodge them ("k y s", "1d10t").
+        """
+        if prepared is None:
+            prepared = prepare_comments(comments)
+        scan = self.patterns.scan
+        return [scan(p.text, p.folded) if p.folded != p.text else scan(p.text) for p in prepared]
     
-    def detect_bot_comments(self, comments):
+    def detect_bot_comments(self, comments, matches=None, prepared=None):
         """Detect potential bot/spam comments"""
         bot_indicators = []
         
+        comments = CommentBatch.coerce(comments)
+        if prepared is None:
+            prepared = prepare_comments(comments)
+        
         # Group comments by text similarity
+        texts = [p.text for p in prepared]
         text_groups = {}
-        for i, comment in enumerate(comments):
-            text = comment['text'].lower().strip()
-            
+        for i, text in enumerate(texts):
             # Check for exact duplicates
             if text in text_groups:
                 text_groups[text].append(i)
@@ -95,61 +262,24 @@ class YouTubeAnalyzer:
                     'severity': 'high',
                     'text': text[:100],
                     'count': len(indices),
-                    'authors': [comments[i]['author'] for i in indices],
-                    'comment_ids': [comments[i]['id'] for i in indices]
+                    'authors': [comments.author(i) for i in indices],
+                    'comment_ids': [comments.ids[i] for i in indices]
                 })
         
-        # Check for similar comments (fuzzy matching)
-        checked = set()
-        for i, comment1 in enumerate(comments):
-            if i in checked:
-                continue
-                
-            similar_group = [i]
-            text1 = comment1['text'].lower().strip()
-            
-            for j, comment2 in enumerate(comments[i+1:], start=i+1):
-                if j in checked:
-                    continue
-                    
-                text2 = comment2['text'].lower().strip()
-                similarity = SequenceMatcher(None, text1, text2).ratio()
-                
-                if similarity > 0.85:  # 85% similar
-                    similar_group.append(j)
-                    checked.add(j)
-            
-            if len(similar_group) >= 3:
-                bot_indicators.append({
-                    'type': 'similar_text',
-                    'severity': 'medium',
-                    'text': text1[:100],
-                    'count': len(similar_group),
-                    'similarity': '85%+',
-                    'authors': [comments[idx]['author'] for idx in similar_group],
-                    'comment_ids': [comments[idx]['id'] for idx in similar_group]
-                })
+        # Check for similar comments (fuzzy matching, 85%+ similar)
+        for similar_group in find_similar_groups(texts, min_size=3, shingle_sets=[p.shingles for p in prepared]):
+            bot_indicators.append({
+                'type': 'similar_text',
+                'severity': 'medium',
+                'text': texts[similar_group[0]][:100],
+                'count': len(similar_group),
+                'similarity': '85%+',
+                'authors': [comments.author(idx) for idx in similar_group],
+                'comment_ids': [comments.ids[idx] for idx in similar_group]
+            })
         
         # Check for spam patterns
-        spam_patterns = [
-            r'(?i)(click here|visit|check out|link in bio)',
-            r'(?i)(free|win|prize|gift|giveaway)',
-            r'(?i)(subscribe|sub4sub|follow)',
-            r'(?i)(whatsapp|telegram|contact)',
-            r'(?i)(earn money|make money|get rich)',
-        ]
-        
-        spam_comments = []
-        for comment in comments:
-            text = comment['text']
-            for pattern in spam_patterns:
-                if re.search(pattern, text):
-                    spam_comments.append({
-                        'author': comment['author'],
-                        'text': text[:100],
-                        'pattern': pattern
-                    })
-                    break
+        spam_comments = self.detect_spam(comments, matches, prepared)
         
         if spam_comments:
             bot_indicators.append({
@@ -161,128 +291,106 @@ class YouTubeAnalyzer:
         
         return bot_indicators
     
-    def detect_harassment(self, comments):
+    def detect_spam(self, comments, matches=None, prepared=None):
+        """Return one entry per comment matching a spam rule"""
+        comments = CommentBatch.coerce(comments)
+        if matches is None:
+            matches = self.scan_comments(comments, prepared)
+        
+        spam_comments = FlaggedComments(comments, _spam_entry)
+        for i, rules in enumerate(matches):
+            spam_rules = [r for r in rules if r['detector'] == 'spam']
+            if spam_rules:
+                spam_comments.add(i, spam_rules[0])
+        
+        return spam_comments
+    
+    def verify_similarity(self, comments, sample_size=500):
+        """Compare similar_text groups against the pairwise SequenceMatcher reference on a sample"""
+        texts = [p.text for p in prepare_comments(comments)]
+        return verify_similar_groups(texts, sample_size=sample_size)
+    
+    def detect_harassment(self, comments, matches=None, prepared=None):
         """Detect harassment, body shaming, and personal attacks in comments"""
         harassment_indicators = []
         
-        # Harassment patterns
-        harassment_patterns = [
-            # Body shaming
-            r'(?i)(fat|ugly|disgusting|gross|hideous)',
-            r'(?i)(lose weight|too fat|too skinny|anorexic)',
-            r'(?i)(pig|whale|cow|beast)',
-            # Personal attacks
-            r'(?i)(stupid|idiot|moron|dumb|retard)',
-            r'(?i)(kill yourself|die|kys|end yourself)',
-            r'(?i)(loser|failure|worthless|pathetic)',
-            # Hate speech
-            r'(?i)(hate you|despise|disgusting person)',
-            r'(?i)(trash|garbage|scum)',
-            # Threats
-            r'(?i)(gonna kill|will kill|threat|hurt you)',
-            r'(?i)(beat you|fight you|come after)',
-        ]
+        comments = CommentBatch.coerce(comments)
+        if matches is None:
+            matches = self.scan_comments(comments, prepared)
         
-        harassment_comments = []
-        for comment in comments:
-            text = comment['text']
-            matched_patterns = []
-            
-            for pattern in harassment_patterns:
-                if re.search(pattern, text):
-                    matched_patterns.append(pattern)
+        harassment_comments = FlaggedComments(comments, _harassment_entry)
+        findings = {}  # rule ids -> (rules, type), shared by comments matching the same rules
+        for i, rules in enumerate(matches):
+            matched_rules = tuple(r for r in rules if r['detector'] == 'harassment')
             
-            if matched_patterns:
-                harassment_comments.append({
-                    'author': comment['author'],
-                    'text': text,
-                    'time': comment['time'],
-                    'likes': comment['likes'],
-                    'matched_patterns': matched_patterns,
-                    'severity': 'high' if len(matched_patterns) > 1 else 'medium',
-                    'comment_id': comment['id'],
-                    'type': self._classify_harassment_type(matched_patterns)
-                })
-        
-        # Group by harassment type
+            if matched_rules:
+                key = tuple(r['id'] for r in matched_rules)
+                finding = findings.get(key)
+                if finding is None:
+                    finding = findings[key] = (matched_rules, self._classify_harassment_type(matched_rules))
+                harassment_comments.add(i, finding)
+        
+        if self.triage is not None and harassment_comments:
+            ids = [comments.ids[i] for i in harassment_comments.indices]
+            scores = self.triage.score(comments.text(i) for i in harassment_comments.indices)
+            harassment_comments.annotate('toxicity_score', dict(zip(ids, scores.round(4).tolist())), field='id')
+        
+        # Group by harassment type (positions into harassment_comments)
         if harassment_comments:
             types = {}
-            for h in harassment_comments:
-                h_type = h['type']
+            for position, (_, h_type) in enumerate(harassment_comments.findings):
                 if h_type not in types:
                     types[h_type] = []
-                types[h_type].append(h)
+                types[h_type].append(position)
             
-            for h_type, items in types.items():
+            for h_type, positions in types.items():
                 harassment_indicators.append({
                     'type': h_type,
-                    'severity': 'high' if len(items) > 5 else 'medium',
-                    'count': len(items),
-                    'examples': items[:5]
+                    'severity': 'high' if len(positions) > 5 else 'medium',
+                    'count': len(positions),
+                    'examples': [harassment_comments[p] for p in positions[:5]]
                 })
         
         return harassment_indicators, harassment_comments
     
-    def _classify_harassment_type(self, patterns):
-        """Classify the type of harassment based on patterns"""
-        pattern_str = ' '.join(str(p) for p in patterns)
-        
-        if any(word in pattern_str.lower() for word in ['fat', 'ugly', 'weight', 'skinny', 'pig', 'whale']):
-            return 'body_shaming'
-        elif any(word in pattern_str.lower() for word in ['kill', 'die', 'kys', 'threat', 'hurt']):
-            return 'threats'
-        elif any(word in pattern_str.lower() for word in ['stupid', 'idiot', 'moron', 'dumb']):
-            return 'personal_attacks'
-        elif any(word in pattern_str.lower() for word in ['hate', 'despise', 'trash', 'garbage']):
-            return 'hate_speech'
-        else:
-            return 'general_harassment'
+    def _classify_harassment_type(self, rules):
+        """Classify the type of harassment from the matched rules' categories"""
+        return self.patterns.classify_harassment(rules)
     
-    def detect_copyright_violations(self, comments, keywords=None):
+    def detect_copyright_violations(self, comments, keywords=None, matches=None, keyword_mode='substring',
+                                    prepared=None):
         """Detect potential copyright violations in comments"""
-        violations = []
-        
-        # Copyright violation patterns
-        piracy_patterns = [
-            r'(?i)(download|torrent|magnet|pirate)',
-            r'(?i)(free download|full movie|full video)',
-            r'(?i)(leaked|leak|rip)',
-            r'(?i)(camrip|cam rip|dvdrip|webrip)',
-            r'(?i)(watch free|stream free)',
-            r'(?i)(illegal|pirated|cracked)',
-        ]
+        comments = CommentBatch.coerce(comments)
+        violations = FlaggedComments(comments, _violation_entry)
         
-        for comment in comments:
-            text = comment['text']
-            matched_patterns = []
-            
-            for pattern in piracy_patterns:
-                if re.search(pattern, text):
-                    matched_patterns.append(pattern)
+        # One automaton for the whole keyword list, reused across calls
+        keyword_index = get_keyword_index(keywords, keyword_mode) if keywords else None
+        
+        if keyword_index and prepared is None:
+            prepared = prepare_comments(comments)
+        if matches is None:
+            matches = self.scan_comments(comments, prepared)
+        
+        for i, rules in enumerate(matches):
+            matched_rules = tuple(r for r in rules if r['detector'] == 'piracy')
             
             # Check for keyword matches if provided
-            keyword_matches = []
-            if keywords:
-                for keyword in keywords:
-                    if keyword.lower() in text.lower():
-                        keyword_matches.append(keyword)
+            keyword_matches = keyword_index.find(prepared[i].text) if keyword_index else []
             
-            if matched_patterns or keyword_matches:
-                violations.append({
-                    'author': comment['author'],
-                    'text': text,
-                    'time': comment['time'],
-                    'likes': comment['likes'],
-                    'matched_patterns': matched_patterns,
-                    'keyword_matches': keyword_matches,
-                    'severity': 'high' if matched_patterns else 'medium',
-                    'comment_id': comment['id']
-                })
+            if matched_rules or keyword_matches:
+                violations.add(i, (matched_rules, keyword_matches))
         
         return violations
     
-    def analyze_video(self, video_url_or_id, keywords=None, limit=200):
-        """Complete analysis of a YouTube video"""
+    def analyze_video(self, video_url_or_id, keywords=None, limit=200, keyword_mode='substring', use_store=True,
+                      progress=None):
+        """Complete analysis of a YouTube video
+        
+        `progress(stage, comments_scraped=None)` is called as the analysis
+        moves through scraping and each detector.
+        """
+        progress = progress or _no_progress
+        
         video_id = self.extract_video_id(video_url_or_id)
         
         if not video_id:
@@ -292,7 +400,7 @@ class YouTubeAnalyzer:
             }
         
         # Scrape comments
-        comments = self.scrape_comments(video_id, limit)
+        comments = self.scrape_comments(video_id, limit, use_store, progress)
         
         if not comments:
             return {
@@ -300,15 +408,38 @@ class YouTubeAnalyzer:
                 'error': 'No comments found or unable to scrape'
             }
         
-        # Analyze comments
+        return self.analyze_comments(video_id, comments, keywords, keyword_mode, progress)
+    
+    def analyze_comments(self, video_id, comments, keywords=None, keyword_mode='substring', progress=None):
+        """Run every detector over already scraped comments of a video"""
+        progress = progress or _no_progress
+        comments = CommentBatch.coerce(comments)
+        progress('scanning', len(comments))
+        
+        # Analyze comments (text normalized and rules scanned once, shared by all detectors)
+        with timed('prepare'):
+            prepared = prepare_comments(comments)
+        with timed('scan'):
+            matches = self.scan_comments(comments, prepared)
+        
         print("🤖 Detecting bot comments...")
-        bot_indicators = self.detect_bot_comments(comments)
+        progress('detecting_bots')
+        with timed('detect_bots'):
+            bot_indicators = self.detect_bot_comments(comments, matches, prepared)
         
         print("⚠️ Detecting harassment and personal attacks...")
-        harassment_indicators, harassment_comments = self.detect_harassment(comments)
+        progress('detecting_harassment')
+        with timed('detect_harassment'):
+            harassment_indicators, harassment_comments = self.detect_harassment(comments, matches, prepared)
         
         print("⚖️ Detecting copyright violations...")
-        copyright_violations = self.detect_copyright_violations(comments, keywords)
+        progress('detecting_copyright')
+        with timed('detect_copyright'):
+            copyright_violations = self.detect_copyright_violations(comments, keywords, matches, keyword_mode,
+                                                                    prepared)
+        
+        with timed('network'):
+            network = self.build_network(comments, bot_indicators)
         
         # Calculate statistics
         total_comments = len(comments)
@@ -317,13 +448,7 @@ class YouTubeAnalyzer:
         violation_count = len(copyright_violations)
         
         # Determine threat level
-        threat_level = 'LOW'
-        if bot_comment_count > 20 or violation_count > 10 or harassment_count > 15:
-            threat_level = 'CRITICAL'
-        elif bot_comment_count > 10 or violation_count > 5 or harassment_count > 8:
-            threat_level = 'HIGH'
-        elif bot_comment_count > 5 or violation_count > 2 or harassment_count > 3:
-            threat_level = 'MODERATE'
+        threat_level = self._threat_level(bot_comment_count, violation_count, harassment_count)
         
         # Generate unique conclusion based on results
         conclusion = self._generate_conclusion(
@@ -348,11 +473,172 @@ class YouTubeAnalyzer:
             'harassment_indicators': harassment_indicators,
             'harassment_comments': harassment_comments,
             'copyright_violations': copyright_violations,
+            'network': network,
             'conclusion': conclusion
         }
         
+        return self.record_authors(result)
+    
+    def build_network(self, comments, bot_indicators):
+        """Coordination graph of the authors: shared near-identical texts, reply threads and posting minutes"""
+        comments = CommentBatch.coerce(comments)
+        rows = {cid: i for i, cid in enumerate(comments.ids)}
+        text_groups = [[rows[cid] for cid in indicator['comment_ids'] if cid in rows]
+                       for indicator in bot_indicators if indicator['type'] in ['duplicate_text', 'similar_text']]
+        graph = build_graph(
+            [comments.author(i) for i in range(len(comments))],
+            text_groups,
+            threads=[thread_id(cid) for cid in comments.ids],
+            times=[comments.times[i] for i in range(len(comments))]
+        )
+        return graph.to_dict(self.network_nodes)
+    
+    def record_authors(self, result):
+        """Add a full analysis to the author index and give its flags the authors' risk scores"""
+        if self.authors is None or not result.get('success'):
+            return result
+        
+        comments = result['comments']
+        bot_ids = [cid for indicator in result['bot_indicators'] if indicator['type'] in ['duplicate_text', 'similar_text']
+                   for cid in indicator['comment_ids']]
+        with timed('author_index'):
+            activity = collect_activity(comments, _flag_rows(
+                comments, bot_ids, result['harassment_comments'], result['copyright_violations']))
+            risks = self.authors.record_video(result['video_id'], activity)
+        
+        by_name = {}
+        for key, risk in risks.items():
+            name = activity[key]['author']
+            by_name[name] = max(by_name.get(name, 0.0), risk)
+        _annotate_author_risk(result, by_name)
+        return result
+    
+    def load_analysis(self, video_id, keywords=None, keyword_mode='substring'):
+        """The video's saved RunningAnalysis for these keywords, or a new one if none is usable"""
+        saved = self.store.load_state(video_id, keyword_list_hash(keywords or [], keyword_mode))
+        if saved is not None:
+            try:
+                return RunningAnalysis.from_dict(self, saved)
+            except ValueError as e:
+                print(f"⚠️ Discarding saved analysis of {video_id}: {e}")
+        return RunningAnalysis(self, keywords, keyword_mode)
+    
+    def update_analysis(self, video_id, running, limit=200, progress=None):
+        """Scrape a video's new comments and run the detectors on those only
+        
+        `running` (from load_analysis) is updated in place and saved to the
+        store. A fresh state is first seeded with the stored comments.
+        """
+        with timed('scrape') as stage:
+            new_comments = self.sync_comments(video_id, limit, progress)
+        record_scrape(len(new_comments), stage.seconds, 'delta')
+        
+        fresh = not running.total_comments
+        delta = self.store.get_comments(video_id, limit) if fresh else new_comments
+        if delta:
+            with timed('detect_delta'):
+                flags = running.add_batch(delta)
+            if self.authors is not None:
+                # A fresh state covers every stored comment, so it replaces the video's author counts
+                batch = flags['harassment_comments'].batch
+                with timed('author_index'):
+                    self.authors.record_video(video_id, collect_activity(batch, _flag_rows(
+                        batch, [c['comment_id'] for c in flags['bot_comments']],
+                        flags['harassment_comments'], flags['copyright_violations'])), replace=fresh)
+            self.store.save_state(video_id, keyword_list_hash(running.keywords or [], running.keyword_mode),
+                                  running.to_dict())
+        return new_comments, delta
+    
+    def analyze_incremental(self, video_url_or_id, keywords=None, limit=200, keyword_mode='substring',
+                            progress=None):
+        """Analysis of a video kept up to date across scans from its saved detector state"""
+        video_id = self.extract_video_id(video_url_or_id)
+        
+        if not video_id:
+            return {
+                'success': False,
+                'error': 'Invalid YouTube URL or video ID'
+            }
+        if self.store is None:
+            raise ValueError('Incremental analysis needs the comment store (AEGIS_COMMENT_DB)')
+        
+        running = self.load_analysis(video_id, keywords, keyword_mode)
+        try:
+            new_comments, delta = self.update_analysis(video_id, running, limit, progress)
+        except Exception as e:
+            print(f"❌ Error scraping comments: {e}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        
+        if not running.total_comments:
+            return {
+                'success': False,
+                'error': 'No comments found or unable to scrape'
+            }
+        
+        result = running.summary(video_id)
+        del result['event']
+        if self.authors is not None:
+            _annotate_author_risk(result, self.authors.risks_by_name(_flagged_names(result)))
+        result['incremental'] = {
+            'new_comments': len(new_comments),
+            'analyzed_comments': len(delta),
+            'scans': running.batches
+        }
         return result
     
+    def analyze_stream(self, video_url_or_id, keywords=None, limit=200, keyword_mode='substring', batch_size=50):
+        """Scrape and analyze a video incrementally, yielding events as batches arrive"""
+        video_id = self.extract_video_id(video_url_or_id)
+        
+        if not video_id:
+            yield {'event': 'error', 'error': 'Invalid YouTube URL or video ID'}
+            return
+        
+        yield {
+            'event': 'start',
+            'video_id': video_id,
+            'video_url': f'https://www.youtube.com/watch?v={video_id}'
+        }
+        
+        running = RunningAnalysis(self, keywords, keyword_mode)
+        batch = []
+        try:
+            print(f"🔍 Streaming comments from video: {video_id}")
+            for comment in self.iter_comments(video_id, limit):
+                batch.append(comment)
+                if len(batch) >= batch_size:
+                    yield running.add_batch(batch)
+                    yield {'event': 'stats', 'statistics': running.statistics()}
+                    batch = []
+            
+            if batch:
+                yield running.add_batch(batch)
+                yield {'event': 'stats', 'statistics': running.statistics()}
+        
+        except Exception as e:
+            print(f"❌ Error scraping comments: {e}")
+            yield {'event': 'error', 'error': str(e)}
+            return
+        
+        if not running.total_comments:
+            yield {'event': 'error', 'error': 'No comments found or unable to scrape'}
+            return
+        
+        yield running.summary(video_id)
+    
+    def _threat_level(self, bot_comment_count, violation_count, harassment_count):
+        """Map detector counts to a threat level"""
+        if bot_comment_count > 20 or violation_count > 10 or harassment_count > 15:
+            return 'CRITICAL'
+        elif bot_comment_count > 10 or violation_count > 5 or harassment_count > 8:
+            return 'HIGH'
+        elif bot_comment_count > 5 or violation_count > 2 or harassment_count > 3:
+            return 'MODERATE'
+        return 'LOW'
+    
     def _generate_conclusion(self, total_comments, bot_count, harassment_count, 
                             violation_count, threat_level, harassment_indicators):
         """Generate unique conclusion based on actual results"""
@@ -429,15 +715,63 @@ class YouTubeAnalyzer:
         
         return '\n\n'.join(conclusions)
 
+def batch_main(videos_arg, keywords):
+    """Analyze a comma-separated list (or a file with one per line) of videos"""
+    from batch_analysis import analyze_batch
+    
+    if os.path.isfile(videos_arg):
+        with open(videos_arg, encoding='utf-8') as f:
+            videos = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    else:
+        videos = [v for v in videos_arg.split(',') if v.strip()]
+    
+    result = analyze_batch(YouTubeAnalyzer(), videos, keywords)
+    aggregate = result['aggregate']
+    
+    print("\n" + "="*60)
+    print("📊 BATCH ANALYSIS RESULTS")
+    print("="*60)
+    for video in result['videos']:
+        if video['success']:
+            stats = video['statistics']
+            print(f"{video['video_id']}: {stats['total_comments']} comments, "
+                  f"{stats['bot_comments']} bot, {stats['harassment_comments']} harassment, "
+                  f"{stats['copyright_violations']} copyright - {stats['threat_level']}")
+        else:
+            print(f"{video.get('video_id', video.get('video'))}: ❌ {video['error']}")
+    print("-"*60)
+    print(f"Videos Analyzed: {aggregate['videos_analyzed']}/{aggregate['videos_requested']}")
+    print(f"Total Comments: {aggregate['total_comments']}")
+    print(f"Authors Flagged On Several Videos: {len(aggregate['repeat_flagged_authors'])}")
+    print("="*60)
+    
+    output_file = f"batch_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False, default=to_json)
+    
+    print(f"\n💾 Full analysis saved to: {output_file}")
+
 def main():
-    if len(sys.argv) < 2:
+    if len(sys.argv) < 2 or (sys.argv[1] == '--batch' and len(sys.argv) < 3):
         print("Usage: python youtube_analyzer.py <video_url_or_id> [keywords]")
+        print("       python youtube_analyzer.py --batch <id,id,...|file> [keywords]")
         print("Example: python youtube_analyzer.py dQw4w9WgXcQ")
         print("Example: python youtube_analyzer.py https://www.youtube.com/watch?v=dQw4w9WgXcQ movie,leak")
+        print("Example: python youtube_analyzer.py dQw4w9WgXcQ catalog:studio_titles")
+        print("Example: python youtube_analyzer.py --batch channel_videos.txt movie,leak")
         sys.exit(1)
     
-    video_input = sys.argv[1]
-    keywords = sys.argv[2].split(',') if len(sys.argv) > 2 else None
+    batch = sys.argv[1] == '--batch'
+    args = sys.argv[2:] if batch else sys.argv[1:]
+    
+    video_input = args[0]
+    keywords = args[1].split(',') if len(args) > 1 else None
+    if keywords:
+        keywords = KeywordCatalogs.from_env().resolve(keywords)
+    
+    if batch:
+        batch_main(video_input, keywords)
+        return
     
     analyzer = YouTubeAnalyzer()
     result = analyzer.analyze_video(video_input, keywords)
@@ -457,7 +791,7 @@ def main():
         # Save to file
         output_file = f"analysis_{result['video_id']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+            json.dump(result, f, indent=2, ensure_ascii=False, default=to_json)
         
         print(f"\n💾 Full analysis saved to: {output_file}")
     else: